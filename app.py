@@ -2,11 +2,15 @@
 Main Flask application for E-Commerce website
 """
 from flask import Flask, render_template, session
+from werkzeug.local import LocalProxy
 from config import config
 from routes import register_blueprints
-from models.product import Product
+from models.product import Product, product_autocomplete
 from models.order import Cart
+from models.database import init_db
+from utils.fragment_cache import init_fragment_cache
 import os
+import threading
 
 def create_app(config_name='default'):
     """Application factory function"""
@@ -22,6 +26,23 @@ def create_app(config_name='default'):
     # Ensure upload folder exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
+    # Pooled, request-scoped database connections
+    init_db(app)
+    
+    # {% cache %} blocks for rendered template fragments
+    init_fragment_cache(app)
+    
+    # Load the autocomplete index in the background once the app starts serving, so
+    # the first keystroke is fast; importing or creating an app alone never queries.
+    # Without warm-up the index is built lazily by the first suggest()
+    if app.config.get('AUTOCOMPLETE_WARM_ON_START') and not app.testing:
+        warm_up = threading.Lock()
+
+        @app.before_request
+        def warm_autocomplete():
+            if warm_up.acquire(blocking=False):
+                threading.Thread(target=product_autocomplete.ensure_fresh, daemon=True).start()
+    
     # Register blueprints
     register_blueprints(app)
     
@@ -429,17 +450,14 @@ City, State 12345</textarea>
     # Context processor to make cart count available in all templates
     @app.context_processor
     def inject_cart_count():
-        """Inject cart count into all templates"""
-        cart_count = 0
-        try:
-            if 'user_id' in session:
-                cart_count = Cart.get_cart_count(session['user_id'])
-                # Ensure cart_count is always an integer, never None
-                cart_count = int(cart_count) if cart_count is not None else 0
-        except Exception as e:
-            print(f"Error getting cart count: {e}")
-            cart_count = 0
-        return {'cart_count': cart_count}
+        """Inject cart count into all templates, resolved only when a template uses it"""
+        def current_cart_count():
+            try:
+                return Cart.get_session_cart_count()
+            except Exception as e:
+                print(f"Error getting cart count: {e}")
+                return 0
+        return {'cart_count': LocalProxy(current_cart_count)}
     
     # Context processor to make user info available in all templates
     @app.context_processor
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Count database round-trips for one cash-on-delivery order, before and after
+the checkout rework. Runs against the in-memory fake driver, so no MySQL
+server is needed:
+    python benchmark_checkout.py
+"before" replays the statements the original place_order issued: stock
+checks and updates per item, SELECT LAST_INSERT_ID() on a second connection,
+one INSERT per order item and the cart cleared twice. "after" runs the
+current place_order route.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from fake_mysql import FakeServer, install
+from models.database import execute_query, init_db
+from models.order import cart_snapshots
+from routes.cart import cart_bp
+
+USER_ID = 7
+CART_SIZES = (1, 5, 20)
+
+
+class Store:
+    """Scripted cart and products tables with plenty of stock"""
+
+    def __init__(self, lines):
+        self.cart = [{'product_id': product_id, 'quantity': 1, 'name': f'Product {product_id}',
+                      'price': 5.0, 'subtotal': 5.0} for product_id in range(1, lines + 1)]
+
+    def __call__(self, query, params):
+        if 'FROM cart c' in query:
+            return [dict(line) for line in self.cart]
+        if 'FROM products' in query:
+            ids = params if 'IN (' in query else params[:1]
+            return [{'id': product_id, 'name': f'Product {product_id}', 'description': '', 'price': 5,
+                     'stock_quantity': 100, 'category_id': 1, 'image_url': None, 'is_active': True,
+                     'category_name': 'Books'} for product_id in ids]
+        if 'LAST_INSERT_ID' in query:
+            return [{'order_id': 1}]
+        if 'stock_quantity - CASE' in query:
+            return len(params) // 5
+        if query.lstrip().startswith('SELECT'):
+            return []
+        return 1
+
+
+def before(lines):
+    """Replay the original place_order statement sequence"""
+    server = FakeServer(responder=Store(lines))
+    install(server)
+
+    cart_items = execute_query("SELECT c.* FROM cart c WHERE c.user_id = %s", (USER_ID,), fetch=True)
+    for item in cart_items:
+        execute_query("SELECT p.* FROM products p WHERE p.id = %s", (item['product_id'],), fetch=True)
+
+    execute_query("INSERT INTO orders (user_id, total_amount) VALUES (%s, %s)", (USER_ID, 5.0 * lines))
+    order_id = execute_query("SELECT LAST_INSERT_ID() as order_id", fetch=True)[0]['order_id']
+    for item in cart_items:
+        execute_query("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)",
+                      (order_id, item['product_id'], item['quantity'], item['price']))
+    execute_query("DELETE FROM cart WHERE user_id = %s", (USER_ID,))
+
+    execute_query("UPDATE orders SET first_name = %s WHERE id = %s", ('Ada', order_id))
+    for item in cart_items:
+        execute_query("SELECT p.* FROM products p WHERE p.id = %s", (item['product_id'],), fetch=True)
+        execute_query("UPDATE products SET stock_quantity = %s WHERE id = %s", (99, item['product_id']))
+    execute_query("DELETE FROM cart WHERE user_id = %s", (USER_ID,))
+    return server
+
+
+def after(lines):
+    """Place the order through the current route"""
+    server = FakeServer(responder=Store(lines))
+    install(server)
+    cart_snapshots.invalidate()
+
+    app = Flask(__name__)
+    app.secret_key = 'benchmark'
+    init_db(app)
+    app.register_blueprint(cart_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = USER_ID
+
+    response = client.post('/place-order', data={
+        'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery', 'first_name': 'Ada'})
+    assert '/order-confirmation/' in response.headers['Location'], "Order was not placed"
+    return server
+
+
+def main():
+    print("📊 Round-trips per cash-on-delivery order")
+    print("=" * 50)
+    print(f"{'items':>5}  {'before':>8}  {'after':>8}")
+    for lines in CART_SIZES:
+        old, new = before(lines), after(lines)
+        print(f"{lines:>5}  {old.round_trips:>8}  {new.round_trips:>8}")
+    print("\nRound-trips include BEGIN/COMMIT and the cart fingerprint read.")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,23 @@ class Config:
     DB_USER = 'root'  # Default XAMPP MySQL user
     DB_PASSWORD = ''  # Default XAMPP MySQL password (empty)
     DB_NAME = 'ecommerce_db'
+    DB_TIME_ZONE = '+00:00'  # Session time zone set on every connection; TIMESTAMP values are read in it
+    
+    # Read replica settings - SELECTs are spread over these hosts when set
+    DB_REPLICA_HOSTS = []  # e.g. ['replica1.local', 'replica2.local']
+    DB_REPLICA_STICKY_SECONDS = 5  # Keep a session on the primary this long after it writes
+    
+    # Connection pool settings
+    DB_POOL_SIZE = 5  # Idle connections kept open per worker
+    DB_POOL_MAX_OVERFLOW = 10  # Extra connections allowed under load
+    DB_POOL_TIMEOUT = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = 3600  # Reconnect connections older than this (seconds)
+    DB_POOL_PRE_PING = True  # Check idle connections are alive before reuse
+    
+    # Query instrumentation settings
+    DB_SLOW_QUERY_MS = 200  # Log statements slower than this (0 disables)
+    DB_N_PLUS_ONE_THRESHOLD = 5  # Warn when one statement shape repeats this often per request
+    DB_QUERY_HEADERS = False  # Add Server-Timing / X-DB-Queries response headers
     
     # Application settings
     UPLOAD_FOLDER = 'static/images'
@@ -22,14 +39,50 @@ class Config:
     # Session settings
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
     
+    # Cache settings
+    CATEGORY_CACHE_POLL_SECONDS = 2  # How often a worker checks whether cached categories changed
+    FEATURED_CACHE_TTL = 60  # Seconds the home page featured products are cached
+    FRAGMENT_CACHE_MAX_ENTRIES = 1000  # Rendered template fragments kept per worker
+    
+    # HTTP caching (Cache-Control per endpoint; responses also carry ETags)
+    CACHE_CONTROL_PRODUCT_PAGE = 'public, no-cache'  # Always revalidate; cheap 304s
+    CACHE_CONTROL_PRODUCT_API = 'public, max-age=30'
+    CACHE_CONTROL_SEARCH_API = 'public, max-age=60'
+    CACHE_CONTROL_CATEGORIES_API = 'public, max-age=300'
+    
+    # Cart settings
+    GUEST_CART_MAX_LINES = 50  # Distinct products a guest cart (kept in the session cookie) may hold
+    CART_SNAPSHOT_TTL = 30  # Seconds a priced cart snapshot is reused while the cart is unchanged
+    CART_SNAPSHOT_MAX_ENTRIES = 10000  # Priced cart snapshots kept per worker
+    CART_COUNT_MAX_AGE = 60  # Seconds the cart badge count kept in the session is trusted
+    CART_ABANDONED_DAYS = 30  # purge_abandoned_carts.py deletes carts untouched this long
+    CART_PURGE_BATCH_SIZE = 1000  # Cart rows deleted per purge transaction
+    CART_PURGE_PAUSE_SECONDS = 0.5  # Pause between purge batches so replicas keep up
+    
+    # Checkout settings
+    IDEMPOTENCY_CACHE_TTL = 600  # Seconds a worker remembers which order a checkout key placed
+    IDEMPOTENCY_CACHE_MAX_ENTRIES = 10000  # Checkout keys remembered per worker
+    IDEMPOTENCY_KEY_DAYS = 7  # purge_abandoned_carts.py deletes checkout keys older than this
+    
+    # Pricing settings
+    TAX_RATE = 0.08  # 8% tax on the cart subtotal
+    SHIPPING_FLAT_RATE = 10.00  # Charged on every non-empty cart
+    
+    # Search settings
+    SEARCH_INDEX_REFRESH_SECONDS = 300  # Rebuild the in-process product search index this often
+    AUTOCOMPLETE_REFRESH_SECONDS = 600  # Rebuild the autocomplete trie (and popularity) this often
+    AUTOCOMPLETE_WARM_ON_START = True  # Build the trie in a background thread at startup, not on the first keystroke
+    
     # Pagination settings
     PRODUCTS_PER_PAGE = 12
     ORDERS_PER_PAGE = 10
+    ADMIN_SEARCH_PER_PAGE = 50  # Ranked matches listed per page of admin product search
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     FLASK_ENV = 'development'
+    DB_QUERY_HEADERS = True
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -39,9 +92,17 @@ class ProductionConfig(Config):
     SECRET_KEY = os.environ.get('SECRET_KEY')
     DB_PASSWORD = os.environ.get('DB_PASSWORD')
 
+class TestingConfig(Config):
+    """Testing configuration"""
+    TESTING = True
+    DEBUG = False
+    # Tests install fake databases; don't race them with a startup query
+    AUTOCOMPLETE_WARM_ON_START = False
+
 # Configuration dictionary
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
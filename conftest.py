@@ -0,0 +1,12 @@
+"""
+Shared pytest fixtures
+"""
+import pytest
+
+from fake_mysql import FakeDatabase
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Fake database servers for one test; pools and Config are restored afterwards"""
+    return FakeDatabase(monkeypatch)
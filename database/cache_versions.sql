@@ -0,0 +1,13 @@
+-- Cache Versions
+-- Each worker caches rarely-changing data (such as categories) in memory.
+-- A write bumps the matching version row; workers poll this small table
+-- and reload their copy when the version changes.
+
+USE ecommerce_db;
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO cache_versions (name, version) VALUES ('categories', 1);
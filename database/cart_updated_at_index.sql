@@ -0,0 +1,8 @@
+-- Cart Expiry Index
+-- purge_abandoned_carts.py deletes carts untouched for CART_ABANDONED_DAYS
+-- in small batches, selecting rows by updated_at. This index keeps every
+-- batch a short range scan instead of a full table scan.
+
+USE ecommerce_db;
+
+CREATE INDEX idx_cart_updated_at ON cart(updated_at);
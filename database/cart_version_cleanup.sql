@@ -0,0 +1,8 @@
+-- Cart Version Cleanup
+-- Priced cart snapshots are now keyed by a fingerprint of the cart's own
+-- rows, so cart writes no longer bump a 'cart:<user_id>' row in
+-- cache_versions. Remove the per-user rows earlier releases left behind.
+
+USE ecommerce_db;
+
+DELETE FROM cache_versions WHERE name LIKE 'cart:%';
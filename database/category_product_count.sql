@@ -0,0 +1,20 @@
+-- Category Product Counts
+-- The categories pages show how many active products each category has.
+-- The count is stored on the category and recounted by every product
+-- create, update and soft-delete, so the pages need no per-category query.
+
+USE ecommerce_db;
+
+ALTER TABLE categories
+ADD COLUMN IF NOT EXISTS product_count INT NOT NULL DEFAULT 0;
+
+-- Backfill existing categories
+UPDATE categories c
+SET product_count = (
+    SELECT COUNT(*) FROM products p
+    WHERE p.category_id = c.id AND p.is_active = TRUE
+);
+
+-- Tell running workers to reload their cached categories
+INSERT INTO cache_versions (name, version) VALUES ('categories', 1)
+ON DUPLICATE KEY UPDATE version = version + 1;
@@ -0,0 +1,18 @@
+-- Checkout Idempotency Keys
+-- The checkout form carries a one-time key. place_order stores it with the
+-- new order inside the order transaction; the primary key makes a second
+-- submission of the same form (double-click, browser or client retry) fail
+-- instead of creating a duplicate order, and the retry is sent to the
+-- original order.
+
+USE ecommerce_db;
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(64) NOT NULL,
+    order_id INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, idempotency_key),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+);
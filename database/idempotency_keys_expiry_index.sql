@@ -0,0 +1,8 @@
+-- Checkout Idempotency Key Expiry Index
+-- purge_abandoned_carts.py deletes checkout keys older than
+-- IDEMPOTENCY_KEY_DAYS in small batches, selecting rows by created_at. This
+-- index keeps every batch a short range scan instead of a full table scan.
+
+USE ecommerce_db;
+
+CREATE INDEX idx_idempotency_created_at ON idempotency_keys(created_at);
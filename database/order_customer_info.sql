@@ -0,0 +1,12 @@
+-- Order Customer Information Columns
+-- place_order stores the checkout contact details on each order.
+-- These columns must exist because the order INSERT writes them inside
+-- the checkout transaction, where a failure rolls the whole order back.
+
+USE ecommerce_db;
+
+ALTER TABLE orders 
+ADD COLUMN IF NOT EXISTS first_name VARCHAR(50),
+ADD COLUMN IF NOT EXISTS last_name VARCHAR(50),
+ADD COLUMN IF NOT EXISTS email VARCHAR(100),
+ADD COLUMN IF NOT EXISTS phone VARCHAR(15);
@@ -0,0 +1,12 @@
+-- Product Listing Indexes
+-- Product listings paginate by seeking on (created_at, id) instead of
+-- LIMIT/OFFSET. These indexes match the listing filters and sort order
+-- so every page, however deep, is a short index range scan.
+
+USE ecommerce_db;
+
+-- /category/<id> and /products?category=<id>
+CREATE INDEX idx_products_listing ON products(is_active, category_id, created_at, id);
+
+-- /products without a category filter
+CREATE INDEX idx_products_active_created ON products(is_active, created_at, id);
@@ -0,0 +1,22 @@
+-- Related Products
+-- "Customers also bought": how many orders contain both products.
+-- Filled incrementally by mine_related_products.py; job_watermarks
+-- records the last order each batch job has processed.
+
+USE ecommerce_db;
+
+CREATE TABLE IF NOT EXISTS related_products (
+    product_id INT NOT NULL,
+    related_id INT NOT NULL,
+    score INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_id, related_id),
+    INDEX idx_related_score (product_id, score),
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+    FOREIGN KEY (related_id) REFERENCES products(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    name VARCHAR(50) PRIMARY KEY,
+    last_id INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -49,6 +49,10 @@ INSERT INTO products (name, description, price, stock_quantity, category_id, ima
 ('Basketball', 'Official size basketball', 24.99, 60, 5, 'basketball.jpg'),
 ('Dumbbells Set', '20lb adjustable dumbbells', 89.99, 35, 5, 'dumbbells.jpg');
 
+-- Count the products inserted above
+UPDATE categories c
+SET product_count = (SELECT COUNT(*) FROM products p WHERE p.category_id = c.id AND p.is_active = TRUE);
+
 -- Note: In a real application, password hashes would be generated using proper hashing
 -- Run generate_passwords.py to create proper password hashes, then update the records above
 -- Example commands after running generate_passwords.py:
@@ -32,6 +32,7 @@ CREATE TABLE categories (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
     description TEXT,
+    product_count INT NOT NULL DEFAULT 0,  -- Active products, maintained by product writes
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -71,6 +72,10 @@ CREATE TABLE orders (
     status ENUM('pending', 'processing', 'shipped', 'delivered', 'cancelled') DEFAULT 'pending',
     shipping_address TEXT NOT NULL,
     payment_method VARCHAR(50) DEFAULT 'cash_on_delivery',
+    first_name VARCHAR(50),
+    last_name VARCHAR(50),
+    email VARCHAR(100),
+    phone VARCHAR(15),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
@@ -88,9 +93,50 @@ CREATE TABLE order_items (
     FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
 );
 
+-- Related products table ("customers also bought", see mine_related_products.py)
+CREATE TABLE related_products (
+    product_id INT NOT NULL,
+    related_id INT NOT NULL,
+    score INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_id, related_id),
+    INDEX idx_related_score (product_id, score),
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+    FOREIGN KEY (related_id) REFERENCES products(id) ON DELETE CASCADE
+);
+
+-- Batch job progress
+CREATE TABLE job_watermarks (
+    name VARCHAR(50) PRIMARY KEY,
+    last_id INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Cache versions table (cross-worker cache invalidation)
+CREATE TABLE cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO cache_versions (name, version) VALUES ('categories', 1);
+
+-- Checkout idempotency keys (one order per submitted checkout form)
+CREATE TABLE idempotency_keys (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(64) NOT NULL,
+    order_id INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, idempotency_key),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+);
+
 -- Create indexes for better performance
 CREATE INDEX idx_products_category ON products(category_id);
 CREATE INDEX idx_cart_user ON cart(user_id);
+CREATE INDEX idx_cart_updated_at ON cart(updated_at);
 CREATE INDEX idx_orders_user ON orders(user_id);
 CREATE INDEX idx_order_items_order ON order_items(order_id);
-CREATE INDEX idx_products_active ON products(is_active);
\ No newline at end of file
+CREATE INDEX idx_idempotency_created_at ON idempotency_keys(created_at);
+CREATE INDEX idx_products_active ON products(is_active);
+CREATE INDEX idx_products_listing ON products(is_active, category_id, created_at, id);
+CREATE INDEX idx_products_active_created ON products(is_active, created_at, id);
\ No newline at end of file
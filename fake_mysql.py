@@ -0,0 +1,171 @@
+"""
+In-memory stand-in for mysql.connector used by the offline test scripts.
+A FakeServer records every statement it receives; result rows are
+supplied by a responder callable so each test can script the database.
+"""
+import itertools
+
+
+class FakeServer:
+    """Records statements and hands out FakeConnection objects"""
+
+    def __init__(self, name='primary', responder=None):
+        self.name = name
+        self.responder = responder or (lambda query, params: [])
+        self.statements = []
+        self.round_trips = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.consumed = 0
+        self.connections = []
+        self._ids = itertools.count(1)
+
+    def connect(self, **kwargs):
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    def queries(self):
+        """Statement texts received so far, whitespace-normalised"""
+        return [' '.join(query.split()) for query, _ in self.statements]
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.in_transaction = False
+        self.closed = False
+
+    def cursor(self, dictionary=False, buffered=False):
+        return FakeCursor(self)
+
+    def start_transaction(self):
+        self.server.round_trips += 1
+        self.in_transaction = True
+
+    def commit(self):
+        self.server.round_trips += 1
+        self.server.commits += 1
+        self.in_transaction = False
+
+    def rollback(self):
+        self.server.round_trips += 1
+        self.server.rollbacks += 1
+        self.in_transaction = False
+
+    def consume_results(self):
+        self.server.consumed += 1
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows = []
+
+    def _run(self, query, params):
+        server = self.connection.server
+        server.statements.append((query, params))
+        result = server.responder(query, params)
+        if isinstance(result, int):
+            self._rows = []
+            self.rowcount = result
+        else:
+            self._rows = list(result or [])
+            self.rowcount = len(self._rows)
+        if query.strip().upper().startswith('INSERT'):
+            self.lastrowid = next(server._ids)
+
+    def execute(self, query, params=()):
+        self.connection.server.round_trips += 1
+        self._run(query, params)
+
+    def executemany(self, query, seq_params):
+        # mysql.connector rewrites multi-row INSERTs into one statement
+        self.connection.server.round_trips += 1
+        seq_params = list(seq_params)
+        self.connection.server.statements.append((query, seq_params))
+        self._rows = []
+        self.rowcount = len(seq_params)
+        if query.strip().upper().startswith('INSERT'):
+            self.lastrowid = next(self.connection.server._ids)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        self.connection.server.round_trips += 1
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+def install(server, monkeypatch=None, replicas=()):
+    """
+    Point models.database at fresh pools backed by fake servers
+    Args:
+        server: FakeServer playing the primary
+        replicas: FakeServers playing read replicas (none by default)
+    Returns: the primary ConnectionPool
+    """
+    from config import Config
+    from models import database
+    from models.pool import ConnectionPool
+
+    pools = {'primary': ConnectionPool(server.connect, size=2, max_overflow=2, timeout=1)}
+    for index, replica in enumerate(replicas):
+        name = f'replica-{index}'
+        pools[name] = ConnectionPool(replica.connect, size=2, max_overflow=2, timeout=1, name=name)
+    hosts = [replica.name for replica in replicas]
+
+    if monkeypatch is not None:
+        monkeypatch.setattr(database, '_pools', pools)
+        monkeypatch.setattr(Config, 'DB_REPLICA_HOSTS', hosts)
+    else:
+        database._pools = pools
+        Config.DB_REPLICA_HOSTS = hosts
+    return pools['primary']
+
+
+class FakeDatabase:
+    """
+    Fake servers for one test, installed through monkeypatch so the real
+    pools and Config are put back when the test ends (see conftest.fake_db)
+    """
+
+    def __init__(self, monkeypatch):
+        self.monkeypatch = monkeypatch
+
+    def serve(self, responder=None):
+        """
+        Install a FakeServer answering with responder as the primary
+        Args:
+            responder: callable(query, params) returning rows or a rowcount
+        Returns: the FakeServer
+        """
+        server = FakeServer(responder=responder)
+        self.install(server)
+        return server
+
+    def install(self, server, replicas=()):
+        """
+        Install existing fake servers
+        Args:
+            server: FakeServer playing the primary
+            replicas: FakeServers playing read replicas (none by default)
+        Returns: the primary ConnectionPool
+        """
+        return install(server, self.monkeypatch, replicas)
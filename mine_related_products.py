@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Update the "customers also bought" table from new orders
+Safe to run repeatedly; schedule it e.g. every 15 minutes from cron:
+    */15 * * * * cd /path/to/app && python mine_related_products.py
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mysql.connector import Error
+from utils.recommendations import mine_related_products
+
+def main():
+    print("🔧 Mining related products from new orders")
+    print("=" * 50)
+    
+    try:
+        processed = mine_related_products()
+    except Error as e:
+        print(f"❌ Mining failed: {e}")
+        return 1
+    
+    print(f"✅ Processed {processed} new orders")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,11 @@
 Models package for the E-Commerce application
 """
 
-from .database import get_db_connection, close_db_connection
+from .database import get_db_connection, close_db_connection, get_pool_stats
 from .user import User
+from .category import Category
 from .product import Product
 from .order import Order
+from .guest_cart import GuestCart
 
-__all__ = ['get_db_connection', 'close_db_connection', 'User', 'Product', 'Order']
\ No newline at end of file
+__all__ = ['get_db_connection', 'close_db_connection', 'get_pool_stats', 'User', 'Category', 'Product', 'Order', 'GuestCart']
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+Shared version counters for invalidating per-worker caches
+"""
+from .database import execute_query
+
+def get_version(name):
+    """
+    Current version of a named cache
+    Returns: version number (0 if never bumped) or None if it could not be read
+    """
+    result = execute_query("SELECT version FROM cache_versions WHERE name = %s", (name,), fetch=True)
+    if result is None:
+        return None
+    return result[0]['version'] if result else 0
+
+def bump_version(name):
+    """Signal every worker that the named cache is stale"""
+    query = """
+    INSERT INTO cache_versions (name, version) VALUES (%s, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+    """
+    return execute_query(query, (name,))
@@ -0,0 +1,129 @@
+"""
+Category model with a process-wide cached registry
+"""
+import threading
+import time
+from config import Config
+from .database import execute_query
+from .cache_version import get_version, bump_version
+
+class Category:
+    """
+    Category model class
+
+    Categories are read on almost every page but change rarely, so each
+    worker keeps them in memory. Writes through this class bump the shared
+    'categories' version; other workers notice the new version within
+    CATEGORY_CACHE_POLL_SECONDS and reload.
+    """
+    
+    VERSION_NAME = 'categories'
+    
+    _categories = None  # Rows ordered by name, or None before the first load
+    _by_id = {}
+    _version = None
+    _checked_at = 0
+    _lock = threading.Lock()
+    
+    @classmethod
+    def _fresh(cls):
+        return cls._categories is not None and time.time() - cls._checked_at < Config.CATEGORY_CACHE_POLL_SECONDS
+    
+    @classmethod
+    def _load(cls):
+        """Return the cached rows, reloading them if another worker changed them"""
+        if cls._fresh():
+            return cls._categories
+        
+        with cls._lock:
+            if cls._fresh():
+                return cls._categories
+            
+            version = get_version(cls.VERSION_NAME)
+            if cls._categories is None or version is None or version != cls._version:
+                rows = execute_query("SELECT * FROM categories ORDER BY name", fetch=True)
+                if rows is not None:  # Keep serving the old list if the database is unavailable
+                    cls._categories = rows
+                    cls._by_id = {row['id']: row for row in rows}
+                    cls._version = version
+            cls._checked_at = time.time()
+            return cls._categories or []
+    
+    @classmethod
+    def get_all(cls):
+        """Get all categories ordered by name (copies, safe to modify)"""
+        return [dict(row) for row in cls._load()]
+    
+    @classmethod
+    def get_by_id(cls, category_id):
+        """Get a category dict by ID, or None if it does not exist"""
+        cls._load()
+        row = cls._by_id.get(category_id)
+        return dict(row) if row else None
+    
+    @classmethod
+    def get_version(cls):
+        """Version of the cached categories (None before the shared version is readable)"""
+        cls._load()
+        return cls._version
+    
+    @classmethod
+    def invalidate(cls):
+        """Drop this worker's copy and tell the other workers to reload theirs"""
+        bump_version(cls.VERSION_NAME)
+        with cls._lock:
+            cls._categories = None
+    
+    @classmethod
+    def refresh_product_counts(cls, category_ids):
+        """
+        Recount the active products of the given categories
+        Product writes call this inside their transaction, so the stored
+        product_count commits together with the product change. It bumps
+        the shared version, making every worker reload its categories, so
+        call it only when a count can change: a product is created,
+        deleted, moved or (de)activated.
+        """
+        category_ids = sorted({category_id for category_id in category_ids if category_id})
+        if not category_ids:
+            return True
+        
+        placeholders = ', '.join(['%s'] * len(category_ids))
+        query = f"""
+        UPDATE categories c
+        SET product_count = (
+            SELECT COUNT(*) FROM products p
+            WHERE p.category_id = c.id AND p.is_active = TRUE
+        )
+        WHERE c.id IN ({placeholders})
+        """
+        result = execute_query(query, category_ids)
+        if result:
+            cls.invalidate()
+        return result
+    
+    @classmethod
+    def create(cls, name, description=None):
+        """Create a new category"""
+        result = execute_query("INSERT INTO categories (name, description) VALUES (%s, %s)",
+                               (name, description))
+        if result:
+            cls.invalidate()
+        return result
+    
+    @classmethod
+    def update(cls, category_id, name, description=None):
+        """Update a category's name and description"""
+        result = execute_query("UPDATE categories SET name = %s, description = %s WHERE id = %s",
+                               (name, description, category_id))
+        if result:
+            cls.invalidate()
+        return result
+    
+    @classmethod
+    def delete(cls, category_id):
+        """Delete a category"""
+        result = execute_query("DELETE FROM categories WHERE id = %s", (category_id,))
+        if result:
+            cls.invalidate()
+        return result
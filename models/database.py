@@ -1,36 +1,195 @@
 """
 Database connection and utility functions
 """
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import partial
 import mysql.connector
 from mysql.connector import Error
+from flask import g, has_app_context, has_request_context, session
 from config import Config
+from .pool import ConnectionPool
+from . import query_stats
 
-def get_db_connection():
+PRIMARY = 'primary'
+
+# Connection pools by name: 'primary' and one 'replica-N' per Config.DB_REPLICA_HOSTS entry
+_pools = {}
+_pool_lock = threading.Lock()
+_replica_counter = itertools.count()
+
+# Per-thread state used outside a Flask app context (scripts, jobs)
+_local = threading.local()
+
+# Statements that may be served by a read replica
+_READ_PREFIXES = ('SELECT', 'SHOW', 'DESCRIBE', 'EXPLAIN')
+
+class TransactionRollback(Exception):
+    """Raise inside a transaction() block to roll it back deliberately"""
+
+def _connect(host):
+    """Open a raw MySQL connection to host using the application settings"""
+    return mysql.connector.connect(
+        host=host,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        database=Config.DB_NAME,
+        time_zone=Config.DB_TIME_ZONE,  # Whatever the server's default, TIMESTAMPs come back in this zone
+        autocommit=True  # Enable autocommit for immediate changes
+    )
+
+def db_time_zone():
+    """The connections' session time zone (Config.DB_TIME_ZONE, a '+HH:MM' offset) as a tzinfo"""
+    offset = Config.DB_TIME_ZONE
+    hours, minutes = offset.lstrip('+-').split(':')
+    delta = timedelta(hours=int(hours), minutes=int(minutes))
+    return timezone(-delta if offset.startswith('-') else delta)
+
+def db_now():
+    """Current time as a naive datetime in the database session's time zone, to compare with TIMESTAMPs"""
+    return datetime.now(db_time_zone()).replace(tzinfo=None)
+
+def _replica_names():
+    return [f'replica-{index}' for index in range(len(Config.DB_REPLICA_HOSTS))]
+
+def get_pool(name=PRIMARY):
+    """Return a process-wide connection pool by name, creating it on first use"""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                if name == PRIMARY:
+                    host = Config.DB_HOST
+                else:
+                    host = Config.DB_REPLICA_HOSTS[int(name.rsplit('-', 1)[1])]
+                pool = ConnectionPool(
+                    partial(_connect, host),
+                    size=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    pre_ping=Config.DB_POOL_PRE_PING,
+                    recycle=Config.DB_POOL_RECYCLE,
+                    name=name
+                )
+                _pools[name] = pool
+    return pool
+
+def get_pool_stats():
+    """Return connection pool statistics for monitoring, keyed by pool name"""
+    return {name: get_pool(name).stats() for name in [PRIMARY] + _replica_names()}
+
+def get_db_connection(pool_name=PRIMARY):
     """
-    Create and return a database connection
+    Check out a connection from a pool (the primary by default)
     Returns: MySQL connection object or None if connection fails
+    Calling close() on the connection returns it to the pool.
     """
     try:
-        connection = mysql.connector.connect(
-            host=Config.DB_HOST,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            database=Config.DB_NAME,
-            autocommit=True  # Enable autocommit for immediate changes
-        )
-        return connection
+        return get_pool(pool_name).acquire()
     except Error as e:
-        print(f"Error connecting to MySQL: {e}")
+        print(f"Error connecting to MySQL ({pool_name}): {e}")
         return None
 
 def close_db_connection(connection):
     """
-    Close the database connection
+    Return the database connection to the pool
     Args: connection - MySQL connection object
     """
-    if connection and connection.is_connected():
+    if connection:
         connection.close()
 
+def _is_read(query):
+    statement = query.lstrip().upper()
+    return (statement.startswith(_READ_PREFIXES)
+            and 'FOR UPDATE' not in statement
+            and 'LOCK IN SHARE MODE' not in statement)
+
+def _primary_required():
+    """Read-your-writes: this request or session wrote recently"""
+    if has_app_context() and g.get('_db_wrote'):
+        return True
+    if has_request_context():
+        return session.get('_db_primary_until', 0) > time.time()
+    return False
+
+def _note_write():
+    """Pin this request, and the session for a short while, to the primary"""
+    if not Config.DB_REPLICA_HOSTS:
+        return
+    if has_app_context():
+        g._db_wrote = True
+    if has_request_context():
+        session['_db_primary_until'] = time.time() + Config.DB_REPLICA_STICKY_SECONDS
+
+def _route(query):
+    """
+    Choose the pool for a statement outside a transaction
+    Reads go to a replica (the same one for the whole request); writes,
+    locking reads and reads after a recent write go to the primary.
+    """
+    replicas = _replica_names()
+    if not replicas or not _is_read(query) or _primary_required():
+        return PRIMARY
+    if has_app_context():
+        if '_db_replica' not in g:
+            g._db_replica = replicas[next(_replica_counter) % len(replicas)]
+        return g._db_replica
+    return replicas[next(_replica_counter) % len(replicas)]
+
+def _acquire_connection(pool_name=PRIMARY):
+    """
+    Get a connection from the named pool for a single statement
+    Returns: (connection, borrowed) - borrowed connections must be released
+    by the caller; inside a Flask app context request-scoped connections
+    are reused and released at teardown instead. An unreachable replica
+    falls back to the primary.
+    """
+    if has_app_context():
+        connections = g.setdefault('_db_connections', {})
+        connection = connections.get(pool_name)
+        if connection is None:
+            connection = get_db_connection(pool_name)
+            if connection is None and pool_name != PRIMARY:
+                return _acquire_connection(PRIMARY)
+            connections[pool_name] = connection
+        return connection, False
+
+    connection = get_db_connection(pool_name)
+    if connection is None and pool_name != PRIMARY:
+        connection = get_db_connection(PRIMARY)
+    return connection, True
+
+def release_request_connection(exception=None):
+    """Return the request-scoped connections to their pools (teardown handler)"""
+    connections = g.pop('_db_connections', None) or {}
+    for connection in connections.values():
+        close_db_connection(connection)
+
+def _state():
+    """Namespace holding the active transaction: g in a request, else thread-local"""
+    return g if has_app_context() else _local
+
+def _current_transaction():
+    return getattr(_state(), '_db_transaction', None)
+
+def init_db(app):
+    """Register the database teardown and instrumentation hooks with the Flask app"""
+    app.teardown_appcontext(release_request_connection)
+    query_stats.init_app(app)
+
+def _run(cursor, query, params=None, many=False):
+    """Execute a statement on a cursor, recording its duration and row count"""
+    started = time.perf_counter()
+    if many:
+        cursor.executemany(query, params)
+    else:
+        cursor.execute(query, params or ())
+    query_stats.record_query(query, time.perf_counter() - started, cursor.rowcount)
+
 def execute_query(query, params=None, fetch=False):
     """
     Execute a database query with error handling
@@ -40,29 +199,301 @@ def execute_query(query, params=None, fetch=False):
         fetch: Whether to fetch results (default: False)
     Returns: Query results if fetch=True, else None
     """
-    connection = get_db_connection()
+    tx = _current_transaction()
+    if tx is not None:
+        try:
+            result = tx.execute(query, params, fetch)
+            return result if fetch else True
+        except Error as e:
+            print(f"Database error: {e}")
+            tx.failed = True
+            return None
+
+    pool_name = _route(query)
+    connection, borrowed = _acquire_connection(pool_name)
     if not connection:
         return None
-    
+
+    cursor = None
     try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute(query, params or ())
-        
+        cursor = connection.cursor(dictionary=True, buffered=True)
+        _run(cursor, query, params)
+        if pool_name == PRIMARY and not _is_read(query):
+            _note_write()
+
         if fetch:
             if query.strip().upper().startswith('SELECT'):
-                results = cursor.fetchall()
-            else:
-                results = cursor.fetchone()
+                return cursor.fetchall()
+            return cursor.fetchone()
+        return True
+
+    except Error as e:
+        print(f"Database error: {e}")
+        return None
+    finally:
+        if cursor:
             cursor.close()
+        if borrowed:
             close_db_connection(connection)
-            return results
-        else:
+
+def execute_write(query, params=None):
+    """
+    Execute one INSERT, UPDATE or DELETE on the primary in autocommit
+    Joins the active transaction if there is one. Inside a request the
+    primary connection is request-scoped, so later reads in the same
+    request run on it and see the write.
+    Args:
+        query: SQL statement
+        params: Query parameters (optional)
+    Returns: the affected row count, or None on failure
+    """
+    tx = _current_transaction()
+    if tx is not None:
+        try:
+            return tx.execute(query, params)
+        except Error as e:
+            print(f"Database error: {e}")
+            tx.failed = True
+            return None
+
+    connection, borrowed = _acquire_connection(PRIMARY)
+    if not connection:
+        return None
+
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True, buffered=True)
+        _run(cursor, query, params)
+        _note_write()
+        return cursor.rowcount
+
+    except Error as e:
+        print(f"Database error: {e}")
+        return None
+    finally:
+        if cursor:
             cursor.close()
+        if borrowed:
             close_db_connection(connection)
-            return True
-            
+
+def execute_many(query, rows):
+    """
+    Execute one statement for many parameter rows in a single batch
+    Multi-row INSERT ... VALUES statements are sent as one round-trip.
+    Args:
+        query: SQL query string
+        rows: Sequence of parameter tuples
+    Returns: dict with 'lastrowid' and 'rowcount' from the batch cursor,
+             or None on failure
+    """
+    rows = list(rows)
+    if not rows:
+        return {'lastrowid': None, 'rowcount': 0}
+
+    tx = _current_transaction()
+    if tx is not None:
+        try:
+            tx.execute_many(query, rows)
+            return {'lastrowid': tx.lastrowid, 'rowcount': tx.rowcount}
+        except Error as e:
+            print(f"Database error: {e}")
+            tx.failed = True
+            return None
+
+    connection, borrowed = _acquire_connection(PRIMARY)
+    if not connection:
+        return None
+
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True, buffered=True)
+        _run(cursor, query, rows, many=True)
+        _note_write()
+        return {'lastrowid': cursor.lastrowid, 'rowcount': cursor.rowcount}
+
     except Error as e:
         print(f"Database error: {e}")
-        cursor.close()
-        close_db_connection(connection)
-        return None
\ No newline at end of file
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if borrowed:
+            close_db_connection(connection)
+
+def stream_query(query, params=None, chunk_size=500, chunks=False, raise_errors=False):
+    """
+    Stream the rows of a SELECT without materialising the whole result
+    Uses an unbuffered cursor on its own pooled connection (a replica when
+    configured), so memory stays constant whatever the table size. The
+    stream does not see uncommitted writes from an open transaction().
+    Args:
+        query: SQL SELECT string
+        params: Query parameters (optional)
+        chunk_size: Rows fetched from the server per round-trip
+        chunks: Yield lists of up to chunk_size rows instead of single rows
+        raise_errors: Raise database errors instead of ending the stream
+            early, for callers that must not mistake a partial result for
+            the whole one
+    Yields: Row dicts (or lists of row dicts when chunks=True)
+    """
+    pool_name = _route(query)
+    connection = get_db_connection(pool_name)
+    if not connection and pool_name != PRIMARY:
+        connection = get_db_connection(PRIMARY)
+    if not connection:
+        if raise_errors:
+            raise Error(msg="No database connection available")
+        return
+
+    cursor = None
+    exhausted = False
+    rowcount = 0
+    started = time.perf_counter()
+    try:
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        cursor.execute(query, params or ())
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                exhausted = True
+                break
+            rowcount += len(rows)
+            if chunks:
+                yield rows
+            else:
+                yield from rows
+
+    except Error as e:
+        print(f"Database error: {e}")
+        if raise_errors:
+            raise
+    finally:
+        query_stats.record_query(query, time.perf_counter() - started, rowcount)
+        if cursor and not exhausted:
+            # Abandoned stream (e.g. a client disconnected mid-export): draining
+            # would still pull every unread row from the server, so disconnect
+            connection.discard()
+        else:
+            try:
+                if cursor:
+                    cursor.close()
+            except Error as e:
+                print(f"Database error: {e}")
+            close_db_connection(connection)
+
+class StreamedRows:
+    """
+    Re-iterable SELECT result that streams its rows on every iteration.
+    There is no len() and it is always truthy: counting would cost a
+    COUNT(*) over the whole query. Templates render the empty state from
+    the loop instead: {% for row in rows %}...{% else %}No rows{% endfor %}.
+    """
+
+    def __init__(self, query, params=None, transform=None, chunk_size=500):
+        self.query = query
+        self.params = params
+        self.transform = transform
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        for row in stream_query(self.query, self.params, self.chunk_size):
+            yield self.transform(row) if self.transform else row
+
+class Transaction:
+    """Statements executed on one connection and committed together"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lastrowid = None
+        self.rowcount = 0
+        self.failed = False
+
+    def execute(self, query, params=None, fetch=False):
+        """
+        Execute a statement inside the transaction
+        Args:
+            query: SQL query string
+            params: Query parameters (optional)
+            fetch: Whether to fetch results (default: False)
+        Returns: Query results if fetch=True, else the affected row count
+        Raises: mysql.connector.Error on failure
+        """
+        cursor = self.connection.cursor(dictionary=True, buffered=True)
+        try:
+            _run(cursor, query, params)
+            self.lastrowid = cursor.lastrowid
+            self.rowcount = cursor.rowcount
+
+            if fetch:
+                if query.strip().upper().startswith('SELECT'):
+                    return cursor.fetchall()
+                return cursor.fetchone()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def execute_many(self, query, rows):
+        """
+        Execute one statement for many parameter rows in a single batch
+        Returns: the affected row count (lastrowid is the first inserted id)
+        Raises: mysql.connector.Error on failure
+        """
+        rows = list(rows)
+        if not rows:
+            self.rowcount = 0
+            return 0
+
+        cursor = self.connection.cursor(dictionary=True, buffered=True)
+        try:
+            _run(cursor, query, rows, many=True)
+            self.lastrowid = cursor.lastrowid
+            self.rowcount = cursor.rowcount
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+@contextmanager
+def transaction():
+    """
+    Unit of work: run several statements on one connection with one commit
+    Usage:
+        with transaction() as tx:
+            tx.execute(query, params)
+    Any exception rolls the whole block back and is re-raised. Nested
+    transaction() blocks and execute_query() calls made inside the block
+    join the outer transaction instead of using their own connection.
+    """
+    state = _state()
+    current = getattr(state, '_db_transaction', None)
+    if current is not None:
+        try:
+            yield current
+        except BaseException:
+            current.failed = True
+            raise
+        return
+
+    # Transactions, including their reads, always run on the primary
+    connection, borrowed = _acquire_connection(PRIMARY)
+    if not connection:
+        raise Error(msg="No database connection available")
+
+    tx = Transaction(connection)
+    state._db_transaction = tx
+    try:
+        connection.start_transaction()
+        yield tx
+        if tx.failed:
+            raise Error(msg="A statement failed inside the transaction")
+        connection.commit()
+        _note_write()
+    except BaseException:
+        try:
+            connection.rollback()
+        except Error as e:
+            print(f"Rollback failed: {e}")
+        raise
+    finally:
+        state._db_transaction = None
+        if borrowed:
+            close_db_connection(connection)
@@ -0,0 +1,172 @@
+"""
+Guest cart model: a cart kept in the signed session cookie until login
+"""
+from flask import session
+from config import Config
+from .order import Cart
+from .product import Product
+
+class GuestCart:
+    """
+    Cart for visitors who are not logged in
+    
+    Lines live in the session as {product_id: quantity}, so browsing and
+    filling a cart costs product reads but no writes. At login the lines
+    are merged into the cart table with Cart.merge_items(). Methods mirror
+    Cart's so routes can use either.
+    """
+    
+    SESSION_KEY = 'guest_cart'
+    
+    @staticmethod
+    def _lines():
+        """Guest cart lines as {product_id: quantity}, both ints"""
+        stored = session.get(GuestCart.SESSION_KEY, {})
+        return {int(product_id): int(quantity) for product_id, quantity in stored.items() if int(quantity) > 0}
+    
+    @staticmethod
+    def _save(lines):
+        # Session keys must be strings; assigning a new dict marks the session modified
+        if lines:
+            session[GuestCart.SESSION_KEY] = {str(product_id): quantity for product_id, quantity in lines.items()}
+        else:
+            session.pop(GuestCart.SESSION_KEY, None)
+    
+    @staticmethod
+    def _line(product_id, quantity):
+        """
+        Coerce a line to the (int, int) shape the session and cart table use
+        Returns: (product_id, quantity), or None if either is not a number
+        """
+        try:
+            return int(product_id), int(quantity)
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def add_to_cart(product_id, quantity=1):
+        """
+        Add product to the guest cart or increase its quantity
+        Returns: dict with 'added', 'product_name' (None if no such product)
+                 and 'cart_count' like Cart.add_to_cart, or None if
+                 product_id or quantity is invalid (quantity must be at least 1)
+        """
+        line = GuestCart._line(product_id, quantity)
+        if line is None or line[1] < 1:
+            return None
+        product_id, quantity = line
+        
+        lines = GuestCart._lines()
+        product = Product.get_by_id(product_id)
+        new_quantity = lines.get(product_id, 0) + quantity
+        
+        added = False
+        if product and product.stock_quantity >= new_quantity and \
+                (product_id in lines or len(lines) < Config.GUEST_CART_MAX_LINES):
+            lines[product_id] = new_quantity
+            GuestCart._save(lines)
+            added = True
+        
+        return {
+            'added': added,
+            'product_name': product.name if product else None,
+            'cart_count': sum(lines.values())
+        }
+    
+    @staticmethod
+    def get_cart_items():
+        """Guest cart lines with product details, shaped like Cart.get_cart_items()"""
+        lines = GuestCart._lines()
+        products = Product.get_many(lines)
+        return [{
+            'product_id': product_id,
+            'quantity': quantity,
+            'name': products[product_id].name,
+            'price': products[product_id].price,
+            'image_url': products[product_id].image_url,
+            'stock_quantity': products[product_id].stock_quantity,
+            'subtotal': quantity * products[product_id].price
+        } for product_id, quantity in lines.items() if product_id in products]
+    
+    @staticmethod
+    def apply_changes(changes):
+        """
+        Set the quantities of several guest cart lines
+        Args: changes - iterable of (product_id, quantity); 0 removes the line
+        Returns: dict with 'items' and 'rejected', like Cart.apply_changes
+        """
+        quantities = {}
+        rejected = []
+        for product_id, quantity in changes:
+            line = GuestCart._line(product_id, quantity)
+            if line is None:
+                rejected.append({'product_id': product_id, 'reason': 'not_found'})
+            else:
+                quantities[line[0]] = max(line[1], 0)  # Below 1 removes the line, as in Cart
+        
+        lines = GuestCart._lines()
+        products = Product.get_many(product_id for product_id, quantity in quantities.items() if quantity > 0)
+        for product_id, quantity in quantities.items():
+            if quantity == 0:
+                lines.pop(product_id, None)
+            elif product_id not in products:
+                rejected.append({'product_id': product_id, 'reason': 'not_found'})
+            elif products[product_id].stock_quantity < quantity:
+                rejected.append({'product_id': product_id, 'reason': 'insufficient_stock'})
+            elif product_id in lines or len(lines) < Config.GUEST_CART_MAX_LINES:
+                lines[product_id] = quantity
+            else:
+                rejected.append({'product_id': product_id, 'reason': 'cart_full'})
+        
+        GuestCart._save(lines)
+        return {'items': GuestCart.get_cart_items(), 'rejected': rejected}
+    
+    @staticmethod
+    def update_cart_item(product_id, quantity):
+        """
+        Set one line's quantity (0 removes it); stock is checked by the caller
+        Returns: True on success, False for a full cart or an invalid line
+        """
+        line = GuestCart._line(product_id, quantity)
+        if line is None or line[1] < 0:
+            return False
+        product_id, quantity = line
+        
+        lines = GuestCart._lines()
+        if quantity > 0:
+            if product_id not in lines and len(lines) >= Config.GUEST_CART_MAX_LINES:
+                return False
+            lines[product_id] = quantity
+        else:
+            lines.pop(product_id, None)
+        GuestCart._save(lines)
+        return True
+    
+    @staticmethod
+    def remove_from_cart(product_id):
+        """Remove a line from the guest cart"""
+        return GuestCart.update_cart_item(product_id, 0)
+    
+    @staticmethod
+    def clear_cart():
+        """Empty the guest cart"""
+        session.pop(GuestCart.SESSION_KEY, None)
+    
+    @staticmethod
+    def get_cart_count():
+        """Total number of items in the guest cart"""
+        return sum(GuestCart._lines().values())
+    
+    @staticmethod
+    def merge_into(user_id):
+        """
+        Move the guest cart into a user's cart at login
+        Returns: True if there was nothing to merge or the merge succeeded
+        """
+        lines = GuestCart._lines()
+        if not lines:
+            return True
+        if not Cart.merge_items(user_id, lines.items()):
+            return False  # Keep the guest cart so nothing is lost
+        GuestCart.clear_cart()
+        return True
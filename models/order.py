@@ -1,8 +1,49 @@
 """
 Order model for handling order-related database operations
 """
-from .database import execute_query
-from datetime import datetime
+from flask import has_request_context, session
+from mysql.connector import Error, IntegrityError, errorcode
+from config import Config
+from .database import execute_query, execute_write, execute_many, transaction, db_now, StreamedRows
+from utils.cache import TTLCache
+from utils.pricing import price_cart
+from datetime import timedelta
+import time
+
+def _delete_in_batches(query, params, cutoff, batch_size=None, pause=None):
+    """
+    Run a DELETE ... LIMIT %s until it deletes fewer rows than the limit
+    Each batch is its own short transaction, with a pause between batches,
+    so locks stay brief and replicas keep up.
+    Args:
+        query: DELETE statement ending in LIMIT %s
+        params: Parameters before the limit
+        cutoff: The age cutoff the query uses, reported back
+        batch_size: Rows deleted per batch (default: Config.CART_PURGE_BATCH_SIZE)
+        pause: Seconds to sleep between batches (default: Config.CART_PURGE_PAUSE_SECONDS)
+    Returns: dict with 'rows_deleted', 'batches', 'cutoff' and 'seconds'
+    """
+    batch_size = batch_size or Config.CART_PURGE_BATCH_SIZE
+    pause = pause if pause is not None else Config.CART_PURGE_PAUSE_SECONDS
+    
+    started = time.monotonic()
+    rows_deleted = 0
+    batches = 0
+    while True:
+        with transaction() as tx:
+            deleted = tx.execute(query, params + (batch_size,))
+        batches += 1
+        rows_deleted += deleted
+        if deleted < batch_size:
+            break
+        time.sleep(pause)
+    
+    return {
+        'rows_deleted': rows_deleted,
+        'batches': batches,
+        'cutoff': cutoff,
+        'seconds': time.monotonic() - started
+    }
 
 class Order:
     """Order model class"""
@@ -20,14 +61,19 @@ class Order:
         self.items = items or []
     
     @staticmethod
-    def create_order(user_id, cart_items, shipping_address, payment_method='cash_on_delivery'):
+    def create_order(user_id, cart_items, shipping_address, payment_method='cash_on_delivery',
+                     first_name=None, last_name=None, email=None, phone=None):
         """
-        Create a new order from cart items
+        Create a new order from cart items and clear the cart
+        Runs on one connection: the order id comes from the INSERT's cursor,
+        items are inserted in one batch and the cart is cleared once. Called
+        inside an outer transaction() it joins that transaction.
         Args:
             user_id: ID of the user placing the order
             cart_items: List of cart items with product details
             shipping_address: Delivery address
             payment_method: Payment method (default: cash_on_delivery)
+            first_name, last_name, email, phone: Checkout contact details (optional)
         Returns: Order ID if successful, None if failed
         """
         # Calculate total amount (convert Decimal to float for calculations)
@@ -35,33 +81,119 @@ class Order:
         
         # Create order
         order_query = """
-        INSERT INTO orders (user_id, total_amount, status, shipping_address, payment_method)
-        VALUES (%s, %s, %s, %s, %s)
+        INSERT INTO orders (user_id, total_amount, status, shipping_address, payment_method,
+                            first_name, last_name, email, phone)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
-        order_params = (user_id, total_amount, 'pending', shipping_address, payment_method)
+        order_params = (user_id, total_amount, 'pending', shipping_address, payment_method,
+                        first_name, last_name, email, phone)
         
-        if execute_query(order_query, order_params):
-            # Get the created order ID
-            order_id_query = "SELECT LAST_INSERT_ID() as order_id"
-            result = execute_query(order_id_query, fetch=True)
-            
-            if result:
-                order_id = result[0]['order_id'] if isinstance(result, list) else result['order_id']
+        item_query = """
+        INSERT INTO order_items (order_id, product_id, quantity, price)
+        VALUES (%s, %s, %s, %s)
+        """
+        
+        try:
+            # Order, items and cart clear commit together or not at all
+            with transaction() as tx:
+                tx.execute(order_query, order_params)
+                order_id = tx.lastrowid
                 
-                # Insert order items
-                for item in cart_items:
-                    item_query = """
-                    INSERT INTO order_items (order_id, product_id, quantity, price)
-                    VALUES (%s, %s, %s, %s)
-                    """
-                    item_params = (order_id, item['product_id'], item['quantity'], item['price'])
-                    execute_query(item_query, item_params)
+                # Insert all order items in one batch
+                tx.execute_many(item_query, [
+                    (order_id, item['product_id'], item['quantity'], item['price'])
+                    for item in cart_items
+                ])
                 
                 # Clear user's cart
                 Cart.clear_cart(user_id)
-                
-                return order_id
-        return None
+            
+            return order_id
+        except Error as e:
+            print(f"Failed to create order: {e}")
+            return None
+    
+    @staticmethod
+    def record_request_key(user_id, request_key, order_id):
+        """
+        Store the checkout form's idempotency key with the order it placed
+        Call inside the order's transaction: if the key was already used the
+        INSERT fails on the primary key and the whole order rolls back.
+        Raises: mysql.connector.IntegrityError for a key that was already used
+        """
+        query = """
+        INSERT INTO idempotency_keys (user_id, idempotency_key, order_id)
+        VALUES (%s, %s, %s)
+        """
+        with transaction() as tx:
+            tx.execute(query, (user_id, request_key, order_id))
+    
+    @staticmethod
+    def find_by_request_key(user_id, request_key, on_primary=False):
+        """
+        Order already placed with a checkout form's idempotency key
+        Args:
+            user_id: ID of the user submitting the form
+            request_key: Idempotency key from the checkout form
+            on_primary: Read the primary rather than a replica, for a key
+                another request committed a moment ago
+        Returns: order ID, or None if the key has not placed an order
+        """
+        cache_key = (user_id, request_key)
+        order_id = placed_orders.peek(cache_key)
+        if order_id:
+            return order_id
+        
+        query = "SELECT order_id FROM idempotency_keys WHERE user_id = %s AND idempotency_key = %s"
+        params = (user_id, request_key)
+        if on_primary:
+            try:
+                with transaction() as tx:
+                    result = tx.execute(query, params, fetch=True)
+            except Error as e:
+                print(f"Failed to read idempotency key: {e}")
+                return None
+        else:
+            result = execute_query(query, params, fetch=True)
+        
+        if not result:
+            return None
+        # Only hits are cached; a miss may become an order a moment later
+        return placed_orders.get_or_load(cache_key, lambda: result[0]['order_id'])
+    
+    @staticmethod
+    def remember_request_key(user_id, request_key, order_id):
+        """Cache a committed key's order so retries to this worker skip the database"""
+        placed_orders.get_or_load((user_id, request_key), lambda: order_id)
+    
+    @staticmethod
+    def purge_request_keys(days=None, batch_size=None, pause=None):
+        """
+        Delete checkout idempotency keys too old for their form to be resubmitted
+        Batched like Cart.purge_abandoned, so it is safe on a live site.
+        Args:
+            days: Age in days after which a key is deleted (default: Config.IDEMPOTENCY_KEY_DAYS)
+            batch_size: Rows deleted per batch (default: Config.CART_PURGE_BATCH_SIZE)
+            pause: Seconds to sleep between batches (default: Config.CART_PURGE_PAUSE_SECONDS)
+        Returns: dict with 'rows_deleted', 'batches', 'cutoff' and 'seconds'
+        Raises: mysql.connector.Error if a batch fails (earlier batches stay deleted)
+        """
+        days = days if days is not None else Config.IDEMPOTENCY_KEY_DAYS
+        cutoff = db_now() - timedelta(days=days)
+        
+        # idx_idempotency_created_at serves both the filter and the ORDER BY
+        query = """
+        DELETE FROM idempotency_keys
+        WHERE created_at < %s
+        ORDER BY created_at, user_id, idempotency_key
+        LIMIT %s
+        """
+        return _delete_in_batches(query, (cutoff,), cutoff, batch_size, pause)
+    
+    @staticmethod
+    def is_duplicate_request(error):
+        """True if error is record_request_key() finding the key already used"""
+        return isinstance(error, IntegrityError) and error.errno == errorcode.ER_DUP_ENTRY
     
     @staticmethod
     def get_by_id(order_id):
@@ -141,8 +273,8 @@ class Order:
         return []
     
     @staticmethod
-    def get_all_orders(limit=None, status=None):
-        """Get all orders for admin panel"""
+    def _all_orders_query(status=None):
+        """Build the admin order listing query and its parameters"""
         query = """
         SELECT o.*, u.username, u.first_name, u.last_name, COUNT(oi.id) as item_count
         FROM orders o
@@ -156,6 +288,29 @@ class Order:
             params.append(status)
         
         query += " GROUP BY o.id ORDER BY o.created_at DESC"
+        return query, params
+    
+    @staticmethod
+    def _from_admin_row(row):
+        """Build an Order with customer info from an admin listing row"""
+        order = Order(
+            id=row['id'],
+            user_id=row['user_id'],
+            total_amount=float(row['total_amount']),
+            status=row['status'],
+            shipping_address=row['shipping_address'],
+            payment_method=row['payment_method'],
+            created_at=row['created_at']
+        )
+        order.username = row['username']
+        order.customer_name = f"{row['first_name']} {row['last_name']}"
+        order.item_count = row['item_count']
+        return order
+    
+    @staticmethod
+    def get_all_orders(limit=None, status=None):
+        """Get all orders for admin panel"""
+        query, params = Order._all_orders_query(status)
         
         if limit:
             query += " LIMIT %s"
@@ -164,24 +319,28 @@ class Order:
         results = execute_query(query, params, fetch=True)
         
         if results:
-            orders = []
-            for row in results:
-                order = Order(
-                    id=row['id'],
-                    user_id=row['user_id'],
-                    total_amount=float(row['total_amount']),
-                    status=row['status'],
-                    shipping_address=row['shipping_address'],
-                    payment_method=row['payment_method'],
-                    created_at=row['created_at']
-                )
-                order.username = row['username']
-                order.customer_name = f"{row['first_name']} {row['last_name']}"
-                order.item_count = row['item_count']
-                orders.append(order)
-            return orders
+            return [Order._from_admin_row(row) for row in results]
         return []
     
+    @staticmethod
+    def stream_all_orders(status=None):
+        """
+        Get all orders for admin panel without loading them into memory
+        Returns: StreamedRows yielding Order objects
+        """
+        query, params = Order._all_orders_query(status)
+        return StreamedRows(query, params, transform=Order._from_admin_row)
+    
+    @staticmethod
+    def count_by_status():
+        """Get order counts per status (plus 'all') with one grouped query"""
+        query = "SELECT status, COUNT(*) as count FROM orders GROUP BY status"
+        results = execute_query(query, fetch=True) or []
+        
+        counts = {row['status']: row['count'] for row in results}
+        counts['all'] = sum(counts.values())
+        return counts
+    
     def update_status(self, new_status):
         """Update order status"""
         valid_statuses = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
@@ -212,36 +371,137 @@ class Order:
 class Cart:
     """Cart model for shopping cart operations"""
     
+    # Session key holding [user_id, item count, counted at] for the logged-in user's cart
+    SESSION_COUNT_KEY = '_cart_count'
+    
+    @staticmethod
+    def _remember_count(user_id, count):
+        """Keep the cart count in the session when it belongs to the current user"""
+        if has_request_context() and session.get('user_id') == user_id:
+            session[Cart.SESSION_COUNT_KEY] = [user_id, count, time.time()]
+    
+    @staticmethod
+    def _forget_count(user_id):
+        """Drop the session's cart count so the next read recounts"""
+        if has_request_context() and session.get('user_id') == user_id:
+            session.pop(Cart.SESSION_COUNT_KEY, None)
+    
+    @staticmethod
+    def _write(user_id, query, params):
+        """
+        Run one cart statement and drop the session's cart count
+        Returns: True on success, None on error
+        """
+        Cart._forget_count(user_id)
+        return execute_query(query, params)
+    
     @staticmethod
     def add_to_cart(user_id, product_id, quantity=1):
-        """Add product to cart or update quantity if already exists"""
-        # Check if item already in cart
-        check_query = "SELECT quantity FROM cart WHERE user_id = %s AND product_id = %s"
-        existing = execute_query(check_query, (user_id, product_id), fetch=True)
+        """
+        Add product to cart or increase its quantity if already there
+        One upsert writes the line only while the product is active and has
+        stock for the new line quantity, then one read returns the product
+        name and cart total. Both run in autocommit on the request's primary
+        connection, which sees its own write: two round-trips.
+        Returns: dict with 'added', 'product_name' (None if no such product)
+                 and 'cart_count', or None on error
+        """
+        upsert_query = """
+        INSERT INTO cart (user_id, product_id, quantity)
+        SELECT %s, p.id, %s
+        FROM products p
+        LEFT JOIN cart c ON c.user_id = %s AND c.product_id = p.id
+        WHERE p.id = %s AND p.is_active = TRUE
+          AND p.stock_quantity >= COALESCE(c.quantity, 0) + %s
+        ON DUPLICATE KEY UPDATE cart.quantity = cart.quantity + VALUES(quantity)
+        """
+        summary_query = """
+        SELECT (SELECT name FROM products WHERE id = %s AND is_active = TRUE) AS product_name,
+               (SELECT COALESCE(SUM(quantity), 0) FROM cart WHERE user_id = %s) AS cart_count
+        """
+        added = execute_write(upsert_query, (user_id, quantity, user_id, product_id, quantity))
+        summary = execute_query(summary_query, (product_id, user_id), fetch=True) if added is not None else None
+        if not summary:
+            print("Error adding to cart")
+            Cart._forget_count(user_id)
+            return None
+        summary = summary[0]
         
-        if existing:
-            # Update quantity
-            current_qty = existing[0]['quantity'] if isinstance(existing, list) else existing['quantity']
-            new_quantity = current_qty + quantity
-            update_query = "UPDATE cart SET quantity = %s WHERE user_id = %s AND product_id = %s"
-            return execute_query(update_query, (new_quantity, user_id, product_id))
-        else:
-            # Add new item
-            insert_query = "INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)"
-            return execute_query(insert_query, (user_id, product_id, quantity))
+        cart_count = int(summary['cart_count'] or 0)
+        Cart._remember_count(user_id, cart_count)
+        return {
+            'added': added > 0,
+            'product_name': summary['product_name'],
+            'cart_count': cart_count
+        }
+    
+    ITEMS_QUERY = """
+    SELECT c.*, p.name, p.price, p.image_url, p.stock_quantity,
+           (c.quantity * p.price) as subtotal
+    FROM cart c
+    JOIN products p ON c.product_id = p.id
+    WHERE c.user_id = %s AND p.is_active = TRUE
+    ORDER BY c.created_at DESC
+    """
     
     @staticmethod
     def get_cart_items(user_id):
         """Get all items in user's cart"""
-        query = """
-        SELECT c.*, p.name, p.price, p.image_url, p.stock_quantity,
-               (c.quantity * p.price) as subtotal
-        FROM cart c
-        JOIN products p ON c.product_id = p.id
-        WHERE c.user_id = %s AND p.is_active = TRUE
-        ORDER BY c.created_at DESC
+        return execute_query(Cart.ITEMS_QUERY, (user_id,), fetch=True) or []
+    
+    # Summarises a cart's lines; any added, removed or re-quantified line
+    # changes the result, so it identifies the cart's current contents
+    FINGERPRINT_QUERY = """
+    SELECT COUNT(*) AS line_count,
+           COALESCE(SUM(quantity), 0) AS item_count,
+           COALESCE(BIT_XOR(CRC32(CONCAT_WS(':', product_id, quantity))), 0) AS checksum
+    FROM cart
+    WHERE user_id = %s
+    """
+    
+    @staticmethod
+    def _fingerprint(user_id):
+        """
+        Current contents of a user's cart as a hashable value
+        Returns: (line_count, item_count, checksum) or None if it could not be read
+        """
+        result = execute_query(Cart.FINGERPRINT_QUERY, (user_id,), fetch=True)
+        if not result:
+            return None
+        row = result[0]
+        return (int(row['line_count']), int(row['item_count']), int(row['checksum']))
+    
+    @staticmethod
+    def get_snapshot(user_id):
+        """
+        Priced cart for a user, shared until the cart changes
+        Snapshots are cached per (user, cart fingerprint), so the cart page,
+        checkout and order placement reuse one computation; each costs one
+        indexed read of the user's cart rows. Cart writes need no extra
+        statement to invalidate them. Prices are as of when the snapshot was
+        made; place_order re-prices inside its transaction. Treat the result
+        as read-only.
+        Returns: dict from price_cart() (items, subtotal, tax, shipping, total)
+                 plus 'version' (the fingerprint)
         """
-        return execute_query(query, (user_id,), fetch=True) or []
+        version = Cart._fingerprint(user_id)
+        if version is not None:
+            # The fingerprint is a fresh read, so it also corrects the session's badge count
+            Cart._remember_count(user_id, version[1])
+        
+        def load():
+            items = execute_query(Cart.ITEMS_QUERY, (user_id,), fetch=True)
+            if items is None:
+                raise Error(msg="Could not load cart items")
+            return dict(price_cart(items), version=version)
+        
+        try:
+            if version is None:
+                return load()  # Without a version the snapshot cannot be shared
+            return cart_snapshots.get_or_load((user_id, version), load)
+        except Error as e:
+            print(f"Error loading cart: {e}")
+            return dict(price_cart([]), version=None)
     
     @staticmethod
     def update_cart_item(user_id, product_id, quantity):
@@ -250,19 +510,139 @@ class Cart:
             return Cart.remove_from_cart(user_id, product_id)
         
         query = "UPDATE cart SET quantity = %s WHERE user_id = %s AND product_id = %s"
-        return execute_query(query, (quantity, user_id, product_id))
+        return Cart._write(user_id, query, (quantity, user_id, product_id))
+    
+    @staticmethod
+    def apply_changes(user_id, changes):
+        """
+        Set the quantities of several cart lines in one transaction
+        Stock for every line is checked with one query; lines that fail are
+        skipped and reported, the rest are applied together.
+        Args:
+            user_id: Cart owner
+            changes: iterable of (product_id, quantity); quantity 0 removes
+                the line and the last change for a product wins
+        Returns: dict with 'items' (the recomputed cart) and 'rejected'
+                 (dicts with 'product_id' and 'reason': 'not_found' or
+                 'insufficient_stock'), or None on error
+        """
+        quantities = {}
+        for product_id, quantity in changes:
+            quantities[product_id] = max(quantity, 0)
+        
+        rejected = []
+        try:
+            with transaction() as tx:
+                wanted = [product_id for product_id, quantity in quantities.items() if quantity > 0]
+                stock = {}
+                if wanted:
+                    placeholders = ', '.join(['%s'] * len(wanted))
+                    rows = tx.execute(f"""
+                    SELECT id, stock_quantity FROM products
+                    WHERE id IN ({placeholders}) AND is_active = TRUE
+                    """, wanted, fetch=True)
+                    stock = {row['id']: row['stock_quantity'] for row in rows}
+                
+                upserts = []
+                for product_id in wanted:
+                    if product_id not in stock:
+                        rejected.append({'product_id': product_id, 'reason': 'not_found'})
+                    elif stock[product_id] < quantities[product_id]:
+                        rejected.append({'product_id': product_id, 'reason': 'insufficient_stock'})
+                    else:
+                        upserts.append((user_id, product_id, quantities[product_id]))
+                
+                removals = [product_id for product_id, quantity in quantities.items() if quantity == 0]
+                if removals:
+                    placeholders = ', '.join(['%s'] * len(removals))
+                    tx.execute(f"DELETE FROM cart WHERE user_id = %s AND product_id IN ({placeholders})",
+                               [user_id] + removals)
+                
+                tx.execute_many("""
+                INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE quantity = VALUES(quantity)
+                """, upserts)
+                
+                items = Cart.get_cart_items(user_id)
+        except Error as e:
+            print(f"Error updating cart: {e}")
+            Cart._forget_count(user_id)
+            return None
+        
+        Cart._remember_count(user_id, sum(item['quantity'] for item in items))
+        return {'items': items, 'rejected': rejected}
+    
+    @staticmethod
+    def merge_items(user_id, lines):
+        """
+        Add several products to a user's cart with one bulk upsert
+        Used to move a guest cart into the cart table at login; quantities
+        add to any lines already there.
+        Args: lines - iterable of (product_id, quantity)
+        Returns: True on success, False on error
+        """
+        rows = [(user_id, product_id, quantity) for product_id, quantity in lines if quantity > 0]
+        query = """
+        INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+        """
+        if not rows:
+            return True
+        
+        Cart._forget_count(user_id)
+        return execute_many(query, rows) is not None
     
     @staticmethod
     def remove_from_cart(user_id, product_id):
         """Remove item from cart"""
         query = "DELETE FROM cart WHERE user_id = %s AND product_id = %s"
-        return execute_query(query, (user_id, product_id))
+        return Cart._write(user_id, query, (user_id, product_id))
     
     @staticmethod
     def clear_cart(user_id):
         """Clear all items from user's cart"""
         query = "DELETE FROM cart WHERE user_id = %s"
-        return execute_query(query, (user_id,))
+        return Cart._write(user_id, query, (user_id,))
+    
+    @staticmethod
+    def purge_abandoned(days=None, batch_size=None, pause=None):
+        """
+        Delete carts nobody has touched for a number of days, in small batches
+        A cart counts as abandoned when none of its lines changed since the
+        cutoff. Each batch is its own short transaction of at most batch_size
+        rows, with a pause between batches, so locks stay brief and replicas
+        keep up. Cached cart snapshots are keyed by the cart's contents, so
+        purged carts stop being served without any invalidation.
+        Args:
+            days: Age in days after which a cart is abandoned (default: Config.CART_ABANDONED_DAYS)
+            batch_size: Rows deleted per batch (default: Config.CART_PURGE_BATCH_SIZE)
+            pause: Seconds to sleep between batches (default: Config.CART_PURGE_PAUSE_SECONDS)
+        Returns: dict with 'rows_deleted', 'batches', 'cutoff' and 'seconds'
+        Raises: mysql.connector.Error if a batch fails (earlier batches stay deleted)
+        """
+        days = days if days is not None else Config.CART_ABANDONED_DAYS
+        
+        # Fixed for the whole run, so the loop ends even while shoppers keep adding
+        cutoff = db_now() - timedelta(days=days)
+        
+        # DISTINCT keeps the derived table materialised, which MySQL needs to
+        # read the table it deletes from. ORDER BY makes each batch delete the
+        # same rows on replicas (DELETE ... LIMIT is otherwise unsafe for
+        # statement-based replication); idx_cart_updated_at serves it, since
+        # InnoDB secondary indexes end with the primary key.
+        query = """
+        DELETE FROM cart
+        WHERE updated_at < %s
+          AND user_id NOT IN (
+              SELECT user_id FROM (
+                  SELECT DISTINCT user_id FROM cart WHERE updated_at >= %s
+              ) AS active_carts
+          )
+        ORDER BY updated_at, id
+        LIMIT %s
+        """
+        
+        return _delete_in_batches(query, (cutoff, cutoff), cutoff, batch_size, pause)
     
     @staticmethod
     def get_cart_count(user_id):
@@ -272,5 +652,35 @@ class Cart:
         
         if result:
             total = result[0]['total'] if isinstance(result, list) else result['total']
-            return total or 0
-        return 0
\ No newline at end of file
+            total = int(total or 0)
+            Cart._remember_count(user_id, total)
+            return total
+        return 0
+    
+    @staticmethod
+    def get_session_cart_count():
+        """
+        Cart count for the current visitor, counted at most once per change
+        The count is kept in the session and refreshed by this session's Cart
+        mutations and cart page views, so page renders normally cost no query.
+        It is recounted once older than Config.CART_COUNT_MAX_AGE, which picks
+        up changes made elsewhere (another device, an order, the purge job).
+        Guests get their session cart's count.
+        Returns: int
+        """
+        user_id = session.get('user_id')
+        if not user_id:
+            from .guest_cart import GuestCart
+            return GuestCart.get_cart_count()
+        
+        cached = session.get(Cart.SESSION_COUNT_KEY)
+        if (cached and len(cached) == 3 and cached[0] == user_id
+                and time.time() - cached[2] < Config.CART_COUNT_MAX_AGE):
+            return cached[1]
+        return Cart.get_cart_count(user_id)
+
+# Priced cart snapshots keyed by (user_id, cart fingerprint)
+cart_snapshots = TTLCache(ttl=Config.CART_SNAPSHOT_TTL, max_entries=Config.CART_SNAPSHOT_MAX_ENTRIES)
+
+# Orders placed per checkout idempotency key, keyed by (user_id, key)
+placed_orders = TTLCache(ttl=Config.IDEMPOTENCY_CACHE_TTL, max_entries=Config.IDEMPOTENCY_CACHE_MAX_ENTRIES)
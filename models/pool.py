@@ -0,0 +1,198 @@
+"""
+Thread-safe MySQL connection pool with overflow, checkout timeout and pre-ping
+"""
+import threading
+import time
+from collections import deque
+from mysql.connector import Error
+
+
+class PoolTimeoutError(Error):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class PooledConnection:
+    """
+    Proxy around a raw MySQL connection checked out from a ConnectionPool.
+    Everything is delegated to the underlying connection except close(),
+    which hands the connection back to the pool instead of disconnecting.
+    """
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Return the connection to its pool (safe to call more than once)"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.release(self._connection, self._created_at)
+
+    def discard(self):
+        """
+        Disconnect instead of returning the connection to its pool, for a
+        connection left in a state not worth recovering (e.g. a large unread
+        result); the pool opens a new one when needed
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.discard(self._connection)
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of MySQL connections that can temporarily grow by
+    max_overflow connections under load. Overflow connections are closed
+    when they are returned instead of being kept idle.
+    """
+
+    def __init__(self, connect, size=5, max_overflow=10, timeout=30,
+                 pre_ping=True, recycle=3600, name='primary'):
+        """
+        Args:
+            connect: Callable returning a new raw MySQL connection
+            size: Number of idle connections kept open
+            max_overflow: Extra connections allowed above size under load
+            timeout: Seconds to wait for a free connection before failing
+            pre_ping: Check idle connections are alive before handing them out
+            recycle: Reconnect connections older than this many seconds (0 = never)
+            name: Label used in statistics and error messages
+        """
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+        self.name = name
+
+        self._idle = deque()
+        self._checked_out = 0
+        self._condition = threading.Condition()
+        self._counters = {
+            'connects': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'invalidated': 0,
+            'discarded': 0
+        }
+
+    def acquire(self):
+        """
+        Check out a connection, waiting up to `timeout` seconds if the pool
+        and its overflow are exhausted
+        Returns: PooledConnection
+        Raises: PoolTimeoutError, mysql.connector.Error
+        """
+        deadline = time.monotonic() + self.timeout
+        raw, created_at = None, None
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    break
+                if self._checked_out < self.size + self.max_overflow:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        msg=f"Connection pool '{self.name}' exhausted "
+                            f"({self._checked_out} connections checked out)"
+                    )
+                self._counters['waits'] += 1
+                self._condition.wait(remaining)
+            self._checked_out += 1
+            self._counters['checkouts'] += 1
+
+        try:
+            if raw is not None and not self._is_usable(raw, created_at):
+                self._close_quietly(raw)
+                raw = None
+                with self._condition:
+                    self._counters['invalidated'] += 1
+            if raw is None:
+                raw = self._connect()
+                created_at = time.monotonic()
+                with self._condition:
+                    self._counters['connects'] += 1
+        except Exception:
+            with self._condition:
+                self._checked_out -= 1
+                self._condition.notify()
+            raise
+
+        return PooledConnection(self, raw, created_at)
+
+    def release(self, raw, created_at):
+        """Return a raw connection to the pool, discarding it if unusable or surplus"""
+        reusable = True
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except Error:
+            reusable = False
+
+        with self._condition:
+            self._checked_out -= 1
+            if reusable and len(self._idle) < self.size:
+                self._idle.append((raw, created_at))
+                raw = None
+            self._condition.notify()
+
+        if raw is not None:
+            self._close_quietly(raw)
+
+    def discard(self, raw):
+        """Close a checked-out raw connection and free its slot"""
+        with self._condition:
+            self._checked_out -= 1
+            self._counters['discarded'] += 1
+            self._condition.notify()
+        self._close_quietly(raw)
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        with self._condition:
+            in_use = self._checked_out
+            idle = len(self._idle)
+            stats = {
+                'name': self.name,
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'checked_out': in_use,
+                'idle': idle,
+                'overflow': max(0, in_use + idle - self.size)
+            }
+            stats.update(self._counters)
+        return stats
+
+    def dispose(self):
+        """Close every idle connection (checked-out connections are closed on release)"""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for raw, _ in idle:
+            self._close_quietly(raw)
+
+    def _is_usable(self, raw, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                return raw.is_connected()
+            except Error:
+                return False
+        return True
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Error:
+            pass
@@ -1,14 +1,46 @@
 """
 Product model for handling product-related database operations
 """
-from .database import execute_query
+import base64
+import json
+from datetime import datetime
+from mysql.connector import Error
+from config import Config
+from .database import execute_query, stream_query, transaction, TransactionRollback
+from .category import Category
+from .order import cart_snapshots
+from utils.search_index import SearchIndex
+from utils.autocomplete import AutocompleteIndex
+from utils.cache import TTLCache
+
+def _encode_cursor(*position):
+    """Opaque pagination token for a listing position"""
+    return base64.urlsafe_b64encode(json.dumps(position, default=str).encode()).decode().rstrip('=')
+
+def _decode_cursor(token):
+    """
+    Decode a pagination token
+    Returns: ('next' | 'prev', created_at, id) for the newest-first listing,
+    ('rank', offset) for search results, or None if the token is invalid
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))
+        if position[0] == 'rank':
+            return 'rank', max(int(position[1]), 0)
+        direction, created_at, product_id = position
+        if direction not in ('next', 'prev'):
+            return None
+        return direction, datetime.fromisoformat(created_at), int(product_id)
+    except (ValueError, TypeError, IndexError, KeyError):
+        return None
 
 class Product:
     """Product model class"""
     
     def __init__(self, id=None, name=None, description=None, price=None, 
                  stock_quantity=None, category_id=None, image_url=None, 
-                 is_active=True, category_name=None):
+                 is_active=True, category_name=None, created_at=None, updated_at=None):
         self.id = id
         self.name = name
         self.description = description
@@ -18,12 +50,47 @@ class Product:
         self.image_url = image_url
         self.is_active = is_active
         self.category_name = category_name
+        self.created_at = created_at
+        self.updated_at = updated_at
     
     @staticmethod
-    def get_all_products(limit=None, offset=None, category_id=None, search=None):
+    def _from_row(row):
+        """Build a Product from a products/categories join row"""
+        return Product(
+            id=row['id'],
+            name=row['name'],
+            description=row['description'],
+            price=float(row['price']),
+            stock_quantity=row['stock_quantity'],
+            category_id=row['category_id'],
+            image_url=row['image_url'],
+            is_active=row['is_active'],
+            category_name=row['category_name'],
+            created_at=row.get('created_at'),
+            updated_at=row.get('updated_at')
+        )
+    
+    @staticmethod
+    def get_all_products(limit=None, offset=None, category_id=None, search=None,
+                         after=None, before=None):
         """
         Get all active products with optional filtering and pagination
+        Products are ordered newest first by (created_at, id).
+        Args:
+            after: (created_at, id) - return products listed after this position
+            before: (created_at, id) - return products listed before this position
+        Prefer after/before over offset: they seek through the listing index
+        instead of scanning and discarding the skipped rows.
+        Searches are ranked by relevance (BM25) from the in-process search
+        index instead of scanning products with LIKE.
         """
+        if search:
+            product_ids = Product.search_ids(search, category_id=category_id)
+            start = offset or 0
+            product_ids = product_ids[start:start + limit] if limit else product_ids[start:]
+            products = Product.get_many(product_ids)
+            return [products[product_id] for product_id in product_ids if product_id in products]
+        
         query = """
         SELECT p.*, c.name as category_name 
         FROM products p 
@@ -37,13 +104,19 @@ class Product:
             query += " AND p.category_id = %s"
             params.append(category_id)
         
-        # Add search filter
-        if search:
-            query += " AND (p.name LIKE %s OR p.description LIKE %s)"
-            search_term = f"%{search}%"
-            params.extend([search_term, search_term])
+        # Add keyset position
+        if after:
+            query += " AND (p.created_at < %s OR (p.created_at = %s AND p.id < %s))"
+            params.extend([after[0], after[0], after[1]])
+        elif before:
+            query += " AND (p.created_at > %s OR (p.created_at = %s AND p.id > %s))"
+            params.extend([before[0], before[0], before[1]])
         
-        query += " ORDER BY p.created_at DESC"
+        # Walk backwards from a "before" position, then restore newest-first order
+        if before:
+            query += " ORDER BY p.created_at ASC, p.id ASC"
+        else:
+            query += " ORDER BY p.created_at DESC, p.id DESC"
         
         # Add pagination
         if limit:
@@ -56,23 +129,128 @@ class Product:
         results = execute_query(query, params, fetch=True)
         
         if results:
-            products = []
-            for row in results:
-                product = Product(
-                    id=row['id'],
-                    name=row['name'],
-                    description=row['description'],
-                    price=float(row['price']),
-                    stock_quantity=row['stock_quantity'],
-                    category_id=row['category_id'],
-                    image_url=row['image_url'],
-                    is_active=row['is_active'],
-                    category_name=row['category_name']
-                )
-                products.append(product)
+            products = [Product._from_row(row) for row in results]
+            if before:
+                products.reverse()
             return products
         return []
     
+    @staticmethod
+    def get_page(per_page, cursor=None, category_id=None, search=None):
+        """
+        Get one page of the product listing using cursor (keyset) pagination
+        Search results are ranked by relevance and paged by rank instead.
+        Args:
+            per_page: Number of products per page
+            cursor: Token from a previous page's next_cursor/prev_cursor, or None for the first page
+        Returns: dict with products, next_cursor and prev_cursor (None when there is no such page)
+        """
+        position = _decode_cursor(cursor) if cursor else None
+        
+        if search:
+            offset = position[1] if position and position[0] == 'rank' else 0
+            products = Product.get_all_products(limit=per_page + 1, offset=offset,
+                                                category_id=category_id, search=search)
+            return {
+                'products': products[:per_page],
+                'next_cursor': _encode_cursor('rank', offset + per_page) if len(products) > per_page else None,
+                'prev_cursor': _encode_cursor('rank', max(offset - per_page, 0)) if offset else None
+            }
+        
+        direction = position[0] if position and position[0] != 'rank' else None
+        seek = position[1:] if direction else None
+        
+        products = Product.get_all_products(
+            limit=per_page + 1,  # One extra row tells us whether another page exists
+            category_id=category_id,
+            after=seek if direction == 'next' else None,
+            before=seek if direction == 'prev' else None
+        )
+        
+        has_more = len(products) > per_page
+        if has_more:
+            # The extra row is the oldest one, or the newest one when walking backwards
+            products = products[1:] if direction == 'prev' else products[:-1]
+        
+        if direction == 'prev':
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, direction == 'next'
+        
+        first, last = (products[0], products[-1]) if products else (None, None)
+        return {
+            'products': products,
+            'next_cursor': _encode_cursor('next', last.created_at, last.id) if has_next and last else None,
+            'prev_cursor': _encode_cursor('prev', first.created_at, first.id) if has_prev and first else None
+        }
+    
+    @staticmethod
+    def _search_documents():
+        """Stream every product, active or not, for the search index (raises if the stream breaks)"""
+        return stream_query("SELECT id, name, description, category_id, is_active FROM products",
+                            raise_errors=True)
+    
+    @staticmethod
+    def search_ids(search, category_id=None, include_inactive=False, limit=None):
+        """
+        Rank products against a search string using the in-process index
+        Returns: list of product ids, most relevant first (at most limit)
+        """
+        return product_search_index.search(search, category_id=category_id,
+                                           include_inactive=include_inactive, limit=limit)
+    
+    @staticmethod
+    def _autocomplete_entries(product_id=None):
+        """
+        Stream active products with their units sold for the autocomplete index
+        Args: product_id - load just this product (optional)
+        """
+        query = """
+        SELECT p.id, p.name, p.price, p.image_url, p.stock_quantity,
+               c.name as category_name, COALESCE(sold.quantity, 0) as popularity
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        LEFT JOIN (
+            SELECT product_id, SUM(quantity) as quantity
+            FROM order_items
+            GROUP BY product_id
+        ) sold ON sold.product_id = p.id
+        WHERE p.is_active = TRUE
+        """
+        params = []
+        if product_id:
+            query += " AND p.id = %s"
+            params.append(product_id)
+        
+        for row in stream_query(query, params):
+            row['price'] = float(row['price'])
+            row['popularity'] = int(row['popularity'])
+            yield row
+    
+    @staticmethod
+    def autocomplete(search, limit=8):
+        """
+        Search-as-you-type suggestions answered from the in-memory prefix index
+        Returns: list of dicts with id, name, price, image_url, category_name and stock_quantity
+        """
+        return product_autocomplete.suggest(search, limit)
+    
+    @staticmethod
+    def _index_document(product_id, name, description, category_id, is_active):
+        product_search_index.add({
+            'id': product_id,
+            'name': name,
+            'description': description,
+            'category_id': category_id,
+            'is_active': is_active
+        })
+        
+        if is_active:
+            for entry in Product._autocomplete_entries(product_id):
+                product_autocomplete.add(entry)
+        else:
+            product_autocomplete.remove(product_id)
+    
     @staticmethod
     def get_by_id(product_id):
         """Get product by ID"""
@@ -86,35 +264,86 @@ class Product:
         
         if result:
             row = result[0] if isinstance(result, list) else result
-            return Product(
-                id=row['id'],
-                name=row['name'],
-                description=row['description'],
-                price=float(row['price']),
-                stock_quantity=row['stock_quantity'],
-                category_id=row['category_id'],
-                image_url=row['image_url'],
-                is_active=row['is_active'],
-                category_name=row['category_name']
-            )
+            return Product._from_row(row)
         return None
     
+    @staticmethod
+    def get_many(product_ids):
+        """
+        Get several active products with one query
+        Args: product_ids - iterable of product IDs (duplicates are ignored)
+        Returns: dict of product ID -> Product; missing or inactive products are absent
+        """
+        product_ids = list(dict.fromkeys(product_id for product_id in product_ids if product_id))
+        if not product_ids:
+            return {}
+        
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        query = f"""
+        SELECT p.*, c.name as category_name 
+        FROM products p 
+        LEFT JOIN categories c ON p.category_id = c.id 
+        WHERE p.id IN ({placeholders}) AND p.is_active = TRUE
+        """
+        results = execute_query(query, product_ids, fetch=True) or []
+        return {row['id']: Product._from_row(row) for row in results}
+    
+    @staticmethod
+    def get_related(product, limit=4):
+        """
+        "Customers also bought" products for a product page
+        Reads the precomputed related_products table (one indexed lookup) and
+        tops up with the newest products from the same category.
+        """
+        query = """
+        SELECT p.*, c.name as category_name 
+        FROM related_products r
+        JOIN products p ON p.id = r.related_id
+        LEFT JOIN categories c ON p.category_id = c.id 
+        WHERE r.product_id = %s AND p.is_active = TRUE
+        ORDER BY r.score DESC
+        LIMIT %s
+        """
+        results = execute_query(query, (product.id, limit), fetch=True) or []
+        related = [Product._from_row(row) for row in results]
+        
+        if len(related) < limit and product.category_id:
+            seen = {product.id} | {item.id for item in related}
+            neighbours = Product.get_all_products(category_id=product.category_id,
+                                                  limit=limit + len(seen))
+            related += [item for item in neighbours if item.id not in seen][:limit - len(related)]
+        
+        return related
+    
     @staticmethod
     def get_categories():
-        """Get all product categories"""
-        query = "SELECT * FROM categories ORDER BY name"
-        results = execute_query(query, fetch=True)
-        return results or []
+        """Get all product categories (from the cached category registry)"""
+        return Category.get_all()
     
     @staticmethod
     def create_product(name, description, price, stock_quantity, category_id, image_url=None):
-        """Create a new product"""
+        """
+        Create a new product
+        Returns: New product ID or None if failed
+        """
         query = """
         INSERT INTO products (name, description, price, stock_quantity, category_id, image_url)
         VALUES (%s, %s, %s, %s, %s, %s)
         """
         params = (name, description, price, stock_quantity, category_id, image_url)
-        return execute_query(query, params)
+        
+        try:
+            with transaction() as tx:
+                tx.execute(query, params)
+                product_id = tx.lastrowid
+                Category.refresh_product_counts([category_id])
+        except Error as e:
+            print(f"Error creating product: {e}")
+            return None
+        
+        Product._index_document(product_id, name, description, category_id, True)
+        featured_cache.invalidate()
+        return product_id
     
     def update(self):
         """Update product information"""
@@ -126,59 +355,168 @@ class Product:
         """
         params = (self.name, self.description, self.price, self.stock_quantity,
                  self.category_id, self.image_url, self.is_active, self.id)
-        return execute_query(query, params)
+        
+        try:
+            with transaction() as tx:
+                previous = tx.execute("SELECT category_id, is_active FROM products WHERE id = %s FOR UPDATE",
+                                      (self.id,), fetch=True)
+                tx.execute(query, params)
+                # Counts (and every worker's category cache) only change when the
+                # product moves category or is activated or deactivated; the old
+                # category loses it if it moved
+                changed = [row['category_id'] for row in previous
+                           if row['category_id'] != self.category_id
+                           or bool(row['is_active']) != bool(self.is_active)]
+                if changed:
+                    Category.refresh_product_counts(changed + [self.category_id])
+        except Error as e:
+            print(f"Error updating product: {e}")
+            return None
+        
+        Product._index_document(self.id, self.name, self.description,
+                                self.category_id, self.is_active)
+        featured_cache.invalidate()
+        cart_snapshots.invalidate()  # Cached carts show the old price; other workers expire theirs
+        return True
     
     def delete(self):
         """Soft delete product (set is_active to False)"""
         query = "UPDATE products SET is_active = FALSE WHERE id = %s"
-        return execute_query(query, (self.id,))
+        
+        try:
+            with transaction() as tx:
+                tx.execute(query, (self.id,))
+                Category.refresh_product_counts([self.category_id])
+        except Error as e:
+            print(f"Error deleting product: {e}")
+            return None
+        
+        product_search_index.set_active(self.id, False)
+        product_autocomplete.remove(self.id)
+        if Product._is_featured(self.id):
+            featured_cache.invalidate()
+        cart_snapshots.invalidate()
+        return True
     
     def update_stock(self, quantity_change):
         """
-        Update product stock quantity
+        Update product stock quantity atomically
         Args: quantity_change - positive to add stock, negative to reduce
+        Returns: True if applied, False if it would make stock negative
         """
-        new_quantity = self.stock_quantity + quantity_change
-        if new_quantity < 0:
+        query = """
+        UPDATE products SET stock_quantity = stock_quantity + %s
+        WHERE id = %s AND stock_quantity + %s >= 0
+        """
+        try:
+            with transaction() as tx:
+                updated = tx.execute(query, (quantity_change, self.id, quantity_change))
+        except Error as e:
+            print(f"Error updating stock: {e}")
+            return False
+        
+        if not updated:
             return False  # Cannot have negative stock
         
-        query = "UPDATE products SET stock_quantity = %s WHERE id = %s"
-        result = execute_query(query, (new_quantity, self.id))
+        new_quantity = self.stock_quantity + quantity_change
+        # Selling out removes a product from the featured set; restocking may add it
+        if (new_quantity <= 0 and Product._is_featured(self.id)) or \
+                (self.stock_quantity <= 0 and new_quantity > 0):
+            featured_cache.invalidate()
+        self.stock_quantity = new_quantity
+        return True
+    
+    @staticmethod
+    def decrement_stock(lines):
+        """
+        Take stock for several products at once, or not at all
+        Must run inside the caller's transaction(), together with the order
+        it belongs to. The rows are locked by one read and the short lines
+        are worked out from it; only when every line fits does one set-based
+        conditional UPDATE decrement them, so concurrent checkouts cannot
+        oversell.
+        Args: lines - iterable of (product_id, quantity)
+        Returns: (short, sold_out) - product IDs without enough stock (nothing
+                 is decremented unless this is empty), and product IDs this
+                 decrement sold out; pass sold_out to forget_sold_out() once
+                 the surrounding transaction has committed
+        Raises: TransactionRollback if the UPDATE did not decrement every
+                locked row, which rolls back the surrounding transaction
+        """
+        quantities = {}
+        for product_id, quantity in lines:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        if not quantities:
+            return [], []
+        
+        product_ids = list(quantities)
+        placeholders = ', '.join(['%s'] * len(product_ids))
         
-        if result:
-            self.stock_quantity = new_quantity
-            return True
-        return False
+        with transaction() as tx:
+            rows = tx.execute(f"""
+            SELECT id, stock_quantity FROM products
+            WHERE id IN ({placeholders}) AND is_active = TRUE
+            FOR UPDATE
+            """, product_ids, fetch=True)
+            stock = {row['id']: row['stock_quantity'] for row in rows}
+            
+            failed = [product_id for product_id, quantity in quantities.items()
+                      if stock.get(product_id, 0) < quantity]
+            if failed:
+                return failed, []
+            
+            cases = ' '.join(['WHEN %s THEN %s'] * len(product_ids))
+            case_params = [value for line in quantities.items() for value in line]
+            updated = tx.execute(f"""
+            UPDATE products
+            SET stock_quantity = stock_quantity - CASE id {cases} END
+            WHERE id IN ({placeholders}) AND stock_quantity >= CASE id {cases} END
+            """, case_params + product_ids + case_params)
+            if updated != len(product_ids):
+                raise TransactionRollback(f'Stock update changed {updated} of {len(product_ids)} products')
+        
+        sold_out = [product_id for product_id, quantity in quantities.items() if stock[product_id] == quantity]
+        return [], sold_out
+    
+    @staticmethod
+    def forget_sold_out(product_ids):
+        """
+        Refresh the featured products if any of these sold-out products is among them
+        Call after the stock change commits: a home page request served
+        before the commit would otherwise cache the old stock again.
+        """
+        if any(Product._is_featured(product_id) for product_id in product_ids):
+            featured_cache.invalidate()
+    
+    @staticmethod
+    def _is_featured(product_id):
+        """Whether the product is in any cached featured set"""
+        return any(product.id == product_id
+                   for products in featured_cache.values() for product in products)
     
     @staticmethod
     def get_featured_products(limit=8):
-        """Get featured products for home page"""
+        """
+        Get featured products for home page
+        Served from a short TTL cache; expiry under load triggers one query.
+        """
+        return list(featured_cache.get_or_load(limit, lambda: Product._load_featured_products(limit)))
+    
+    @staticmethod
+    def _load_featured_products(limit):
+        """Newest in-stock products"""
         query = """
         SELECT p.*, c.name as category_name 
         FROM products p 
         LEFT JOIN categories c ON p.category_id = c.id 
         WHERE p.is_active = TRUE AND p.stock_quantity > 0
-        ORDER BY p.created_at DESC 
+        ORDER BY p.created_at DESC, p.id DESC
         LIMIT %s
         """
         results = execute_query(query, (limit,), fetch=True)
         
         if results:
-            products = []
-            for row in results:
-                product = Product(
-                    id=row['id'],
-                    name=row['name'],
-                    description=row['description'],
-                    price=float(row['price']),
-                    stock_quantity=row['stock_quantity'],
-                    category_id=row['category_id'],
-                    image_url=row['image_url'],
-                    is_active=row['is_active'],
-                    category_name=row['category_name']
-                )
-                products.append(product)
-            return products
+            return [Product._from_row(row) for row in results]
         return []
     
     def to_dict(self):
@@ -193,4 +531,20 @@ class Product:
             'image_url': self.image_url,
             'is_active': self.is_active,
             'category_name': self.category_name
-        }
\ No newline at end of file
+        }
+
+# Process-wide search index; each worker refreshes its copy periodically
+product_search_index = SearchIndex(
+    loader=Product._search_documents,
+    field_weights={'name': 3, 'description': 1},
+    refresh_seconds=Config.SEARCH_INDEX_REFRESH_SECONDS
+)
+
+# Process-wide autocomplete trie, warmed on the first request served (see create_app)
+product_autocomplete = AutocompleteIndex(
+    loader=Product._autocomplete_entries,
+    refresh_seconds=Config.AUTOCOMPLETE_REFRESH_SECONDS
+)
+
+# Home page featured products, keyed by limit
+featured_cache = TTLCache(ttl=Config.FEATURED_CACHE_TTL)
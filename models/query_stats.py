@@ -0,0 +1,81 @@
+"""
+Per-request query instrumentation: timings, slow-query log and N+1 detection
+"""
+import re
+from collections import Counter
+from flask import g, has_app_context, request
+from config import Config
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w.])\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+
+def statement_shape(query):
+    """
+    Normalise a statement so calls differing only in parameters compare equal
+    e.g. "SELECT * FROM products WHERE id = %s" -> "SELECT * FROM products WHERE id = ?"
+    """
+    shape = _WHITESPACE.sub(' ', query).strip()
+    shape = _STRING_LITERAL.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    return _IN_LIST.sub('IN (...)', shape)
+
+def record_query(query, duration, rowcount):
+    """
+    Record one executed statement
+    Args:
+        query: SQL query string (parameters are never recorded)
+        duration: Execution time in seconds
+        rowcount: Rows returned or affected
+    """
+    duration_ms = duration * 1000
+    shape = statement_shape(query)
+
+    if Config.DB_SLOW_QUERY_MS and duration_ms >= Config.DB_SLOW_QUERY_MS:
+        print(f"Slow query ({duration_ms:.1f} ms, {rowcount} rows): {shape}")
+
+    if has_app_context():
+        queries = g.setdefault('_db_queries', [])
+        queries.append({
+            'statement': shape,
+            'duration_ms': duration_ms,
+            'rowcount': rowcount
+        })
+
+def get_request_queries():
+    """Statements recorded for the current request"""
+    if has_app_context():
+        return list(g.get('_db_queries', []))
+    return []
+
+def find_repeated_statements(queries, threshold=None):
+    """
+    Detect likely N+1 patterns: the same statement shape issued many times
+    Returns: dict of statement shape -> count for shapes at or above threshold
+    """
+    threshold = threshold or Config.DB_N_PLUS_ONE_THRESHOLD
+    counts = Counter(query['statement'] for query in queries)
+    return {shape: count for shape, count in counts.items() if count >= threshold}
+
+def init_app(app):
+    """Register the response hook that reports per-request query statistics"""
+
+    @app.after_request
+    def report_queries(response):
+        queries = g.get('_db_queries')
+        if not queries:
+            return response
+
+        for shape, count in find_repeated_statements(queries).items():
+            print(f"Possible N+1 in {request.endpoint}: {count}x {shape}")
+
+        if app.config.get('DB_QUERY_HEADERS'):
+            total_ms = sum(query['duration_ms'] for query in queries)
+            timing = f'db;dur={total_ms:.1f};desc="{len(queries)} queries"'
+            existing = response.headers.get('Server-Timing')
+            response.headers['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+            response.headers['X-DB-Queries'] = str(len(queries))
+
+        return response
@@ -1,13 +1,17 @@
 """
 Admin routes for managing products, orders, and users
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, stream_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from models.product import Product
+from models.category import Category
 from models.order import Order
 from models.user import User
-from models.database import execute_query
+from models.database import execute_query, get_pool_stats, stream_query, StreamedRows
 from routes.auth import admin_required
+from config import Config
 import os
+import csv
+import io
 from werkzeug.utils import secure_filename
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -19,23 +23,20 @@ def dashboard():
     # Get statistics
     stats = {}
     
-    # Total products
-    products = Product.get_all_products()
-    stats['total_products'] = len(products)
-    
-    # Total orders
-    orders = Order.get_all_orders()
-    stats['total_orders'] = len(orders)
-    
-    # Total users
-    user_query = "SELECT COUNT(*) as count FROM users"
-    user_result = execute_query(user_query, fetch=True)
-    stats['total_users'] = user_result[0]['count'] if user_result else 0
-    
-    # Total revenue
-    revenue_query = "SELECT SUM(total_amount) as revenue FROM orders WHERE status != 'cancelled'"
-    revenue_result = execute_query(revenue_query, fetch=True)
-    stats['total_revenue'] = float(revenue_result[0]['revenue']) if revenue_result and revenue_result[0]['revenue'] else 0
+    # Totals are aggregated in the database instead of loading every row
+    totals_query = """
+    SELECT
+        (SELECT COUNT(*) FROM products WHERE is_active = TRUE) as total_products,
+        (SELECT COUNT(*) FROM orders) as total_orders,
+        (SELECT COUNT(*) FROM users) as total_users,
+        (SELECT SUM(total_amount) FROM orders WHERE status != 'cancelled') as revenue
+    """
+    totals_result = execute_query(totals_query, fetch=True)
+    totals = totals_result[0] if totals_result else {}
+    stats['total_products'] = totals.get('total_products') or 0
+    stats['total_orders'] = totals.get('total_orders') or 0
+    stats['total_users'] = totals.get('total_users') or 0
+    stats['total_revenue'] = float(totals['revenue']) if totals.get('revenue') else 0
     
     # Recent orders
     recent_orders = Order.get_all_orders(limit=5)
@@ -49,12 +50,20 @@ def dashboard():
                          recent_orders=recent_orders,
                          low_stock_products=low_stock_products)
 
+@admin_bp.route('/api/db-stats')
+@admin_required
+def db_stats():
+    """Database connection pool statistics for monitoring (JSON)"""
+    return jsonify({'pools': get_pool_stats()})
+
 @admin_bp.route('/products')
 @admin_required
 def products():
     """Admin products management"""
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     search = request.args.get('search', '').strip()
+    per_page = Config.ADMIN_SEARCH_PER_PAGE
+    has_next = False
     
     # Get all products (including inactive ones for admin)
     query = """
@@ -65,21 +74,30 @@ def products():
     params = []
     
     if search:
-        query += " WHERE (p.name LIKE %s OR p.description LIKE %s)"
-        search_term = f"%{search}%"
-        params.extend([search_term, search_term])
-    
-    query += " ORDER BY p.created_at DESC"
+        # Rank matches with the search index, then list one page of them best
+        # first, so the IN list stays bounded (id 0 matches nothing)
+        ranked = Product.search_ids(search, include_inactive=True, limit=page * per_page + 1)
+        has_next = len(ranked) > page * per_page
+        product_ids = ranked[(page - 1) * per_page:page * per_page] or [0]
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        query += f" WHERE p.id IN ({placeholders}) ORDER BY FIELD(p.id, {placeholders})"
+        params.extend(product_ids + product_ids)
+    else:
+        query += " ORDER BY p.created_at DESC"
     
-    products_list = execute_query(query, params, fetch=True) or []
+    # Rows are streamed into the page as it renders
+    products_list = StreamedRows(query, params)
     
     # Get categories for dropdown
     categories = Product.get_categories()
     
-    return render_template('admin/products.html',
+    return stream_template('admin/products.html',
                          products=products_list,
                          categories=categories,
-                         search_query=search)
+                         search_query=search,
+                         page=page,
+                         has_prev=bool(search) and page > 1,
+                         has_next=has_next)
 
 @admin_bp.route('/products/add', methods=['GET', 'POST'])
 @admin_required
@@ -175,24 +193,58 @@ def delete_product(product_id):
 def orders():
     """Admin orders management"""
     status_filter = request.args.get('status')
-    page = request.args.get('page', 1, type=int)
     
-    orders_list = Order.get_all_orders(status=status_filter)
+    orders_list = Order.stream_all_orders(status=status_filter)
     
     # Get order status counts for filter tabs
-    status_counts = {}
-    all_orders = Order.get_all_orders()
-    status_counts['all'] = len(all_orders)
-    
+    status_counts = Order.count_by_status()
     for status in ['pending', 'processing', 'shipped', 'delivered', 'cancelled']:
-        status_orders = [o for o in all_orders if o.status == status]
-        status_counts[status] = len(status_orders)
+        status_counts.setdefault(status, 0)
     
-    return render_template('admin/orders.html',
+    return stream_template('admin/orders.html',
                          orders=orders_list,
                          status_filter=status_filter,
                          status_counts=status_counts)
 
+@admin_bp.route('/orders/export')
+@admin_required
+def export_orders():
+    """Export orders as CSV, streamed in chunks at constant memory"""
+    status_filter = request.args.get('status')
+    
+    query = """
+    SELECT o.id, o.created_at, u.username, o.first_name, o.last_name, o.email,
+           o.status, o.payment_method, o.total_amount
+    FROM orders o
+    JOIN users u ON o.user_id = u.id
+    """
+    params = []
+    
+    if status_filter:
+        query += " WHERE o.status = %s"
+        params.append(status_filter)
+    
+    query += " ORDER BY o.id"
+    
+    columns = ['id', 'created_at', 'username', 'first_name', 'last_name', 'email',
+               'status', 'payment_method', 'total_amount']
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in stream_query(query, params, chunks=True):
+            for row in rows:
+                writer.writerow([row[column] for column in columns])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+    
+    return Response(stream_with_context(generate()),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=orders.csv'})
+
 @admin_bp.route('/orders/<int:order_id>')
 @admin_required
 def order_detail(order_id):
@@ -244,9 +296,10 @@ def users():
     
     query += " ORDER BY created_at DESC"
     
-    users_list = execute_query(query, params, fetch=True) or []
+    # Rows are streamed into the page as it renders
+    users_list = StreamedRows(query, params)
     
-    return render_template('admin/users.html',
+    return stream_template('admin/users.html',
                          users=users_list,
                          search_query=search)
 
@@ -254,14 +307,9 @@ def users():
 @admin_required
 def categories():
     """Admin categories management"""
+    # Each category carries its maintained product_count
     categories_list = Product.get_categories()
     
-    # Get product count for each category
-    for category in categories_list:
-        count_query = "SELECT COUNT(*) as count FROM products WHERE category_id = %s AND is_active = TRUE"
-        count_result = execute_query(count_query, (category['id'],), fetch=True)
-        category['product_count'] = count_result[0]['count'] if count_result else 0
-    
     return render_template('admin/categories.html', categories=categories_list)
 
 @admin_bp.route('/categories/add', methods=['POST'])
@@ -275,8 +323,7 @@ def add_category():
         flash('Category name is required', 'error')
         return redirect(url_for('admin.categories'))
     
-    query = "INSERT INTO categories (name, description) VALUES (%s, %s)"
-    if execute_query(query, (name, description)):
+    if Category.create(name, description):
         flash('Category added successfully', 'success')
     else:
         flash('Failed to add category', 'error')
@@ -294,8 +341,7 @@ def edit_category(category_id):
         flash('Category name is required', 'error')
         return redirect(url_for('admin.categories'))
     
-    query = "UPDATE categories SET name = %s, description = %s WHERE id = %s"
-    if execute_query(query, (name, description, category_id)):
+    if Category.update(category_id, name, description):
         flash('Category updated successfully', 'success')
     else:
         flash('Failed to update category', 'error')
@@ -313,8 +359,7 @@ def delete_category(category_id):
     if result and result[0]['count'] > 0:
         return jsonify({'success': False, 'message': 'Cannot delete category with existing products'})
     
-    delete_query = "DELETE FROM categories WHERE id = %s"
-    if execute_query(delete_query, (category_id,)):
+    if Category.delete(category_id):
         return jsonify({'success': True, 'message': 'Category deleted successfully'})
     else:
         return jsonify({'success': False, 'message': 'Failed to delete category'})
\ No newline at end of file
@@ -4,6 +4,7 @@ Authentication routes for user login, registration, and session management
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from werkzeug.security import check_password_hash, generate_password_hash
 from models.user import User
+from models.guest_cart import GuestCart
 from models.database import execute_query
 
 # Use mock email service for testing (change to email_service for production)
@@ -37,6 +38,9 @@ def login():
             session['user_type'] = 'user'
             session.permanent = True
             
+            # Move anything added while browsing as a guest into the saved cart
+            GuestCart.merge_into(user_result.id)
+            
             flash(f'Welcome back, {user_result.first_name}!', 'success')
             
             # Redirect to intended page or home
@@ -1,34 +1,52 @@
 """
 Shopping cart routes for cart management, checkout, and order processing
 """
+import secrets
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from models.order import Cart, Order
+from models.guest_cart import GuestCart
 from models.product import Product
 from models.user import User
+from models.database import transaction, TransactionRollback
 from routes.auth import login_required
+from utils.pricing import price_cart
 
 cart_bp = Blueprint('cart', __name__)
 
+def _cart_snapshot():
+    """Priced cart for the current visitor; logged-in users' snapshots are cached"""
+    user_id = session.get('user_id')
+    if user_id:
+        return Cart.get_snapshot(user_id)
+    return price_cart(GuestCart.get_cart_items())
+
+def _as_int(value):
+    """Quantity or product id from a JSON body as an int, or None if it is not a number"""
+    if isinstance(value, bool):
+        return None  # int(True) would be 1
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _request_key():
+    """Idempotency key submitted with the checkout form, or None"""
+    key = (request.form.get('idempotency_key') or '').strip()
+    return key if 0 < len(key) <= 64 else None  # 64: the idempotency_keys column width
+
+def _totals(cart):
+    """Subtotal, tax, shipping and total of a priced cart"""
+    return {key: cart[key] for key in ('subtotal', 'tax', 'shipping', 'total')}
+
 @cart_bp.route('/cart')
-@login_required
 def view_cart():
     """Display shopping cart"""
     try:
-        user_id = session['user_id']
-        cart_items = Cart.get_cart_items(user_id)
-        
-        # Calculate totals (convert Decimal to float for calculations)
-        subtotal = sum(float(item['subtotal']) for item in cart_items)
-        tax = subtotal * 0.08  # 8% tax
-        shipping = 10.00 if subtotal > 0 else 0  # $10 shipping, free if empty cart
-        total = subtotal + tax + shipping
+        cart = _cart_snapshot()
         
         return render_template('cart.html',
-                             cart_items=cart_items,
-                             subtotal=subtotal,
-                             tax=tax,
-                             shipping=shipping,
-                             total=total)
+                             cart_items=cart['items'],
+                             **_totals(cart))
     except Exception as e:
         print(f"Database error in cart route: {e}")
         # If database fails, show empty cart
@@ -40,59 +58,64 @@ def view_cart():
                              total=0)
 
 @cart_bp.route('/api/cart/add', methods=['POST'])
-@login_required
 def add_to_cart():
     """Add product to cart (AJAX)"""
     try:
         data = request.get_json()
         product_id = data.get('product_id')
-        quantity = data.get('quantity', 1)
+        quantity = _as_int(data.get('quantity', 1))
         
         if not product_id:
             return jsonify({'success': False, 'message': 'Product ID required'})
         
-        # Validate product exists and is available
-        product = Product.get_by_id(product_id)
-        if not product:
+        if quantity is None or quantity < 1:
+            return jsonify({'success': False, 'message': 'Quantity must be at least 1'})
+        
+        user_id = session.get('user_id')
+        if user_id:
+            # Stock-checked upsert, then the new cart total: two round-trips
+            result = Cart.add_to_cart(user_id, product_id, quantity)
+        else:
+            # Guest carts stay in the session until login
+            result = GuestCart.add_to_cart(product_id, quantity)
+        if result is None:
+            return jsonify({'success': False, 'message': 'Failed to add to cart'})
+        
+        if not result['product_name']:
             return jsonify({'success': False, 'message': 'Product not found'})
         
-        if product.stock_quantity < quantity:
+        if not result['added']:
             return jsonify({'success': False, 'message': 'Insufficient stock'})
         
-        # Add to cart
-        user_id = session['user_id']
-        if Cart.add_to_cart(user_id, product_id, quantity):
-            # Get updated cart count
-            cart_count = Cart.get_cart_count(user_id)
-            return jsonify({
-                'success': True, 
-                'message': f'{product.name} added to cart',
-                'cart_count': cart_count
-            })
-        else:
-            return jsonify({'success': False, 'message': 'Failed to add to cart'})
+        return jsonify({
+            'success': True, 
+            'message': f'{result["product_name"]} added to cart',
+            'cart_count': result['cart_count']
+        })
             
     except Exception as e:
         return jsonify({'success': False, 'message': 'An error occurred'})
 
 @cart_bp.route('/api/cart/update', methods=['POST'])
-@login_required
 def update_cart():
     """Update cart item quantity (AJAX)"""
     try:
         data = request.get_json()
         product_id = data.get('product_id')
-        quantity = data.get('quantity', 0)
+        quantity = _as_int(data.get('quantity', 0))
         
         if not product_id:
             return jsonify({'success': False, 'message': 'Product ID required'})
         
-        user_id = session['user_id']
+        if quantity is None:
+            return jsonify({'success': False, 'message': 'Invalid quantity'})
+        
+        user_id = session.get('user_id')
         
         if quantity <= 0:
             # Remove item from cart
-            if Cart.remove_from_cart(user_id, product_id):
-                cart_count = Cart.get_cart_count(user_id)
+            if Cart.remove_from_cart(user_id, product_id) if user_id else GuestCart.remove_from_cart(product_id):
+                cart_count = Cart.get_session_cart_count()
                 return jsonify({
                     'success': True, 
                     'message': 'Item removed from cart',
@@ -102,8 +125,9 @@ def update_cart():
             # Validate stock
             product = Product.get_by_id(product_id)
             if product and product.stock_quantity >= quantity:
-                if Cart.update_cart_item(user_id, product_id, quantity):
-                    cart_count = Cart.get_cart_count(user_id)
+                if Cart.update_cart_item(user_id, product_id, quantity) if user_id \
+                        else GuestCart.update_cart_item(product_id, quantity):
+                    cart_count = Cart.get_session_cart_count()
                     return jsonify({
                         'success': True, 
                         'message': 'Cart updated',
@@ -117,8 +141,57 @@ def update_cart():
     except Exception as e:
         return jsonify({'success': False, 'message': 'An error occurred'})
 
+@cart_bp.route('/api/cart/batch', methods=['POST'])
+def batch_update_cart():
+    """Apply several cart quantity changes at once and return the whole cart (AJAX)"""
+    try:
+        data = request.get_json() or {}
+        operations = data.get('operations') or []
+        
+        changes = []
+        for operation in operations:
+            # Ids as ints, as GuestCart stores them: the stock lookup is keyed by int
+            product_id = _as_int(operation.get('product_id'))
+            quantity = operation.get('quantity')
+            if not product_id or isinstance(quantity, bool) or not isinstance(quantity, int):
+                return jsonify({'success': False, 'message': 'Each operation needs product_id and quantity'})
+            changes.append((product_id, quantity))
+        
+        if not changes:
+            return jsonify({'success': False, 'message': 'No cart changes given'})
+        
+        user_id = session.get('user_id')
+        if user_id:
+            result = Cart.apply_changes(user_id, changes)
+        else:
+            result = GuestCart.apply_changes(changes)
+        if result is None:
+            return jsonify({'success': False, 'message': 'Failed to update cart'})
+        
+        messages = {'not_found': 'Product not found', 'insufficient_stock': 'Insufficient stock',
+                    'cart_full': 'Your cart is full'}
+        items = [{
+            'product_id': item['product_id'],
+            'name': item['name'],
+            'quantity': item['quantity'],
+            'price': float(item['price']),
+            'subtotal': float(item['subtotal']),
+            'stock_quantity': item['stock_quantity']
+        } for item in result['items']]
+        
+        return jsonify({
+            'success': True,
+            'message': 'Cart updated',
+            'cart': {'items': items, **_totals(price_cart(result['items']))},
+            'cart_count': sum(item['quantity'] for item in items),
+            'rejected': [{'product_id': rejected['product_id'], 'message': messages[rejected['reason']]}
+                         for rejected in result['rejected']]
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'An error occurred'})
+
 @cart_bp.route('/api/cart/remove', methods=['POST'])
-@login_required
 def remove_from_cart():
     """Remove item from cart (AJAX)"""
     try:
@@ -128,10 +201,10 @@ def remove_from_cart():
         if not product_id:
             return jsonify({'success': False, 'message': 'Product ID required'})
         
-        user_id = session['user_id']
+        user_id = session.get('user_id')
         
-        if Cart.remove_from_cart(user_id, product_id):
-            cart_count = Cart.get_cart_count(user_id)
+        if Cart.remove_from_cart(user_id, product_id) if user_id else GuestCart.remove_from_cart(product_id):
+            cart_count = Cart.get_session_cart_count()
             return jsonify({
                 'success': True, 
                 'message': 'Item removed from cart',
@@ -144,11 +217,10 @@ def remove_from_cart():
         return jsonify({'success': False, 'message': 'An error occurred'})
 
 @cart_bp.route('/api/cart/count')
-@login_required
 def get_cart_count():
     """Get cart item count (AJAX)"""
-    user_id = session['user_id']
-    count = Cart.get_cart_count(user_id)
+    user_id = session.get('user_id')
+    count = Cart.get_cart_count(user_id) if user_id else GuestCart.get_cart_count()
     return jsonify({'cart_count': count})
 
 @cart_bp.route('/checkout')
@@ -156,37 +228,46 @@ def get_cart_count():
 def checkout():
     """Checkout page"""
     user_id = session['user_id']
-    cart_items = Cart.get_cart_items(user_id)
+    cart = Cart.get_snapshot(user_id)
     
-    if not cart_items:
+    if not cart['items']:
         flash('Your cart is empty', 'error')
         return redirect(url_for('cart.view_cart'))
     
     # Get user info for pre-filling form
     user = User.get_by_id(user_id)
     
-    # Calculate totals (convert Decimal to float for calculations)
-    subtotal = sum(float(item['subtotal']) for item in cart_items)
-    tax = subtotal * 0.08
-    shipping = 10.00
-    total = subtotal + tax + shipping
-    
+    # Submitted back as a hidden field so a resubmitted form places one order
     return render_template('checkout.html',
-                         cart_items=cart_items,
+                         cart_items=cart['items'],
                          user=user,
-                         subtotal=subtotal,
-                         tax=tax,
-                         shipping=shipping,
-                         total=total)
+                         idempotency_key=secrets.token_urlsafe(24),
+                         **_totals(cart))
 
 @cart_bp.route('/place-order', methods=['POST'])
 @login_required
 def place_order():
     """Process order placement"""
     user_id = session['user_id']
-    cart_items = Cart.get_cart_items(user_id)
+    
+    # A double-click or retry of a form that already placed an order goes to
+    # that order without touching the cart, stock, orders or payments again
+    request_key = _request_key()
+    if request_key:
+        order_id = Order.find_by_request_key(user_id, request_key)
+        if order_id:
+            return redirect(url_for('cart.order_confirmation', order_id=order_id))
+    
+    # Usually the snapshot the checkout page just priced
+    cart_items = Cart.get_snapshot(user_id)['items']
     
     if not cart_items:
+        # A duplicate that missed the key above may find the cart already emptied
+        # by the first request, which has committed by now: send it to that order
+        if request_key:
+            order_id = Order.find_by_request_key(user_id, request_key, on_primary=True)
+            if order_id:
+                return redirect(url_for('cart.order_confirmation', order_id=order_id))
         flash('Your cart is empty', 'error')
         return redirect(url_for('cart.view_cart'))
     
@@ -202,54 +283,77 @@ def place_order():
         flash('Shipping address is required', 'error')
         return redirect(url_for('cart.checkout'))
     
-    # Validate stock availability
-    for item in cart_items:
-        product = Product.get_by_id(item['product_id'])
-        if not product or product.stock_quantity < item['quantity']:
-            flash(f'Insufficient stock for {item["name"]}', 'error')
-            return redirect(url_for('cart.checkout'))
+    # Order, customer info, stock and cart changes commit as one transaction
+    unavailable = []
+    out_of_stock = []
+    sold_out = []
+    try:
+        with transaction():
+            # Price every line from the products table: the snapshot may predate
+            # a price, stock or availability change made on another worker
+            products = Product.get_many(item['product_id'] for item in cart_items)
+            unavailable = [item['name'] for item in cart_items if item['product_id'] not in products]
+            if unavailable:
+                raise TransactionRollback(f'No longer available: {", ".join(unavailable)}')
+            
+            # Online payments take their stock in verify_payment once paid, so only
+            # check availability here; cash on delivery takes the stock atomically below
+            if payment_method != 'cash_on_delivery':
+                out_of_stock = [item['name'] for item in cart_items
+                                if products[item['product_id']].stock_quantity < item['quantity']]
+                if out_of_stock:
+                    raise TransactionRollback(f'Insufficient stock for {", ".join(out_of_stock)}')
+            
+            order_items = [{
+                'product_id': item['product_id'],
+                'quantity': item['quantity'],
+                'price': products[item['product_id']].price
+            } for item in cart_items]
+            
+            # Create order (with customer information) and clear the cart
+            order_id = Order.create_order(user_id, order_items, shipping_address, payment_method,
+                                          first_name, last_name, email, phone)
+            if not order_id:
+                raise TransactionRollback('Order creation failed')
+            
+            # Claims the form's key; a concurrent duplicate fails here once this commits
+            if request_key:
+                Order.record_request_key(user_id, request_key, order_id)
+            
+            # For Cash on Delivery, complete the order immediately
+            if payment_method == 'cash_on_delivery':
+                # Take stock for every line; any shortfall rolls the whole order back
+                failed, sold_out = Product.decrement_stock(
+                    (item['product_id'], item['quantity']) for item in cart_items)
+                if failed:
+                    out_of_stock = [item['name'] for item in cart_items if item['product_id'] in failed]
+                    raise TransactionRollback(f'Insufficient stock for {", ".join(out_of_stock)}')
+    except Exception as e:
+        if request_key and Order.is_duplicate_request(e):
+            # The same form was submitted twice at once and the other request won
+            order_id = Order.find_by_request_key(user_id, request_key, on_primary=True)
+            if order_id:
+                return redirect(url_for('cart.order_confirmation', order_id=order_id))
+        print(f"Order placement failed: {e}")
+        if unavailable:
+            flash(f'No longer available: {", ".join(unavailable)}', 'error')
+        elif out_of_stock:
+            flash(f'Insufficient stock for {", ".join(out_of_stock)}', 'error')
+        else:
+            flash('Failed to place order. Please try again.', 'error')
+        return redirect(url_for('cart.checkout'))
     
-    # Prepare cart items for order creation
-    order_items = []
-    for item in cart_items:
-        order_items.append({
-            'product_id': item['product_id'],
-            'quantity': item['quantity'],
-            'price': item['price']
-        })
+    # Only now that the stock change is committed can the featured products reload it
+    Product.forget_sold_out(sold_out)
     
-    # Create order with payment method
-    order_id = Order.create_order(user_id, order_items, shipping_address, payment_method)
+    if request_key:
+        Order.remember_request_key(user_id, request_key, order_id)
     
-    if order_id:
-        # Update customer information in order
-        update_customer_info_query = """
-        UPDATE orders 
-        SET first_name = %s, last_name = %s, email = %s, phone = %s
-        WHERE id = %s
-        """
-        execute_query(update_customer_info_query, (first_name, last_name, email, phone, order_id))
-        
-        # For Cash on Delivery, complete the order immediately
-        if payment_method == 'cash_on_delivery':
-            # Update product stock
-            for item in cart_items:
-                product = Product.get_by_id(item['product_id'])
-                if product:
-                    product.update_stock(-item['quantity'])
-            
-            # Clear cart
-            Cart.clear_cart(user_id)
-            
-            flash('Order placed successfully!', 'success')
-            return redirect(url_for('cart.order_confirmation', order_id=order_id))
-        
-        # For Razorpay, redirect to order confirmation (payment will be handled by JavaScript)
-        elif payment_method == 'razorpay':
-            return redirect(url_for('cart.order_confirmation', order_id=order_id))
+    if payment_method == 'cash_on_delivery':
+        flash('Order placed successfully!', 'success')
     
-    flash('Failed to place order. Please try again.', 'error')
-    return redirect(url_for('cart.checkout'))
+    # For Razorpay, payment will be handled by JavaScript on the confirmation page
+    return redirect(url_for('cart.order_confirmation', order_id=order_id))
 
 @cart_bp.route('/order-confirmation/<int:order_id>')
 @login_required
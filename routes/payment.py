@@ -3,8 +3,9 @@ Payment routes for Razorpay integration
 """
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from models.order import Order
+from models.product import Product
 from models.user import User
-from models.database import execute_query
+from models.database import execute_query, execute_many, transaction
 from routes.auth import login_required
 from utils.razorpay_service import razorpay_service
 import json
@@ -134,15 +135,6 @@ def verify_payment():
         
         payment_status = 'captured' if payment_details['status'] == 'captured' else payment_details['status']
         
-        execute_query(update_payment_query, (
-            razorpay_payment_id,
-            razorpay_signature,
-            payment_status,
-            payment_details.get('method', 'unknown'),
-            json.dumps(payment_details),
-            razorpay_order_id
-        ))
-        
         # Update order status
         update_order_query = """
         UPDATE orders 
@@ -160,25 +152,58 @@ def verify_payment():
             'card_id': payment_details.get('card_id')
         }
         
-        execute_query(update_order_query, (
-            payment_details.get('method', 'razorpay'),
-            json.dumps(payment_method_details),
-            razorpay_order_id
-        ))
+        # Locks the order, so a repeated verification waits and then sees it paid
+        order_query = "SELECT id, payment_status FROM orders WHERE razorpay_order_id = %s FOR UPDATE"
+        items_query = "SELECT product_id, quantity FROM order_items WHERE order_id = %s"
+        
+        # Payment record, order status and stock are updated in one transaction
+        short = []
+        sold_out = []
+        with transaction() as tx:
+            order_result = tx.execute(order_query, (razorpay_order_id,), fetch=True)
+            first_payment = bool(order_result) and order_result[0]['payment_status'] != 'paid'
+            
+            tx.execute(update_payment_query, (
+                razorpay_payment_id,
+                razorpay_signature,
+                payment_status,
+                payment_details.get('method', 'unknown'),
+                json.dumps(payment_details),
+                razorpay_order_id
+            ))
+            
+            tx.execute(update_order_query, (
+                payment_details.get('method', 'razorpay'),
+                json.dumps(payment_method_details),
+                razorpay_order_id
+            ))
+            
+            # Online orders take their stock once paid. A shortfall leaves stock
+            # untouched but keeps the payment recorded: the money has been taken,
+            # so the order is flagged for a refund instead of rolled back
+            if first_payment:
+                items = tx.execute(items_query, (order_result[0]['id'],), fetch=True)
+                short, sold_out = Product.decrement_stock(
+                    (item['product_id'], item['quantity']) for item in items)
         
-        # Get order ID for redirect
-        order_query = "SELECT id FROM orders WHERE razorpay_order_id = %s"
-        order_result = execute_query(order_query, (razorpay_order_id,), fetch=True)
+        Product.forget_sold_out(sold_out)
         
         if order_result:
             order_id = order_result[0]['id']
             
             # Log payment success
-            log_payment_event(razorpay_payment_id, 'payment_success', {
+            events = [(razorpay_payment_id, 'payment_success', {
                 'order_id': order_id,
                 'amount': payment_details.get('amount', 0) / 100,  # Convert paise to rupees
                 'method': payment_details.get('method')
-            })
+            })]
+            if short:
+                print(f"❌ Order {order_id} was paid but is short of stock for products {short}")
+                events.append((razorpay_payment_id, 'stock_shortfall', {
+                    'order_id': order_id,
+                    'product_ids': short
+                }))
+            log_payment_events(events)
             
             return jsonify({
                 'success': True,
@@ -359,25 +384,42 @@ def handle_payment_failed_webhook(payment_entity):
 
 def log_payment_event(payment_id, event_type, event_data):
     """Log payment event to payment_logs table"""
+    log_payment_events([(payment_id, event_type, event_data)])
+
+def log_payment_events(events):
+    """
+    Log payment events to payment_logs table in one batch
+    The payment record IDs are resolved with one lookup, then every row goes
+    in one multi-row INSERT ... VALUES: two round-trips however many events.
+    Events for unknown payments are skipped.
+    Args: events - list of (razorpay_payment_id, event_type, event_data) tuples
+    """
     try:
-        # Get payment record ID
-        payment_record = razorpay_service.get_payment_record(razorpay_payment_id=payment_id)
+        payment_ids = list(dict.fromkeys(payment_id for payment_id, _, _ in events))
+        if not payment_ids:
+            return
+        
+        placeholders = ', '.join(['%s'] * len(payment_ids))
+        records = execute_query(f"""
+        SELECT id, razorpay_payment_id FROM payments
+        WHERE razorpay_payment_id IN ({placeholders})
+        """, payment_ids, fetch=True) or []
+        record_ids = {record['razorpay_payment_id']: record['id'] for record in records}
+        
+        log_query = """
+        INSERT INTO payment_logs (payment_id, razorpay_payment_id, event_type, event_data, ip_address)
+        VALUES (%s, %s, %s, %s, %s)
+        """
+        rows = [
+            (record_ids[payment_id], payment_id, event_type, json.dumps(event_data), request.remote_addr)
+            for payment_id, event_type, event_data in events
+            if payment_id in record_ids
+        ]
+        result = execute_many(log_query, rows)
         
-        if payment_record:
-            log_query = """
-            INSERT INTO payment_logs (payment_id, razorpay_payment_id, event_type, event_data, ip_address)
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            
-            execute_query(log_query, (
-                payment_record['id'],
-                payment_id,
-                event_type,
-                json.dumps(event_data),
-                request.remote_addr
-            ))
-            
-            print(f"📝 Payment event logged: {event_type}")
+        if result and result['rowcount']:
+            for row in rows:
+                print(f"📝 Payment event logged: {row[2]}")
         
     except Exception as e:
-        print(f"❌ Failed to log payment event: {e}")
\ No newline at end of file
+        print(f"❌ Failed to log payment event: {e}")
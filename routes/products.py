@@ -3,36 +3,35 @@ Product routes for displaying products, categories, and search functionality
 """
 from flask import Blueprint, render_template, request, jsonify
 from models.product import Product
+from models.category import Category
 from config import Config
+from utils.http_cache import make_etag, conditional_response, is_public_page
 
 products_bp = Blueprint('products', __name__)
 
+def _etag_rows(products):
+    """
+    What each product contributes to an ETag: its full dict, since updated_at
+    only has one-second resolution and two stock changes can share it
+    """
+    return [(product.updated_at, product.to_dict()) for product in products]
+
 @products_bp.route('/products')
 def products():
     """Product listing page with filtering and pagination"""
     # Get query parameters
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     category_id = request.args.get('category', type=int)
     search = request.args.get('search', '').strip()
     
-    # Calculate pagination
-    per_page = Config.PRODUCTS_PER_PAGE
-    offset = (page - 1) * per_page
-    
-    # Get products with filters
-    products_list = Product.get_all_products(
-        limit=per_page + 1,  # Get one extra to check if there are more pages
-        offset=offset,
+    # Get one page of products with filters (cursor-based, no OFFSET scans)
+    page = Product.get_page(
+        Config.PRODUCTS_PER_PAGE,
+        cursor=cursor,
         category_id=category_id,
         search=search if search else None
     )
-    
-    # Check if there are more pages
-    has_next = len(products_list) > per_page
-    if has_next:
-        products_list = products_list[:-1]  # Remove the extra product
-    
-    has_prev = page > 1
+    products_list = page['products']
     
     # Get categories for filter dropdown
     categories = Product.get_categories()
@@ -40,10 +39,8 @@ def products():
     # Get selected category name
     selected_category = None
     if category_id:
-        for cat in categories:
-            if cat['id'] == category_id:
-                selected_category = cat['name']
-                break
+        category = Category.get_by_id(category_id)
+        selected_category = category['name'] if category else None
     
     return render_template('products.html', 
                          products=products_list,
@@ -51,11 +48,10 @@ def products():
                          selected_category_id=category_id,
                          selected_category=selected_category,
                          search_query=search,
-                         page=page,
-                         has_prev=has_prev,
-                         has_next=has_next,
-                         prev_page=page-1 if has_prev else None,
-                         next_page=page+1 if has_next else None)
+                         has_prev=page['prev_cursor'] is not None,
+                         has_next=page['next_cursor'] is not None,
+                         prev_cursor=page['prev_cursor'],
+                         next_cursor=page['next_cursor'])
 
 @products_bp.route('/product/<int:product_id>')
 def product_detail(product_id):
@@ -65,16 +61,28 @@ def product_detail(product_id):
     if not product:
         return render_template('404.html'), 404
     
-    # Get related products from the same category
-    related_products = []
-    if product.category_id:
-        all_related = Product.get_all_products(category_id=product.category_id, limit=8)
-        # Filter out the current product
-        related_products = [p for p in all_related if p.id != product.id][:4]
-    
-    return render_template('product_detail.html', 
-                         product=product,
-                         related_products=related_products)
+    # "Customers also bought", topped up from the same category
+    related_products = Product.get_related(product, limit=4)
+    
+    def render():
+        return render_template('product_detail.html', 
+                             product=product,
+                             related_products=related_products)
+    
+    # Logged-in pages carry per-user details, so only anonymous views revalidate
+    if not is_public_page():
+        return render()
+    
+    # Products carry their category name, so a rename of a shown category
+    # changes the ETag while other category writes leave it alone
+    shown = [product] + related_products
+    return conditional_response(
+        render,
+        etag=make_etag('product_page', _etag_rows(shown)),
+        last_modified=max((p.updated_at for p in shown if p.updated_at), default=None),
+        cache_control=Config.CACHE_CONTROL_PRODUCT_PAGE,
+        vary_cookie=True
+    )
 
 @products_bp.route('/api/products/autocomplete')
 def api_autocomplete():
@@ -88,25 +96,16 @@ def api_autocomplete():
     # Limit results for autocomplete
     limit = min(limit, 10)
     
-    products_list = Product.get_all_products(
-        limit=limit,
-        search=search_term
-    )
-    
-    # Get categories for mapping
-    categories = Product.get_categories()
-    category_map = {cat['id']: cat['name'] for cat in categories}
-    
-    # Return minimal data for autocomplete
+    # Answered from the in-memory prefix index - no database round-trips
     suggestions = []
-    for product in products_list:
+    for entry in Product.autocomplete(search_term, limit):
         suggestions.append({
-            'id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'image_url': product.image_url,
-            'category_name': category_map.get(product.category_id, 'Uncategorized'),
-            'stock_quantity': product.stock_quantity
+            'id': entry['id'],
+            'name': entry['name'],
+            'price': entry['price'],
+            'image_url': entry['image_url'],
+            'category_name': entry['category_name'] or 'Uncategorized',
+            'stock_quantity': entry['stock_quantity']
         })
     
     return jsonify({'suggestions': suggestions})
@@ -124,24 +123,32 @@ def api_search_products():
     # Limit the number of results for autocomplete
     limit = min(limit, 20)  # Maximum 20 results
     
-    products_list = Product.get_all_products(
-        limit=limit,
+    page = Product.get_page(
+        limit,
+        cursor=request.args.get('cursor'),
         category_id=category_id,
         search=search_term if search_term else None
     )
+    products_list = page['products']
     
     # Convert products to dictionaries with additional info
     products_data = []
-    categories = Product.get_categories()
-    category_map = {cat['id']: cat['name'] for cat in categories}
-    
     for product in products_list:
         product_dict = product.to_dict()
         # Add category name
-        product_dict['category_name'] = category_map.get(product.category_id, 'Uncategorized')
+        product_dict['category_name'] = product.category_name or 'Uncategorized'
         products_data.append(product_dict)
     
-    return jsonify({'products': products_data})
+    return conditional_response(
+        lambda: jsonify({
+            'products': products_data,
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor']
+        }),
+        etag=make_etag('search', _etag_rows(products_list), page['next_cursor'], page['prev_cursor']),
+        last_modified=max((p.updated_at for p in products_list if p.updated_at), default=None),
+        cache_control=Config.CACHE_CONTROL_SEARCH_API
+    )
 
 @products_bp.route('/api/product/<int:product_id>')
 def api_get_product(product_id):
@@ -151,64 +158,54 @@ def api_get_product(product_id):
     if not product:
         return jsonify({'error': 'Product not found'}), 404
     
-    return jsonify({'product': product.to_dict()})
+    return conditional_response(
+        lambda: jsonify({'product': product.to_dict()}),
+        etag=make_etag('product', _etag_rows([product])),
+        last_modified=product.updated_at,
+        cache_control=Config.CACHE_CONTROL_PRODUCT_API
+    )
 
 @products_bp.route('/categories')
 def categories():
     """Categories listing page"""
+    # Each category carries its maintained product_count
     categories_list = Product.get_categories()
     
-    # Get product count for each category
-    for category in categories_list:
-        products_in_category = Product.get_all_products(category_id=category['id'])
-        category['product_count'] = len(products_in_category)
-    
     return render_template('categories.html', categories=categories_list)
 
 @products_bp.route('/category/<int:category_id>')
 def category_products(category_id):
     """Products in a specific category"""
     # Get category info
-    categories = Product.get_categories()
-    category = None
-    for cat in categories:
-        if cat['id'] == category_id:
-            category = cat
-            break
+    category = Category.get_by_id(category_id)
     
     if not category:
         return render_template('404.html'), 404
     
-    # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
-    per_page = Config.PRODUCTS_PER_PAGE
-    offset = (page - 1) * per_page
-    
-    # Get products in this category
-    products_list = Product.get_all_products(
-        limit=per_page + 1,
-        offset=offset,
+    # Get one page of products in this category
+    page = Product.get_page(
+        Config.PRODUCTS_PER_PAGE,
+        cursor=request.args.get('cursor'),
         category_id=category_id
     )
     
-    # Check pagination
-    has_next = len(products_list) > per_page
-    if has_next:
-        products_list = products_list[:-1]
-    
-    has_prev = page > 1
-    
     return render_template('category_products.html',
                          category=category,
-                         products=products_list,
-                         page=page,
-                         has_prev=has_prev,
-                         has_next=has_next,
-                         prev_page=page-1 if has_prev else None,
-                         next_page=page+1 if has_next else None)
+                         products=page['products'],
+                         has_prev=page['prev_cursor'] is not None,
+                         has_next=page['next_cursor'] is not None,
+                         prev_cursor=page['prev_cursor'],
+                         next_cursor=page['next_cursor'])
 
 @products_bp.route('/api/categories')
 def api_get_categories():
     """API endpoint to get all categories"""
     categories_list = Product.get_categories()
-    return jsonify({'categories': categories_list})
\ No newline at end of file
+    
+    # Every category write bumps the shared version; hash the rows if it is unreadable
+    version = Category.get_version()
+    return conditional_response(
+        lambda: jsonify({'categories': categories_list}),
+        etag=make_etag('categories', version if version is not None else categories_list),
+        cache_control=Config.CACHE_CONTROL_CATEGORIES_API
+    )
\ No newline at end of file
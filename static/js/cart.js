@@ -1,14 +1,16 @@
 /**
  * Shopping Cart JavaScript functionality
- * Handles add to cart, update quantity, remove items with throttling
+ * Handles add to cart, remove items, and batches quantity changes
  */
 
 // Track ongoing requests to prevent duplicates
 const ongoingRequests = new Map();
 
-// Global click throttling
-let lastClickTime = 0;
-const CLICK_THROTTLE_MS = 300; // Minimum time between clicks
+// Quantity changes waiting to be sent as one /api/cart/batch request
+const pendingCartChanges = new Map();
+let cartBatchTimer = null;
+let cartBatchInFlight = false;
+const CART_BATCH_DELAY_MS = 400; // Changes made within this window are sent together
 
 document.addEventListener('DOMContentLoaded', function() {
     initializeCartFunctionality();
@@ -77,7 +79,7 @@ function initializeAddToCartButtons() {
 }
 
 /**
- * Initialize cart update buttons with throttling
+ * Initialize cart update buttons
  */
 function initializeCartUpdateButtons() {
     const updateButtons = document.querySelectorAll('.update-cart-btn');
@@ -98,46 +100,22 @@ function initializeCartUpdateButtons() {
 }
 
 /**
- * Handle cart update button clicks with strict single-click enforcement
+ * Handle cart update button clicks
+ * The input changes immediately; rapid clicks are sent to the server as one batch.
  */
 function handleCartUpdate(event) {
     event.preventDefault();
     event.stopPropagation();
     event.stopImmediatePropagation();
     
-    // Global throttling check
-    const now = Date.now();
-    if (now - lastClickTime < CLICK_THROTTLE_MS) {
-        console.log('Click throttled - too fast');
-        return false;
-    }
-    lastClickTime = now;
-    
-    const button = event.target;
+    const button = event.target.closest('.update-cart-btn') || event.target;
     const productId = button.getAttribute('data-product-id');
     const action = button.getAttribute('data-action');
     
-    // Check if button is already processing
-    if (button.hasAttribute('data-processing')) {
-        console.log('Button click ignored - already processing');
-        return false;
-    }
-    
-    // Mark button as processing
-    button.setAttribute('data-processing', 'true');
-    button.disabled = true;
-    
-    // Visual feedback
-    const originalBg = button.style.backgroundColor;
-    const originalColor = button.style.color;
-    button.style.backgroundColor = '#007bff';
-    button.style.color = 'white';
-    
     const quantityInput = document.querySelector(`input[data-product-id="${productId}"]`);
     
     if (!quantityInput) {
         console.error('Quantity input not found for product:', productId);
-        resetButton();
         return false;
     }
     
@@ -150,7 +128,6 @@ function handleCartUpdate(event) {
             newQuantity = currentQuantity + 1;
         } else {
             ECommerce.showNotification('Maximum quantity reached', 'warning');
-            resetButton();
             return false;
         }
     } else if (action === 'decrease') {
@@ -161,34 +138,21 @@ function handleCartUpdate(event) {
             if (newQuantity === 0) {
                 const productName = quantityInput.closest('.cart-item').querySelector('.item-details h3')?.textContent || 'this item';
                 if (!confirm(`Remove ${productName} from your cart?`)) {
-                    resetButton();
                     return false;
                 }
             }
         } else {
             // Already at 0, can't decrease further
             ECommerce.showNotification('Item quantity is already 0', 'warning');
-            resetButton();
             return false;
         }
     }
     
     // Update the input value immediately for better UX
     quantityInput.value = newQuantity;
+    updateCartTotals();
     
-    console.log(`Updating quantity from ${currentQuantity} to ${newQuantity} for product ${productId}`);
-    
-    // Call the update function with callback to reset button
-    updateCartItem(productId, newQuantity, quantityInput, resetButton);
-    
-    function resetButton() {
-        setTimeout(() => {
-            button.style.backgroundColor = originalBg;
-            button.style.color = originalColor;
-            button.disabled = false;
-            button.removeAttribute('data-processing');
-        }, 500); // Longer delay to prevent rapid clicking
-    }
+    updateCartItem(productId, newQuantity, quantityInput);
     
     return false;
 }
@@ -367,76 +331,110 @@ function addToCart(productId, quantity = 1, buttonElement = null) {
 }
 
 /**
- * Update cart item quantity with duplicate request prevention
+ * Queue a cart item quantity change
+ * Changes are debounced and sent together to /api/cart/batch; the last
+ * change for a product wins.
  */
 function updateCartItem(productId, quantity, inputElement = null, callback = null) {
-    const requestKey = `update-${productId}`;
+    pendingCartChanges.set(parseInt(productId), quantity);
+    scheduleCartBatch();
+    if (callback) callback();
+}
+
+/**
+ * (Re)start the debounce timer for pending cart changes
+ */
+function scheduleCartBatch() {
+    clearTimeout(cartBatchTimer);
+    cartBatchTimer = setTimeout(flushCartChanges, CART_BATCH_DELAY_MS);
+}
+
+/**
+ * Send every pending quantity change in one request
+ */
+function flushCartChanges() {
+    if (pendingCartChanges.size === 0) return;
     
-    // Prevent duplicate requests
-    if (ongoingRequests.has(requestKey)) {
-        console.log('Request already in progress for product:', productId);
-        if (callback) callback();
+    // Keep batches in order: wait for the previous one to finish
+    if (cartBatchInFlight) {
+        scheduleCartBatch();
         return;
     }
     
-    const data = {
-        product_id: parseInt(productId),
-        quantity: quantity
-    };
+    const operations = Array.from(pendingCartChanges, ([product_id, quantity]) => ({ product_id, quantity }));
+    pendingCartChanges.clear();
+    cartBatchInFlight = true;
     
-    // Mark request as ongoing
-    ongoingRequests.set(requestKey, true);
-    
-    // Store original value for rollback
-    if (inputElement) {
-        inputElement.setAttribute('data-original-value', inputElement.value);
-    }
-    
-    ECommerce.makeAjaxRequest('/api/cart/update', {
+    ECommerce.makeAjaxRequest('/api/cart/batch', {
         method: 'POST',
-        body: JSON.stringify(data)
+        body: JSON.stringify({ operations })
     })
     .then(response => {
         if (response.success) {
-            // Only show notification for manual updates, not automatic ones
-            if (inputElement && document.activeElement === inputElement) {
-                ECommerce.showNotification(response.message, 'success');
-            }
-            ECommerce.updateCartCount(response.cart_count);
-            
-            // Update cart totals if on cart page
-            updateCartTotals();
-            
-            // Remove row if quantity is 0
-            if (quantity === 0 && inputElement) {
-                const cartRow = inputElement.closest('.cart-item');
-                if (cartRow) {
-                    cartRow.style.opacity = '0';
-                    setTimeout(() => {
-                        cartRow.remove();
-                        updateCartTotals();
-                    }, 300);
-                }
-            }
+            applyCartState(response);
+            response.rejected.forEach(rejected => {
+                ECommerce.showNotification(rejected.message, 'error');
+            });
         } else {
             ECommerce.showNotification(response.message, 'error');
-            // Reset input value on error
-            if (inputElement) {
-                inputElement.value = inputElement.getAttribute('data-original-value') || 1;
-            }
+            resetQuantityInputs(operations);
         }
     })
     .catch(error => {
         ECommerce.showNotification('Failed to update cart', 'error');
-        if (inputElement) {
-            inputElement.value = inputElement.getAttribute('data-original-value') || 1;
-        }
+        resetQuantityInputs(operations);
     })
     .finally(() => {
-        // Remove from ongoing requests
-        ongoingRequests.delete(requestKey);
-        if (callback) callback();
+        cartBatchInFlight = false;
+    });
+}
+
+/**
+ * Show the cart returned by the server
+ */
+function applyCartState(response) {
+    ECommerce.updateCartCount(response.cart_count);
+    
+    const quantities = new Map(response.cart.items.map(item => [item.product_id, item.quantity]));
+    document.querySelectorAll('.cart-item .quantity-input').forEach(input => {
+        const productId = parseInt(input.getAttribute('data-product-id'));
+        if (pendingCartChanges.has(productId)) return; // A newer change is on its way
+        
+        if (quantities.has(productId)) {
+            input.value = quantities.get(productId);
+            input.setAttribute('data-original-value', input.value);
+            return;
+        }
+        
+        // No longer in the cart
+        const cartRow = input.closest('.cart-item');
+        if (cartRow) {
+            cartRow.style.opacity = '0';
+            setTimeout(() => {
+                cartRow.remove();
+                updateCartTotals();
+                if (document.querySelectorAll('.cart-item').length === 0) {
+                    showEmptyCartMessage();
+                }
+            }, 300);
+        }
     });
+    
+    updateCartTotals(response.cart);
+}
+
+/**
+ * Put inputs for failed operations back to their last saved quantity
+ */
+function resetQuantityInputs(operations) {
+    operations.forEach(operation => {
+        if (pendingCartChanges.has(operation.product_id)) return;
+        const input = document.querySelector(`input[data-product-id="${operation.product_id}"]`);
+        if (input) {
+            input.value = input.getAttribute('data-original-value') || 1;
+        }
+    });
+    updateCartTotals();
 }
 
 /**
@@ -455,39 +453,25 @@ function removeFromCart(productId, buttonElement = null) {
         buttonElement.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
     }
     
+    // Removal supersedes any queued quantity change for this product
+    pendingCartChanges.delete(parseInt(productId));
+    
     const data = {
-        product_id: parseInt(productId)
+        operations: [{ product_id: parseInt(productId), quantity: 0 }]
     };
     
     // Mark request as ongoing
     ongoingRequests.set(requestKey, true);
     
-    ECommerce.makeAjaxRequest('/api/cart/remove', {
+    ECommerce.makeAjaxRequest('/api/cart/batch', {
         method: 'POST',
         body: JSON.stringify(data)
     })
     .then(response => {
         if (response.success) {
-            ECommerce.showNotification(response.message, 'success');
-            ECommerce.updateCartCount(response.cart_count);
-            
-            // Remove cart item row
-            if (buttonElement) {
-                const cartRow = buttonElement.closest('.cart-item');
-                if (cartRow) {
-                    cartRow.style.opacity = '0';
-                    setTimeout(() => {
-                        cartRow.remove();
-                        updateCartTotals();
-                        
-                        // Check if cart is empty
-                        const remainingItems = document.querySelectorAll('.cart-item');
-                        if (remainingItems.length === 0) {
-                            showEmptyCartMessage();
-                        }
-                    }, 300);
-                }
-            }
+            ECommerce.showNotification('Item removed from cart', 'success');
+            // Removes the row and refreshes the count and totals
+            applyCartState(response);
         } else {
             ECommerce.showNotification(response.message, 'error');
         }
@@ -508,8 +492,10 @@ function removeFromCart(productId, buttonElement = null) {
 
 /**
  * Update cart totals on cart page
+ * Line subtotals are recalculated immediately; tax, shipping and total come
+ * from the server's pricing (the totals of a /api/cart/batch response).
  */
-function updateCartTotals() {
+function updateCartTotals(totals = null) {
     const cartItems = document.querySelectorAll('.cart-item');
     let subtotal = 0;
     
@@ -539,23 +525,21 @@ function updateCartTotals() {
     const totalElement = document.getElementById('cart-total');
     
     if (subtotalElement) {
-        subtotalElement.textContent = ECommerce.formatCurrency(subtotal);
+        subtotalElement.textContent = ECommerce.formatCurrency(totals ? totals.subtotal : subtotal);
     }
     
-    const tax = subtotal * 0.08; // 8% tax
-    const shipping = subtotal > 0 ? 10.00 : 0; // $10 shipping
-    const total = subtotal + tax + shipping;
+    if (!totals) return;
     
     if (taxElement) {
-        taxElement.textContent = ECommerce.formatCurrency(tax);
+        taxElement.textContent = ECommerce.formatCurrency(totals.tax);
     }
     
     if (shippingElement) {
-        shippingElement.textContent = ECommerce.formatCurrency(shipping);
+        shippingElement.textContent = ECommerce.formatCurrency(totals.shipping);
     }
     
     if (totalElement) {
-        totalElement.textContent = ECommerce.formatCurrency(total);
+        totalElement.textContent = ECommerce.formatCurrency(totals.total);
     }
 }
 
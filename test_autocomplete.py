@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory autocomplete trie
+"""
+import sys
+import os
+import random
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.autocomplete import AutocompleteIndex
+
+
+def entry(entry_id, name, category, popularity):
+    return {'id': entry_id, 'name': name, 'category_name': category, 'popularity': popularity,
+            'price': 10.0, 'image_url': None, 'stock_quantity': 5}
+
+
+ENTRIES = [
+    entry(1, 'Wireless Headphones', 'Electronics', 40),
+    entry(2, 'Headphone Stand', 'Home', 90),
+    entry(3, 'Python Crash Course', 'Books', 10),
+    entry(4, 'Smart Watch', 'Electronics', 5),
+]
+
+
+def names(suggestions):
+    return [suggestion['name'] for suggestion in suggestions]
+
+
+def test_prefix_matches_every_word_by_popularity():
+    """Any word of the name (or the category) matches, most popular first"""
+    index = AutocompleteIndex(loader=lambda: list(ENTRIES))
+
+    assert names(index.suggest('head')) == ['Headphone Stand', 'Wireless Headphones']
+    assert names(index.suggest('wireless hea')) == ['Wireless Headphones']
+    assert names(index.suggest('electr')) == ['Wireless Headphones', 'Smart Watch']
+    assert names(index.suggest('HEAD', limit=1)) == ['Headphone Stand']
+    assert index.suggest('xyz') == []
+    print("✅ Prefixes match any word, ranked by popularity")
+
+
+def test_incremental_updates():
+    """Added, renamed and removed products show up without a rebuild"""
+    loads = []
+    index = AutocompleteIndex(loader=lambda: loads.append(1) or list(ENTRIES))
+    index.suggest('warm')
+
+    index.add(entry(5, 'Headphone Amplifier', 'Electronics', 100))
+    assert names(index.suggest('head'))[0] == 'Headphone Amplifier'
+
+    index.add(entry(5, 'Desk Amplifier', 'Electronics', 100))
+    assert 'Headphone Amplifier' not in names(index.suggest('head'))
+    assert names(index.suggest('desk')) == ['Desk Amplifier']
+
+    index.remove(2)
+    assert names(index.suggest('head')) == ['Wireless Headphones']
+    assert len(loads) == 1
+    print("✅ The trie updates incrementally")
+
+
+def test_lookups_are_fast_at_scale():
+    """Lookups over 100k products stay well under 2 ms at p99"""
+    words = ['wireless', 'gaming', 'laptop', 'headphones', 'organic', 'cotton', 'shirt',
+             'coffee', 'maker', 'smart', 'watch', 'yoga', 'mat', 'desk', 'lamp', 'book']
+    rng = random.Random(7)
+    entries = [entry(i, ' '.join(rng.choice(words) for _ in range(3)) + f' {i}',
+                     rng.choice(['Electronics', 'Books', 'Home']), rng.randint(0, 500))
+               for i in range(100000)]
+    index = AutocompleteIndex(loader=lambda: entries)
+    index.ensure_fresh()
+
+    queries = [word[:length] for word in words for length in range(1, len(word) + 1)]
+    timings = []
+    for query in queries * 10:
+        start = time.perf_counter()
+        index.suggest(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    assert timings[int(len(timings) * 0.99)] < 0.002
+    print("✅ p99 lookup time is under 2 ms with 100k products")
+
+
+def test_index_warms_on_first_request_only(monkeypatch):
+    """Creating an app starts no index build; serving warms it once, never under test"""
+    import threading
+    from app import create_app
+
+    started = []
+    monkeypatch.setattr(threading.Thread, 'start', lambda thread: started.append(thread))
+
+    app = create_app('testing')
+    app.add_url_rule('/ping', 'ping', lambda: 'pong')
+    app.test_client().get('/ping')
+    assert started == []
+
+    app = create_app()
+    app.add_url_rule('/ping', 'ping', lambda: 'pong')
+    assert started == []
+    client = app.test_client()
+    client.get('/ping')
+    client.get('/ping')
+    assert len(started) == 1
+    print("✅ The autocomplete index warms once, on the first request outside tests")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Autocomplete")
+    print("=" * 50)
+    test_prefix_matches_every_word_by_popularity()
+    test_incremental_updates()
+    test_lookups_are_fast_at_scale()
+    from _pytest.monkeypatch import MonkeyPatch
+    test_index_warms_on_first_request_only(MonkeyPatch())
+    print("\n🎉 All autocomplete tests passed!")
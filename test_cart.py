@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Test cart operations against the fake MySQL driver
+"""
+import sys
+import os
+import time
+import zlib
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, render_template_string, session
+from config import Config
+from fake_mysql import FakeDatabase
+from models.database import init_db
+from models.order import Cart, cart_snapshots
+from models.guest_cart import GuestCart
+from utils.http_cache import is_public_page
+from routes.cart import cart_bp
+
+USER_ID = 7
+
+
+class CartTable:
+    """Scripted cart and products tables"""
+
+    def __init__(self):
+        self.products = {1: {'name': 'Notebook', 'stock': 5, 'active': True},
+                         2: {'name': 'Old Pen', 'stock': 5, 'active': False}}
+        self.lines = {}  # (user_id, product_id) -> quantity
+        self.item_reads = 0
+
+    def upsert(self, params):
+        user_id, quantity, _, product_id, _ = params
+        product = self.products.get(product_id)
+        current = self.lines.get((user_id, product_id), 0)
+        if not product or not product['active'] or product['stock'] < current + quantity:
+            return 0
+        self.lines[(user_id, product_id)] = current + quantity
+        return 2 if current else 1
+
+    def summary(self, params):
+        product_id, user_id = params
+        product = self.products.get(product_id)
+        return [{'product_name': product['name'] if product and product['active'] else None,
+                 'cart_count': sum(quantity for (owner, _), quantity in self.lines.items() if owner == user_id)}]
+
+    def fingerprint(self, user_id):
+        lines = [(product_id, quantity) for (owner, product_id), quantity in self.lines.items() if owner == user_id]
+        checksum = 0
+        for product_id, quantity in lines:
+            checksum ^= zlib.crc32(f'{product_id}:{quantity}'.encode())
+        return [{'line_count': len(lines), 'item_count': sum(quantity for _, quantity in lines),
+                 'checksum': checksum}]
+
+    def __call__(self, query, params):
+        if 'AS checksum' in query:
+            return self.fingerprint(params[0])
+        if 'FROM cart c' in query:
+            self.item_reads += 1
+        if query.lstrip().startswith('INSERT INTO cart'):
+            return self.upsert(params)
+        if 'AS cart_count' in query:
+            return self.summary(params)
+        if 'SUM(quantity) as total' in query:
+            return [{'total': sum(quantity for (owner, _), quantity in self.lines.items() if owner == params[0])}]
+        if 'FROM products p' in query and 'FROM cart c' not in query:
+            return [{'id': product_id, 'name': self.products[product_id]['name'], 'description': '',
+                     'price': 2.5, 'stock_quantity': self.products[product_id]['stock'], 'category_id': 1,
+                     'image_url': None, 'is_active': True, 'category_name': 'Stationery'}
+                    for product_id in params
+                    if product_id in self.products and self.products[product_id]['active']]
+        if 'SELECT id, stock_quantity FROM products' in query:
+            return [{'id': product_id, 'stock_quantity': self.products[product_id]['stock']}
+                    for product_id in params
+                    if product_id in self.products and self.products[product_id]['active']]
+        if 'FROM cart c' in query:
+            return [{'product_id': product_id, 'quantity': quantity, 'name': self.products[product_id]['name'],
+                     'price': 2.5, 'subtotal': 2.5 * quantity, 'stock_quantity': self.products[product_id]['stock']}
+                    for (owner, product_id), quantity in self.lines.items() if owner == params[0]]
+        if query.lstrip().startswith('DELETE FROM cart WHERE user_id = %s AND product_id = %s'):
+            return 1 if self.lines.pop(tuple(params), None) else 0
+        if query.lstrip().startswith('SELECT'):
+            return []
+        return 1
+
+
+def make_client(fake_db, table, user_id=USER_ID):
+    server = fake_db.serve(table)
+    cart_snapshots.invalidate()
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    init_db(app)
+    app.register_blueprint(cart_bp)
+    client = app.test_client()
+    if user_id:
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+    return server, client
+
+
+def writes(server):
+    return [query for query in server.queries() if not query.startswith('SELECT')]
+
+
+def test_add_to_cart_is_one_upsert(fake_db):
+    """Adding an item costs one upsert and one summary read"""
+    table = CartTable()
+    server, client = make_client(fake_db, table)
+
+    response = client.post('/api/cart/add', json={'product_id': 1, 'quantity': 2})
+    data = response.get_json()
+
+    assert data == {'success': True, 'message': 'Notebook added to cart', 'cart_count': 2}
+    assert server.round_trips == 2  # Upsert and summary, in autocommit
+    assert server.commits == 0
+
+    data = client.post('/api/cart/add', json={'product_id': 1, 'quantity': 3}).get_json()
+    assert data['success'] and data['cart_count'] == 5
+    assert table.lines == {(USER_ID, 1): 5}
+    print("✅ Add to cart is a single upsert")
+
+
+def test_add_to_cart_checks_stock(fake_db):
+    """The stock check covers the quantity already in the cart"""
+    table = CartTable()
+    table.lines[(USER_ID, 1)] = 4
+    server, client = make_client(fake_db, table)
+
+    data = client.post('/api/cart/add', json={'product_id': 1, 'quantity': 2}).get_json()
+    assert data == {'success': False, 'message': 'Insufficient stock'}
+    assert table.lines == {(USER_ID, 1): 4}
+
+    result = Cart.add_to_cart(USER_ID, 1, 1)
+    assert result == {'added': True, 'product_name': 'Notebook', 'cart_count': 5}
+    print("✅ Add to cart checks stock against the whole line")
+
+
+def test_add_to_cart_rejects_unknown_products(fake_db):
+    """Missing and inactive products are reported as not found"""
+    server, client = make_client(fake_db, CartTable())
+
+    for product_id in (2, 99):
+        data = client.post('/api/cart/add', json={'product_id': product_id}).get_json()
+        assert data == {'success': False, 'message': 'Product not found'}
+    print("✅ Unknown products are not added")
+
+
+def test_batch_update_is_one_transaction(fake_db):
+    """A batch checks stock once, applies every change and returns the cart"""
+    table = CartTable()
+    table.products[3] = {'name': 'Eraser', 'stock': 10, 'active': True}
+    table.lines[(USER_ID, 1)] = 1
+    table.lines[(USER_ID, 3)] = 2
+    server, client = make_client(fake_db, table)
+
+    response = client.post('/api/cart/batch', json={'operations': [
+        {'product_id': 1, 'quantity': 2},
+        {'product_id': 1, 'quantity': 3},  # Last change wins
+        {'product_id': 3, 'quantity': 0},
+        {'product_id': 2, 'quantity': 1},
+        {'product_id': 4, 'quantity': 1}
+    ]})
+    data = response.get_json()
+
+    assert data['success']
+    assert data['rejected'] == [{'product_id': 2, 'message': 'Product not found'},
+                                {'product_id': 4, 'message': 'Product not found'}]
+    queries = server.queries()
+    assert len([query for query in queries if 'stock_quantity FROM products' in query]) == 1
+    assert any(query.startswith('DELETE FROM cart WHERE user_id = %s AND product_id IN') for query in queries)
+    upserts = [params for query, params in server.statements if query.lstrip().startswith('INSERT INTO cart')]
+    assert upserts == [[(USER_ID, 1, 3)]]  # One multi-row upsert
+    assert server.commits == 1
+    assert data['cart']['items'][0]['product_id'] == 1
+    assert data['cart']['total'] == data['cart']['subtotal'] * 1.08 + 10
+    print("✅ Batch cart updates run in one transaction")
+
+
+def test_batch_update_rejects_short_stock(fake_db):
+    """Lines above the available stock are reported and left unchanged"""
+    table = CartTable()
+    server, client = make_client(fake_db, table)
+
+    data = client.post('/api/cart/batch', json={'operations': [{'product_id': 1, 'quantity': 6}]}).get_json()
+    assert data['rejected'] == [{'product_id': 1, 'message': 'Insufficient stock'}]
+    assert not any(query.startswith('INSERT') for query in server.queries())
+
+    data = client.post('/api/cart/batch', json={'operations': [{'product_id': 1}]}).get_json()
+    assert data == {'success': False, 'message': 'Each operation needs product_id and quantity'}
+    print("✅ Batch cart updates check stock")
+
+
+def test_batch_update_coerces_ids_and_rejects_bools(fake_db):
+    """String product ids are matched like ints; boolean quantities are refused"""
+    table = CartTable()
+    server, client = make_client(fake_db, table)
+
+    data = client.post('/api/cart/batch', json={'operations': [{'product_id': '1', 'quantity': 2}]}).get_json()
+    assert data['success'] and data['rejected'] == []
+    upserts = [params for query, params in server.statements if query.lstrip().startswith('INSERT INTO cart')]
+    assert upserts == [[(USER_ID, 1, 2)]]
+
+    for bad in ({'product_id': 1, 'quantity': True}, {'product_id': 'one', 'quantity': 1}):
+        data = client.post('/api/cart/batch', json={'operations': [bad]}).get_json()
+        assert data == {'success': False, 'message': 'Each operation needs product_id and quantity'}
+
+    data = client.post('/api/cart/add', json={'product_id': 1, 'quantity': True}).get_json()
+    assert data == {'success': False, 'message': 'Quantity must be at least 1'}
+    print("✅ Batch updates coerce product ids and refuse boolean quantities")
+
+
+def test_cart_count_is_kept_in_session(fake_db):
+    """Mutations keep the session's cart count current without recounting"""
+    table = CartTable()
+    server, client = make_client(fake_db, table)
+
+    client.post('/api/cart/add', json={'product_id': 1, 'quantity': 2})
+    with client.session_transaction() as sess:
+        assert sess[Cart.SESSION_COUNT_KEY][:2] == [USER_ID, 2]
+
+    client.post('/api/cart/remove', json={'product_id': 1})
+    with client.session_transaction() as sess:
+        assert sess[Cart.SESSION_COUNT_KEY][:2] == [USER_ID, 0]  # Recounted by the route
+    print("✅ Cart count is kept in the session")
+
+
+def test_session_count_catches_up_with_other_changes(fake_db):
+    """Counts older than CART_COUNT_MAX_AGE are recounted, and viewing the cart corrects them"""
+    table = CartTable()
+    table.lines[(USER_ID, 1)] = 2
+    fake_db.serve(table)
+    cart_snapshots.invalidate()
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    with app.test_request_context():
+        session['user_id'] = USER_ID
+        session[Cart.SESSION_COUNT_KEY] = [USER_ID, 9, time.time()]
+        assert Cart.get_session_cart_count() == 9  # Fresh enough to trust
+
+        session[Cart.SESSION_COUNT_KEY] = [USER_ID, 9, time.time() - Config.CART_COUNT_MAX_AGE - 1]
+        assert Cart.get_session_cart_count() == 2  # Changed on another device since
+
+        table.lines[(USER_ID, 1)] = 5  # Changed elsewhere again
+        Cart.get_snapshot(USER_ID)  # The cart page
+        assert Cart.get_session_cart_count() == 5
+    print("✅ The session cart count catches up with changes made elsewhere")
+
+
+def test_context_processor_is_lazy(fake_db):
+    """Templates that never read cart_count cost no query"""
+    from app import create_app
+
+    table = CartTable()
+    table.lines[(USER_ID, 1)] = 3
+    app = create_app('testing')
+    server = fake_db.serve(table)
+
+    with app.test_request_context():
+        session['user_id'] = USER_ID
+        before = len(server.statements)
+        assert render_template_string('hello') == 'hello'
+        assert len(server.statements) == before
+
+        assert render_template_string('{{ cart_count }}') == '3'
+        assert render_template_string('{{ cart_count + 1 }}') == '4'
+        assert len(server.statements) == before + 1  # Counted once, then read from the session
+    print("✅ cart_count is only counted when a template reads it")
+
+
+def test_snapshot_is_shared_until_cart_changes(fake_db):
+    """The priced cart is computed once per cart content"""
+    table = CartTable()
+    table.lines[(USER_ID, 1)] = 2
+    server = fake_db.serve(table)
+    cart_snapshots.invalidate()
+
+    first = Cart.get_snapshot(USER_ID)
+    assert Cart.get_snapshot(USER_ID) is first
+    assert table.item_reads == 1
+    assert (first['subtotal'], first['shipping']) == (5.0, 10.0)
+    assert first['version'][:2] == (1, 2)
+    assert abs(first['total'] - 15.4) < 1e-9
+
+    assert Cart.remove_from_cart(USER_ID, 1)
+    second = Cart.get_snapshot(USER_ID)
+    assert table.item_reads == 2
+    assert (second['items'], second['shipping'], second['total'], second['version']) == ([], 0, 0, (0, 0, 0))
+
+    # A change made elsewhere (another worker, the purge job) is seen too
+    table.lines[(USER_ID, 1)] = 3
+    third = Cart.get_snapshot(USER_ID)
+    assert table.item_reads == 3 and third['subtotal'] == 7.5
+    assert not any('cache_versions' in query for query in server.queries())
+    print("✅ Cart snapshots are reused until the cart changes")
+
+
+def test_guest_cart_needs_no_writes(fake_db):
+    """Guests fill a session cart with product reads only"""
+    table = CartTable()
+    server, client = make_client(fake_db, table, user_id=None)
+
+    data = client.post('/api/cart/add', json={'product_id': 1, 'quantity': 2}).get_json()
+    assert data == {'success': True, 'message': 'Notebook added to cart', 'cart_count': 2}
+
+    data = client.post('/api/cart/add', json={'product_id': 1, 'quantity': 4}).get_json()
+    assert data == {'success': False, 'message': 'Insufficient stock'}
+
+    data = client.post('/api/cart/batch', json={'operations': [{'product_id': 1, 'quantity': 3}]}).get_json()
+    assert data['cart']['items'][0]['quantity'] == 3 and data['cart_count'] == 3
+
+    assert client.get('/api/cart/count').get_json() == {'cart_count': 3}
+    assert writes(server) == [] and server.commits == 0
+    with client.session_transaction() as sess:
+        assert sess[GuestCart.SESSION_KEY] == {'1': 3}
+    print("✅ Guest carts live in the session")
+
+
+def test_guest_cart_validates_lines(fake_db):
+    """Guest quantities must be whole numbers of at least 1, and ids are stored as one type"""
+    table = CartTable()
+    server, client = make_client(fake_db, table, user_id=None)
+
+    for quantity in (0, -2, 'two', None):
+        data = client.post('/api/cart/add', json={'product_id': 1, 'quantity': quantity}).get_json()
+        assert data == {'success': False, 'message': 'Quantity must be at least 1'}
+
+    client.post('/api/cart/add', json={'product_id': '1', 'quantity': '2'})
+    data = client.post('/api/cart/add', json={'product_id': 1, 'quantity': 1}).get_json()
+    assert data['cart_count'] == 3
+    with client.session_transaction() as sess:
+        assert sess[GuestCart.SESSION_KEY] == {'1': 3}
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    with app.test_request_context():
+        assert GuestCart.add_to_cart(1, -1) is None
+        assert not GuestCart.update_cart_item(1, -3)
+        assert GuestCart.update_cart_item('1', '4') and GuestCart.get_cart_count() == 4
+        assert GuestCart._lines() == {1: 4}
+    print("✅ Guest cart lines are validated")
+
+
+def test_guest_cart_merges_at_login(fake_db):
+    """The guest cart moves into the cart table with one bulk upsert"""
+    table = CartTable()
+    server = fake_db.serve(table)
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    with app.test_request_context():
+        session[GuestCart.SESSION_KEY] = {'1': 2, '3': 1}
+        assert not is_public_page()
+
+        assert GuestCart.merge_into(USER_ID)
+
+        assert server.queries()[0] == (
+            'INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s) '
+            'ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)'
+        )
+        assert server.statements[0][1] == [(USER_ID, 1, 2), (USER_ID, 3, 1)]
+        assert GuestCart.SESSION_KEY not in session
+        assert GuestCart.merge_into(USER_ID) and len(server.statements) == 1
+    print("✅ Guest carts merge with one bulk upsert")
+
+
+def test_purge_abandoned_runs_in_batches(fake_db):
+    """Abandoned carts are deleted in bounded batches until one comes back short"""
+    batches = iter([2, 2, 1])
+    server = fake_db.serve(lambda query, params: next(batches))
+
+    stats = Cart.purge_abandoned(days=30, batch_size=2, pause=0)
+
+    assert (stats['rows_deleted'], stats['batches']) == (5, 3)
+    assert server.commits == 3
+    query, params = server.statements[0]
+    assert 'ORDER BY updated_at, id LIMIT %s' in ' '.join(query.split()) and 'updated_at < %s' in query
+    assert params == (stats['cutoff'], stats['cutoff'], 2)
+    assert all(statement[1] == params for statement in server.statements)  # One cutoff for the run
+    print("✅ Abandoned carts are purged in batches")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Cart")
+    print("=" * 50)
+    from _pytest.monkeypatch import MonkeyPatch
+    test_add_to_cart_is_one_upsert(FakeDatabase(MonkeyPatch()))
+    test_add_to_cart_checks_stock(FakeDatabase(MonkeyPatch()))
+    test_add_to_cart_rejects_unknown_products(FakeDatabase(MonkeyPatch()))
+    test_batch_update_is_one_transaction(FakeDatabase(MonkeyPatch()))
+    test_batch_update_rejects_short_stock(FakeDatabase(MonkeyPatch()))
+    test_batch_update_coerces_ids_and_rejects_bools(FakeDatabase(MonkeyPatch()))
+    test_cart_count_is_kept_in_session(FakeDatabase(MonkeyPatch()))
+    test_session_count_catches_up_with_other_changes(FakeDatabase(MonkeyPatch()))
+    test_context_processor_is_lazy(FakeDatabase(MonkeyPatch()))
+    test_snapshot_is_shared_until_cart_changes(FakeDatabase(MonkeyPatch()))
+    test_guest_cart_needs_no_writes(FakeDatabase(MonkeyPatch()))
+    test_guest_cart_validates_lines(FakeDatabase(MonkeyPatch()))
+    test_guest_cart_merges_at_login(FakeDatabase(MonkeyPatch()))
+    test_purge_abandoned_runs_in_batches(FakeDatabase(MonkeyPatch()))
+    print("\n🎉 All cart tests passed!")
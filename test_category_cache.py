@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test the cached category registry and its cross-worker invalidation
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from fake_mysql import FakeServer, install
+from models.category import Category
+from models.product import Product
+
+
+class CategoryDatabase:
+    """Scripted categories and cache_versions tables"""
+
+    def __init__(self):
+        self.version = 1
+        self.rows = [{'id': 1, 'name': 'Books', 'description': ''},
+                     {'id': 2, 'name': 'Electronics', 'description': ''}]
+
+    def __call__(self, query, params):
+        if 'FROM cache_versions' in query:
+            return [{'version': self.version}]
+        if 'INTO cache_versions' in query:
+            self.version += 1
+            return 1
+        if 'FROM categories' in query:
+            return [dict(row) for row in self.rows]
+        return 1
+
+
+def setup(monkeypatch, poll_seconds):
+    database = CategoryDatabase()
+    server = FakeServer(responder=database)
+    install(server, monkeypatch)
+    monkeypatch.setattr(Config, 'CATEGORY_CACHE_POLL_SECONDS', poll_seconds)
+    monkeypatch.setattr(Category, '_categories', None)
+    return database, server
+
+
+def category_loads(server):
+    return sum(1 for query in server.queries() if query.startswith('SELECT * FROM categories'))
+
+
+def test_categories_are_cached(monkeypatch):
+    """Repeated lookups are served from memory"""
+    _, server = setup(monkeypatch, poll_seconds=60)
+
+    assert [c['name'] for c in Category.get_all()] == ['Books', 'Electronics']
+    assert Category.get_by_id(2)['name'] == 'Electronics'
+    assert Category.get_by_id(99) is None
+
+    # Callers get copies they can annotate freely
+    Category.get_all()[0]['product_count'] = 5
+    assert 'product_count' not in Category.get_all()[0]
+
+    assert len(server.statements) == 2  # One version check, one load
+    print("✅ Categories are served from memory")
+
+
+def test_other_worker_change_is_picked_up(monkeypatch):
+    """A bumped version makes the next poll reload the categories"""
+    database, server = setup(monkeypatch, poll_seconds=0)
+
+    Category.get_all()
+    Category.get_all()
+    assert category_loads(server) == 1  # Version unchanged: no reload
+
+    database.rows.append({'id': 3, 'name': 'Garden', 'description': ''})
+    database.version += 1  # Another worker wrote
+
+    assert Category.get_by_id(3)['name'] == 'Garden'
+    assert category_loads(server) == 2
+    print("✅ Other workers' changes are picked up")
+
+
+def test_writes_invalidate(monkeypatch):
+    """Writing a category bumps the shared version and reloads locally"""
+    database, server = setup(monkeypatch, poll_seconds=60)
+    Category.get_all()
+
+    database.rows[0]['name'] = 'Novels'
+    assert Category.update(1, 'Novels', '')
+
+    assert database.version == 2
+    assert Category.get_by_id(1)['name'] == 'Novels'
+    print("✅ Writes invalidate every worker's cache")
+
+
+def test_product_moves_recount_both_categories(monkeypatch):
+    """Moving a product recounts the old and new category in its transaction"""
+    database, server = setup(monkeypatch, poll_seconds=60)
+    server.responder = lambda query, params: (
+        [{'category_id': 1, 'is_active': True}] if 'FOR UPDATE' in query else database(query, params))
+
+    product = Product(id=7, name='Lamp', description='', price=10.0, stock_quantity=3,
+                      category_id=2, is_active=True)
+    assert product.update()
+
+    recounts = [(query, params) for query, params in server.statements
+                if query.strip().startswith('UPDATE categories')]
+    assert len(recounts) == 1
+    assert 'product_count' in recounts[0][0] and recounts[0][1] == [1, 2]
+    assert database.version == 2
+    assert server.commits == 1
+    print("✅ Product writes keep category counts current")
+
+
+def test_product_edits_in_place_keep_the_cache(monkeypatch):
+    """A price or stock edit recounts nothing and leaves every worker's categories cached"""
+    database, server = setup(monkeypatch, poll_seconds=60)
+    server.responder = lambda query, params: (
+        [{'category_id': 2, 'is_active': True}] if 'FOR UPDATE' in query else database(query, params))
+
+    product = Product(id=7, name='Lamp', description='', price=12.0, stock_quantity=1,
+                      category_id=2, is_active=True)
+    assert product.update()
+
+    assert not any(query.startswith('UPDATE categories') for query in server.queries())
+    assert database.version == 1
+
+    product.is_active = False  # Deactivating changes the count
+    assert product.update()
+    assert database.version == 2
+    print("✅ In-place product edits keep the category cache")
+
+
+if __name__ == "__main__":
+    from _pytest.monkeypatch import MonkeyPatch
+    print("🧪 Testing Category Cache")
+    print("=" * 50)
+    test_categories_are_cached(MonkeyPatch())
+    test_other_worker_change_is_picked_up(MonkeyPatch())
+    test_writes_invalidate(MonkeyPatch())
+    test_product_moves_recount_both_categories(MonkeyPatch())
+    test_product_edits_in_place_keep_the_cache(MonkeyPatch())
+    print("\n🎉 All category cache tests passed!")
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Test checkout (place_order) against the fake MySQL driver
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from mysql.connector import IntegrityError, errorcode
+from fake_mysql import FakeDatabase
+from models.database import init_db, TransactionRollback
+from models.order import Order, cart_snapshots, placed_orders
+from models.product import Product, featured_cache
+from routes.cart import cart_bp
+
+LINES = 20
+
+
+class Shop:
+    """Scripted cart and products tables for one user"""
+
+    def __init__(self, lines=LINES, stock=10):
+        self.cart = [{'product_id': product_id, 'quantity': 1, 'name': f'Product {product_id}',
+                      'price': 5.0, 'subtotal': 5.0} for product_id in range(1, lines + 1)]
+        self.stock = {product_id: stock for product_id in range(1, lines + 1)}
+        self.prices = {product_id: 5 for product_id in range(1, lines + 1)}
+        self.keys = {}  # (user_id, idempotency_key) -> order_id
+        self.hidden_key_reads = 0  # Key lookups that miss, like a lagging replica
+
+    def product_row(self, product_id):
+        return {'id': product_id, 'name': f'Product {product_id}', 'description': '', 'price': self.prices[product_id],
+                'stock_quantity': self.stock[product_id], 'category_id': 1, 'image_url': None,
+                'is_active': True, 'category_name': 'Books'}
+
+    def take_stock(self, params):
+        """Apply the CASE-based conditional decrement"""
+        pairs = len(params) // 5
+        wanted = dict(zip(params[0:2 * pairs:2], params[1:2 * pairs:2]))
+        if any(self.stock[product_id] < quantity for product_id, quantity in wanted.items()):
+            return 0
+        for product_id, quantity in wanted.items():
+            self.stock[product_id] -= quantity
+        return len(wanted)
+
+    def __call__(self, query, params):
+        if 'INSERT INTO idempotency_keys' in query:
+            if params[:2] in self.keys:
+                raise IntegrityError(msg='Duplicate entry', errno=errorcode.ER_DUP_ENTRY)
+            self.keys[params[:2]] = params[2]
+            return 1
+        if 'FROM idempotency_keys' in query:
+            if self.hidden_key_reads:
+                self.hidden_key_reads -= 1
+                return []
+            order_id = self.keys.get(tuple(params))
+            return [{'order_id': order_id}] if order_id else []
+        if 'FOR UPDATE' in query and 'FROM products' in query:
+            return [{'id': product_id, 'stock_quantity': self.stock[product_id]}
+                    for product_id in params if product_id in self.stock]
+        if 'stock_quantity - CASE' in query:
+            return self.take_stock(params)
+        if 'FROM cart c' in query:
+            return [dict(line) for line in self.cart]
+        if 'FROM products p' in query and 'IN (' in query:
+            return [self.product_row(product_id) for product_id in params if product_id in self.stock]
+        if 'FROM products p' in query:
+            return [self.product_row(params[0])]
+        if query.lstrip().startswith('SELECT'):
+            return []
+        return 1
+
+
+def make_client(fake_db, shop):
+    server = fake_db.serve(shop)
+    cart_snapshots.invalidate()
+    placed_orders.invalidate()
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    init_db(app)
+    app.register_blueprint(cart_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 7
+    return server, client
+
+
+def product_queries(server):
+    return [query for query in server.queries() if 'FROM products p' in query]
+
+
+def stock_statements(server):
+    return [query for query in server.queries()
+            if 'FOR UPDATE' in query or query.startswith('UPDATE products')]
+
+
+def test_get_many_is_one_query(fake_db):
+    """get_many fetches every id in one IN query"""
+    shop = Shop()
+    server = fake_db.serve(shop)
+
+    products = Product.get_many([3, 1, 3, 2, None])
+
+    assert sorted(products) == [1, 2, 3]
+    assert products[3].stock_quantity == 10
+    assert len(server.statements) == 1
+    assert Product.get_many([]) == {}
+    print("✅ get_many uses a single query")
+
+
+def test_checkout_loads_products_once(fake_db):
+    """A 20-line cash-on-delivery checkout locks and decrements stock in two statements"""
+    shop = Shop()
+    server, client = make_client(fake_db, shop)
+
+    response = client.post('/place-order', data={
+        'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery'})
+
+    assert response.status_code == 302
+    assert '/order-confirmation/' in response.headers['Location']
+    assert len(product_queries(server)) == 1  # One pricing read inside the transaction
+    assert len(stock_statements(server)) == 2
+    assert all(stock == 9 for stock in shop.stock.values())
+    assert server.commits == 1
+    print("✅ Checkout takes stock with one read and one update")
+
+
+def test_decrement_stock_reports_short_lines(fake_db):
+    """Lines without enough stock are reported and nothing is decremented"""
+    shop = Shop(lines=3)
+    shop.stock[2] = 1
+    server = fake_db.serve(shop)
+
+    assert Product.decrement_stock([(1, 2), (2, 1), (2, 1), (3, 1)]) == ([2], [])
+    assert shop.stock == {1: 10, 2: 1, 3: 10}
+    assert Product.decrement_stock([(1, 2), (3, 1)]) == ([], [])
+    assert shop.stock == {1: 8, 2: 1, 3: 9}
+    assert Product.decrement_stock([(1, 8)]) == ([], [1])  # Sold out
+    assert Product.decrement_stock([]) == ([], [])
+    print("✅ decrement_stock reports exactly which lines are short")
+
+
+def test_decrement_stock_rolls_back_a_partial_update(fake_db):
+    """An UPDATE that misses a locked row raises and rolls back instead of reporting every line"""
+    shop = Shop(lines=3)
+    server = fake_db.serve(lambda query, params: 2 if 'stock_quantity - CASE' in query else shop(query, params))
+
+    try:
+        Product.decrement_stock([(1, 1), (2, 1), (3, 1)])
+        assert False, "Expected TransactionRollback"
+    except TransactionRollback:
+        pass
+    assert server.commits == 0 and server.rollbacks == 1
+    print("✅ A partial stock update rolls back")
+
+
+def test_sold_out_featured_product_refreshes_after_commit(fake_db, monkeypatch):
+    """The featured cache is cleared once the order that sold a product out has committed"""
+    shop = Shop(lines=2, stock=1)
+    server, client = make_client(fake_db, shop)
+    featured_cache.invalidate()
+    featured_cache.get_or_load(8, lambda: [Product(id=1)])
+    invalidated_at = []
+    monkeypatch.setattr(featured_cache, 'invalidate', lambda: invalidated_at.append(server.commits))
+
+    client.post('/place-order', data={'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery'})
+
+    assert shop.stock == {1: 0, 2: 0}
+    assert invalidated_at == [1]  # After the order's commit, not inside its transaction
+    print("✅ Sold-out featured products refresh after the order commits")
+
+
+def test_checkout_rejects_short_stock(fake_db):
+    """An order with a short line is rolled back and names the item"""
+    shop = Shop(lines=3)
+    shop.stock[3] = 0
+    server, client = make_client(fake_db, shop)
+
+    response = client.post('/place-order', data={
+        'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery'})
+
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/checkout')
+    with client.session_transaction() as session:
+        assert session['_flashes'] == [('error', 'Insufficient stock for Product 3')]
+    assert server.commits == 0 and server.rollbacks == 1
+    assert shop.stock == {1: 10, 2: 10, 3: 0}
+    print("✅ Short stock rolls the order back and names the item")
+
+
+def test_order_uses_one_connection_and_one_cart_clear(fake_db):
+    """The order id comes from lastrowid, items go in one batch and the cart is cleared once"""
+    server, client = make_client(fake_db, Shop())
+
+    client.post('/place-order', data={
+        'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery',
+        'first_name': 'Ada', 'phone': '555'})
+
+    queries = server.queries()
+    assert not any('LAST_INSERT_ID' in query or query.startswith('UPDATE orders') for query in queries)
+    assert len([query for query in queries if query.startswith('DELETE FROM cart')]) == 1
+    assert len([query for query in queries if query.startswith('INSERT INTO order_items')]) == 1
+    order_params = next(params for query, params in server.statements if 'INTO orders' in query)
+    assert order_params[5:] == ('Ada', None, None, '555')
+    assert len(server.connections) == 1
+    print("✅ Orders are created on one connection with one cart clear")
+
+
+def test_order_is_priced_from_products(fake_db):
+    """Lines are re-priced inside the order transaction, not taken from the cached snapshot"""
+    shop = Shop(lines=2)
+    shop.prices[2] = 8  # Changed after the cart snapshot was priced at 5
+    server, client = make_client(fake_db, shop)
+
+    client.post('/place-order', data={'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery'})
+
+    order_params = next(params for query, params in server.statements if 'INTO orders' in query)
+    item_rows = next(params for query, params in server.statements if 'INTO order_items' in query)
+    assert order_params[1] == 13.0
+    assert [row[3] for row in item_rows] == [5, 8]
+
+    del shop.stock[2]  # Deactivated: get_many no longer returns it
+    shop.cart = shop.cart[1:]
+    commits = server.commits
+    response = client.post('/place-order', data={
+        'shipping_address': '1 Main Street', 'payment_method': 'razorpay'})
+    assert response.headers['Location'].endswith('/checkout')
+    with client.session_transaction() as session:
+        assert session['_flashes'][-1] == ('error', 'No longer available: Product 2')
+    assert server.commits == commits
+    print("✅ Orders are priced from the products table")
+
+
+def test_resubmitted_form_places_one_order(fake_db):
+    """A second post of the same checkout form redirects to the first order without new statements"""
+    shop = Shop(lines=3)
+    server, client = make_client(fake_db, shop)
+    form = {'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery',
+            'idempotency_key': 'form-1'}
+
+    first = client.post('/place-order', data=form)
+    statements = len(server.statements)
+    second = client.post('/place-order', data=form)
+
+    assert '/order-confirmation/' in first.headers['Location']
+    assert second.headers['Location'] == first.headers['Location']
+    assert len(server.statements) == statements
+    assert list(shop.keys) == [(7, 'form-1')]
+    assert shop.stock == {1: 9, 2: 9, 3: 9}
+    assert server.commits == 1
+    print("✅ A resubmitted checkout form places one order")
+
+
+def test_concurrent_duplicate_joins_first_order(fake_db):
+    """A duplicate that loses the race on the key rolls back and redirects to the winner's order"""
+    shop = Shop(lines=3)
+    shop.keys[(7, 'form-1')] = 42
+    shop.hidden_key_reads = 1  # The winner's key is not visible to the first lookup
+    server, client = make_client(fake_db, shop)
+
+    response = client.post('/place-order', data={
+        'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery',
+        'idempotency_key': 'form-1'})
+
+    assert response.headers['Location'].endswith('/order-confirmation/42')
+    assert server.commits == 1 and server.rollbacks == 1  # Key re-read on the primary, order rolled back
+    assert shop.stock == {1: 10, 2: 10, 3: 10}
+    assert stock_statements(server) == []  # The key is claimed before any stock is taken
+    with client.session_transaction() as session:
+        assert '_flashes' not in session
+    print("✅ A concurrent duplicate is sent to the first order")
+
+
+def test_duplicate_after_cart_is_emptied_joins_first_order(fake_db):
+    """A duplicate that missed the key and then found an empty cart is sent to the first order"""
+    shop = Shop(lines=3)
+    shop.cart = []  # The first request placed the order and cleared the cart
+    shop.keys[(7, 'form-1')] = 42
+    shop.hidden_key_reads = 1  # Its key was not committed yet at the first lookup
+    server, client = make_client(fake_db, shop)
+
+    response = client.post('/place-order', data={
+        'shipping_address': '1 Main Street', 'payment_method': 'cash_on_delivery',
+        'idempotency_key': 'form-1'})
+
+    assert response.headers['Location'].endswith('/order-confirmation/42')
+    with client.session_transaction() as session:
+        assert '_flashes' not in session
+    print("✅ A duplicate that finds the cart emptied is sent to the first order")
+
+
+def test_old_request_keys_are_purged_in_batches(fake_db):
+    """Checkout keys past IDEMPOTENCY_KEY_DAYS are deleted in bounded, ordered batches"""
+    batches = iter([2, 1])
+    server = fake_db.serve(lambda query, params: next(batches))
+
+    stats = Order.purge_request_keys(days=7, batch_size=2, pause=0)
+
+    assert (stats['rows_deleted'], stats['batches']) == (3, 2)
+    assert server.commits == 2
+    query, params = server.statements[0]
+    assert query.lstrip().startswith('DELETE FROM idempotency_keys')
+    assert 'ORDER BY created_at' in query and params == (stats['cutoff'], 2)
+    print("✅ Old checkout keys are purged in batches")
+
+
+def paid_order(shop):
+    """Responder for one Razorpay order (id 42) of two lines, on top of shop"""
+    state = {'payment_status': 'pending'}
+
+    def responder(query, params):
+        query = ' '.join(query.split())
+        if query.startswith('SELECT id, payment_status FROM orders'):
+            return [{'id': 42, 'payment_status': state['payment_status']}]
+        if query.startswith('UPDATE orders'):
+            state['payment_status'] = 'paid'
+            return 1
+        if 'FROM order_items' in query:
+            return [{'product_id': 1, 'quantity': 2}, {'product_id': 2, 'quantity': 1}]
+        if 'FROM payments' in query:
+            return [{'id': 5, 'razorpay_payment_id': 'pay_1'}]
+        return shop(query, params)
+    return responder
+
+
+def verify(fake_db, monkeypatch, shop):
+    from routes import payment
+    monkeypatch.setattr(payment.razorpay_service, 'verify_payment_signature', lambda *args: True)
+    monkeypatch.setattr(payment.razorpay_service, 'get_payment_details',
+                        lambda payment_id: {'status': 'captured', 'method': 'card', 'amount': 1500})
+    server = fake_db.serve(paid_order(shop))
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    init_db(app)
+    app.register_blueprint(cart_bp)
+    app.register_blueprint(payment.payment_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 7
+    form = {'razorpay_order_id': 'order_1', 'razorpay_payment_id': 'pay_1', 'razorpay_signature': 'sig'}
+    return server, (lambda: client.post('/payment/verify', json=form).get_json())
+
+
+def test_paid_online_order_takes_stock_once(fake_db, monkeypatch):
+    """Confirming a payment decrements stock in its transaction; a repeated confirmation does not"""
+    shop = Shop(lines=2)
+    server, post = verify(fake_db, monkeypatch, shop)
+
+    assert post()['success']
+    assert shop.stock == {1: 8, 2: 9}
+    assert server.commits == 1
+    assert post()['success']  # A retried verification
+    assert shop.stock == {1: 8, 2: 9}
+    print("✅ Paid online orders take their stock once")
+
+
+def test_paid_order_short_of_stock_is_flagged(fake_db, monkeypatch):
+    """Stock that ran out while paying is left alone and the order is logged for a refund"""
+    shop = Shop(lines=2)
+    shop.stock[1] = 1
+    server, post = verify(fake_db, monkeypatch, shop)
+
+    assert post()['success']
+    assert shop.stock == {1: 1, 2: 10}
+    logged = next(params for query, params in server.statements if 'INSERT INTO payment_logs' in query)
+    assert [row[2] for row in logged] == ['payment_success', 'stock_shortfall']
+    print("✅ Paid orders short of stock are flagged instead of overselling")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Checkout")
+    print("=" * 50)
+    from _pytest.monkeypatch import MonkeyPatch
+    test_get_many_is_one_query(FakeDatabase(MonkeyPatch()))
+    test_checkout_loads_products_once(FakeDatabase(MonkeyPatch()))
+    test_decrement_stock_reports_short_lines(FakeDatabase(MonkeyPatch()))
+    test_decrement_stock_rolls_back_a_partial_update(FakeDatabase(MonkeyPatch()))
+    test_sold_out_featured_product_refreshes_after_commit(FakeDatabase(MonkeyPatch()), MonkeyPatch())
+    test_checkout_rejects_short_stock(FakeDatabase(MonkeyPatch()))
+    test_order_uses_one_connection_and_one_cart_clear(FakeDatabase(MonkeyPatch()))
+    test_order_is_priced_from_products(FakeDatabase(MonkeyPatch()))
+    test_resubmitted_form_places_one_order(FakeDatabase(MonkeyPatch()))
+    test_concurrent_duplicate_joins_first_order(FakeDatabase(MonkeyPatch()))
+    test_duplicate_after_cart_is_emptied_joins_first_order(FakeDatabase(MonkeyPatch()))
+    test_old_request_keys_are_purged_in_batches(FakeDatabase(MonkeyPatch()))
+    test_paid_online_order_takes_stock_once(FakeDatabase(MonkeyPatch()), MonkeyPatch())
+    test_paid_order_short_of_stock_is_flagged(FakeDatabase(MonkeyPatch()), MonkeyPatch())
+    print("\n🎉 All checkout tests passed!")
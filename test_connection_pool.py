@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the database connection pool without a running MySQL server
+"""
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models.pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    """Stand-in for a mysql.connector connection"""
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def is_connected(self):
+        return self.alive
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        connection = FakeConnection()
+        created.append(connection)
+        return connection
+
+    return ConnectionPool(connect, **kwargs), created
+
+
+def test_connections_are_reused():
+    """Released connections are handed out again instead of reconnecting"""
+    pool, created = make_pool(size=2, max_overflow=0)
+
+    first = pool.acquire()
+    first.close()
+    second = pool.acquire()
+    second.close()
+
+    assert len(created) == 1
+    stats = pool.stats()
+    assert stats['connects'] == 1
+    assert stats['checkouts'] == 2
+    assert stats['idle'] == 1
+    assert stats['checked_out'] == 0
+    print("✅ Connections are reused")
+
+
+def test_overflow_connections_are_closed():
+    """Connections above the pool size are closed when released"""
+    pool, created = make_pool(size=1, max_overflow=1, timeout=0)
+
+    first = pool.acquire()
+    second = pool.acquire()
+    assert pool.stats()['overflow'] == 1
+
+    first.close()
+    second.close()
+
+    assert pool.stats()['idle'] == 1
+    assert sum(1 for c in created if c.closed) == 1
+    print("✅ Overflow connections are closed on release")
+
+
+def test_exhausted_pool_times_out():
+    """Checkout fails once size + overflow connections are in use"""
+    pool, _ = make_pool(size=1, max_overflow=0, timeout=0.05)
+
+    held = pool.acquire()
+    try:
+        pool.acquire()
+        assert False, "expected PoolTimeoutError"
+    except PoolTimeoutError:
+        pass
+    held.close()
+
+    assert pool.stats()['timeouts'] == 1
+    print("✅ Exhausted pool times out")
+
+
+def test_waiter_gets_released_connection():
+    """A blocked checkout is served as soon as a connection is returned"""
+    pool, created = make_pool(size=1, max_overflow=0, timeout=2)
+    held = pool.acquire()
+    result = {}
+
+    def waiter():
+        connection = pool.acquire()
+        result['connection'] = connection
+        connection.close()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    held.close()
+    thread.join(timeout=2)
+
+    assert 'connection' in result
+    assert len(created) == 1
+    print("✅ Waiting checkout receives released connection")
+
+
+def test_pre_ping_replaces_dead_connection():
+    """Dead idle connections are discarded and replaced on checkout"""
+    pool, created = make_pool(size=1, max_overflow=0, pre_ping=True)
+
+    connection = pool.acquire()
+    connection.close()
+    created[0].alive = False
+
+    replacement = pool.acquire()
+    replacement.close()
+
+    assert len(created) == 2
+    assert created[0].closed
+    assert pool.stats()['invalidated'] == 1
+    print("✅ Pre-ping replaces dead connections")
+
+
+def test_open_transaction_rolled_back_on_release():
+    """A connection returned mid-transaction is rolled back first"""
+    pool, created = make_pool(size=1, max_overflow=0)
+
+    connection = pool.acquire()
+    created[0].in_transaction = True
+    connection.close()
+    connection.close()  # Second close is a no-op
+
+    assert created[0].rollbacks == 1
+    assert pool.stats()['checked_out'] == 0
+    print("✅ Open transactions are rolled back on release")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Connection Pool")
+    print("=" * 50)
+    test_connections_are_reused()
+    test_overflow_connections_are_closed()
+    test_exhausted_pool_times_out()
+    test_waiter_gets_released_connection()
+    test_pre_ping_replaces_dead_connection()
+    test_open_transaction_rolled_back_on_release()
+    print("\n🎉 All connection pool tests passed!")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test the TTL cache and the cached home page featured products
+"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mysql import FakeDatabase
+from models.product import Product, featured_cache
+from utils.cache import TTLCache
+
+
+def test_single_flight_loading():
+    """Concurrent misses for one key run the loader once"""
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'featured'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('home', loader)))
+               for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ['featured'] * 20
+    print("✅ Expiry under load triggers a single load")
+
+
+def test_entries_expire():
+    """Entries are reloaded once their TTL has passed"""
+    cache = TTLCache(ttl=0.01)
+    values = iter([1, 2])
+
+    assert cache.get_or_load('key', lambda: next(values)) == 1
+    time.sleep(0.02)
+    assert cache.get_or_load('key', lambda: next(values)) == 2
+    print("✅ Entries expire after their TTL")
+
+
+def test_max_entries_drops_oldest():
+    """A bounded cache keeps only its newest entries"""
+    cache = TTLCache(ttl=60, max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.get_or_load(key, lambda: key.upper())
+
+    assert cache.peek('a') is None
+    assert (cache.peek('b'), cache.peek('c')) == ('B', 'C')
+    print("✅ Bounded caches drop their oldest entries")
+
+
+def test_failed_load_releases_its_lock():
+    """A loader that raises leaves no per-key lock behind and the next call retries"""
+    cache = TTLCache(ttl=60)
+
+    def failing():
+        raise RuntimeError('database down')
+
+    try:
+        cache.get_or_load('home', failing)
+        assert False, "Expected the loader's error"
+    except RuntimeError:
+        pass
+    assert cache._loading == {}
+    assert cache.get_or_load('home', lambda: 'featured') == 'featured'
+    print("✅ Failed loads release their lock")
+
+
+def test_invalidate_during_load_wins():
+    """A value read before an invalidate() is returned but not stored"""
+    cache = TTLCache(ttl=60)
+
+    def loader():
+        cache.invalidate()  # A write lands while the old value is being read
+        return 'stale'
+
+    assert cache.get_or_load('home', loader) == 'stale'
+    assert cache.peek('home') is None
+    assert cache.get_or_load('home', lambda: 'fresh') == 'fresh'
+    print("✅ Invalidations during a load are not undone")
+
+
+def featured_rows(query, params):
+    return [{'id': product_id, 'name': f'P{product_id}', 'description': '', 'price': 1,
+             'stock_quantity': 1, 'category_id': 1, 'image_url': None, 'is_active': True,
+             'category_name': 'Books'} for product_id in (3, 2, 1)] if query.lstrip().startswith('SELECT') else 1
+
+
+def test_sold_out_featured_product_invalidates(fake_db):
+    """Selling out a featured product refreshes the set; other stock changes do not"""
+    server = fake_db.serve(featured_rows)
+    featured_cache.invalidate()
+
+    Product.get_featured_products(limit=8)
+    Product.get_featured_products(limit=8)
+    assert len(server.statements) == 1
+
+    Product(id=9, stock_quantity=5).update_stock(-5)  # Not featured
+    Product(id=2, stock_quantity=5).update_stock(-1)  # Featured, still in stock
+    Product.get_featured_products(limit=8)
+    assert sum(1 for q in server.queries() if q.startswith('SELECT')) == 1
+
+    Product(id=2, stock_quantity=1).update_stock(-1)  # Featured, sold out
+    Product.get_featured_products(limit=8)
+    assert sum(1 for q in server.queries() if q.startswith('SELECT')) == 2
+    print("✅ Sold-out featured products invalidate the cache")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Featured Products Cache")
+    print("=" * 50)
+    test_single_flight_loading()
+    test_entries_expire()
+    test_max_entries_drops_oldest()
+    test_failed_load_releases_its_lock()
+    test_invalidate_during_load_wins()
+    from _pytest.monkeypatch import MonkeyPatch
+    test_sold_out_featured_product_invalidates(FakeDatabase(MonkeyPatch()))
+    print("\n🎉 All featured cache tests passed!")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test the {% cache %} Jinja fragment cache
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from jinja2 import Environment
+from utils.fragment_cache import FragmentCacheExtension, LRUStore
+
+TEMPLATE = """{% cache ['card', product.id, product.updated_at], ttl %}<b>{{ render(product) }}</b>{% endcache %}"""
+
+
+def make_template():
+    environment = Environment(extensions=[FragmentCacheExtension], autoescape=True)
+    rendered = []
+
+    def render(product):
+        rendered.append(product['id'])
+        return product['name']
+
+    environment.globals['render'] = render
+    return environment, environment.from_string(TEMPLATE), rendered
+
+
+def test_fragments_are_reused_until_the_version_changes():
+    """Same key reuses the fragment; a new updated_at renders again"""
+    _, template, rendered = make_template()
+    product = {'id': 1, 'name': 'Tea & Cake', 'updated_at': 'v1'}
+
+    first = template.render(product=product, ttl=60)
+    assert template.render(product=product, ttl=60) == first == '<b>Tea &amp; Cake</b>'
+    assert rendered == [1]
+
+    product['updated_at'] = 'v2'
+    template.render(product=product, ttl=60)
+    assert rendered == [1, 1]
+    print("✅ Fragments are reused until their version changes")
+
+
+def test_fragments_expire():
+    """A fragment is re-rendered after its ttl"""
+    _, template, rendered = make_template()
+    product = {'id': 1, 'name': 'Tea', 'updated_at': 'v1'}
+
+    template.render(product=product, ttl=0.01)
+    time.sleep(0.02)
+    template.render(product=product, ttl=0.01)
+    assert rendered == [1, 1]
+    print("✅ Fragments expire after their ttl")
+
+
+def test_store_is_pluggable_and_bounded():
+    """The store can be replaced, and the LRU store evicts the oldest entry"""
+    environment, template, rendered = make_template()
+    environment.fragment_cache_store = LRUStore(max_entries=2)
+
+    for product_id in (1, 2, 1, 3, 1, 2):
+        template.render(product={'id': product_id, 'name': 'x', 'updated_at': 'v1'}, ttl=None)
+    assert rendered == [1, 2, 3, 2]
+    print("✅ The LRU store keeps the most recently used fragments")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Fragment Cache")
+    print("=" * 50)
+    test_fragments_are_reused_until_the_version_changes()
+    test_fragments_expire()
+    test_store_is_pluggable_and_bounded()
+    print("\n🎉 All fragment cache tests passed!")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test conditional GET (ETag / Last-Modified) on the product APIs
+"""
+import sys
+import os
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from fake_mysql import FakeServer, install
+from models.category import Category
+from models.database import init_db
+from routes.products import products_bp
+
+
+class Catalog:
+    """Scripted products, categories and cache_versions tables"""
+
+    def __init__(self):
+        self.updated_at = datetime(2024, 5, 1, 12, 0, 0)
+        self.version = 1
+        self.category_name = 'Books'
+        self.stock = 3
+
+    def __call__(self, query, params):
+        if 'FROM cache_versions' in query:
+            return [{'version': self.version}]
+        if 'FROM categories' in query:
+            return [{'id': 1, 'name': 'Books', 'description': '', 'product_count': 1}]
+        return [{'id': 1, 'name': 'Python Book', 'description': '', 'price': 20, 'stock_quantity': self.stock,
+                 'category_id': 1, 'image_url': None, 'is_active': True, 'category_name': self.category_name,
+                 'created_at': self.updated_at, 'updated_at': self.updated_at}]
+
+
+def make_client(monkeypatch):
+    catalog = Catalog()
+    install(FakeServer(responder=catalog), monkeypatch)
+    monkeypatch.setattr(Category, '_categories', None)
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    init_db(app)
+    app.register_blueprint(products_bp)
+    return catalog, app.test_client()
+
+
+def test_unchanged_product_is_not_modified(monkeypatch):
+    """A matching If-None-Match gets an empty 304"""
+    catalog, client = make_client(monkeypatch)
+
+    first = client.get('/api/product/1')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'public, max-age=30'
+    assert first.headers['Last-Modified'] == 'Wed, 01 May 2024 12:00:00 GMT'
+
+    again = client.get('/api/product/1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    since = client.get('/api/product/1', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+    print("✅ Unchanged products answer 304")
+
+
+def test_row_change_changes_etag(monkeypatch):
+    """A new updated_at produces a new ETag and a full response"""
+    catalog, client = make_client(monkeypatch)
+
+    etag = client.get('/api/product/1').headers['ETag']
+    catalog.updated_at = datetime(2024, 5, 2, 8, 30, 0)
+
+    response = client.get('/api/product/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    print("✅ Edited products are served in full")
+
+
+def test_same_second_change_changes_etag(monkeypatch):
+    """A stock change within the same second as the last one still changes the ETag"""
+    catalog, client = make_client(monkeypatch)
+
+    etag = client.get('/api/product/1').headers['ETag']
+    catalog.stock -= 1  # updated_at is unchanged at one-second resolution
+
+    response = client.get('/api/product/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['product']['stock_quantity'] == 2
+    print("✅ Same-second changes are served in full")
+
+
+def test_last_modified_uses_database_time_zone(monkeypatch):
+    """Naive TIMESTAMPs are read in the connections' session time zone"""
+    from config import Config
+    catalog, client = make_client(monkeypatch)
+    monkeypatch.setattr(Config, 'DB_TIME_ZONE', '+05:30')
+
+    assert client.get('/api/product/1').headers['Last-Modified'] == 'Wed, 01 May 2024 06:30:00 GMT'
+    print("✅ Last-Modified converts from the database time zone")
+
+
+def test_product_etag_ignores_other_category_writes(monkeypatch):
+    """Category version bumps leave product ETags alone; renaming the shown category changes them"""
+    catalog, client = make_client(monkeypatch)
+
+    etag = client.get('/api/product/1').headers['ETag']
+    catalog.version += 1  # e.g. another product changed a category's count
+    monkeypatch.setattr(Category, '_categories', None)
+    assert client.get('/api/product/1', headers={'If-None-Match': etag}).status_code == 304
+
+    catalog.category_name = 'Programming'
+    assert client.get('/api/product/1', headers={'If-None-Match': etag}).status_code == 200
+    print("✅ Product ETags only follow the categories they show")
+
+
+def test_categories_etag_follows_version(monkeypatch):
+    """The categories API revalidates against the category cache version"""
+    catalog, client = make_client(monkeypatch)
+
+    etag = client.get('/api/categories').headers['ETag']
+    assert client.get('/api/categories', headers={'If-None-Match': etag}).status_code == 304
+
+    catalog.version += 1
+    monkeypatch.setattr(Category, '_categories', None)
+    assert client.get('/api/categories', headers={'If-None-Match': etag}).status_code == 200
+    print("✅ Categories revalidate against their version")
+
+
+if __name__ == "__main__":
+    from _pytest.monkeypatch import MonkeyPatch
+    print("🧪 Testing HTTP Caching")
+    print("=" * 50)
+    test_unchanged_product_is_not_modified(MonkeyPatch())
+    test_row_change_changes_etag(MonkeyPatch())
+    test_same_second_change_changes_etag(MonkeyPatch())
+    test_last_modified_uses_database_time_zone(MonkeyPatch())
+    test_product_etag_ignores_other_category_writes(MonkeyPatch())
+    test_categories_etag_follows_version(MonkeyPatch())
+    print("\n🎉 All HTTP caching tests passed!")
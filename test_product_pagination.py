@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test keyset (cursor) pagination of the product listing
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mysql import FakeDatabase
+from models.product import Product, _decode_cursor
+
+START = datetime(2024, 1, 1)
+
+# Ten products; 3 and 4 share a timestamp so the id tie-breaker matters
+ROWS = [
+    {'id': i, 'name': f'Product {i}', 'description': '', 'price': 10, 'stock_quantity': 5,
+     'category_id': 1, 'image_url': None, 'is_active': True, 'category_name': 'Books',
+     'created_at': START + timedelta(days=min(i, 3) if i <= 4 else i)}
+    for i in range(1, 11)
+]
+
+
+def listing(query, params):
+    """Serve the listing query from ROWS, honouring the seek clause"""
+    key = lambda row: (row['created_at'], row['id'])
+    rows = sorted(ROWS, key=key, reverse='DESC' in query)
+    if 'p.created_at <' in query:
+        rows = [row for row in rows if key(row) < (params[0], params[2])]
+    elif 'p.created_at >' in query:
+        rows = [row for row in rows if key(row) > (params[0], params[2])]
+    return rows[:params[-1]]
+
+
+def ids(page):
+    return [product.id for product in page['products']]
+
+
+def test_walks_forward_and_back(fake_db):
+    """next/prev cursors visit every product exactly once in order"""
+    fake_db.serve(listing)
+
+    first = Product.get_page(4)
+    assert ids(first) == [10, 9, 8, 7]
+    assert first['prev_cursor'] is None
+
+    second = Product.get_page(4, cursor=first['next_cursor'])
+    assert ids(second) == [6, 5, 4, 3]
+
+    last = Product.get_page(4, cursor=second['next_cursor'])
+    assert ids(last) == [2, 1]
+    assert last['next_cursor'] is None
+
+    back = Product.get_page(4, cursor=last['prev_cursor'])
+    assert ids(back) == [6, 5, 4, 3]
+
+    start = Product.get_page(4, cursor=back['prev_cursor'])
+    assert ids(start) == [10, 9, 8, 7]
+    assert start['prev_cursor'] is None
+    print("✅ Cursors walk the listing forwards and backwards")
+
+
+def test_listing_never_uses_offset(fake_db):
+    """Deep pages seek on (created_at, id) rather than skipping rows"""
+    server = fake_db.serve(listing)
+
+    page = Product.get_page(4, cursor=Product.get_page(4)['next_cursor'])
+
+    assert page['products']
+    assert not any('OFFSET' in query for query in server.queries())
+    assert all('ORDER BY p.created_at DESC, p.id DESC' in query for query in server.queries())
+    print("✅ Pagination seeks instead of using OFFSET")
+
+
+def test_invalid_cursor_starts_over(fake_db):
+    """A tampered token falls back to the first page"""
+    fake_db.serve(listing)
+
+    assert _decode_cursor('not-a-cursor') is None
+    assert ids(Product.get_page(4, cursor='not-a-cursor')) == [10, 9, 8, 7]
+    print("✅ Invalid cursors fall back to the first page")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Product Pagination")
+    print("=" * 50)
+    from _pytest.monkeypatch import MonkeyPatch
+    test_walks_forward_and_back(FakeDatabase(MonkeyPatch()))
+    test_listing_never_uses_offset(FakeDatabase(MonkeyPatch()))
+    test_invalid_cursor_starts_over(FakeDatabase(MonkeyPatch()))
+    print("\n🎉 All product pagination tests passed!")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test the in-process BM25 product search index
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mysql import FakeServer, install
+from utils.search_index import SearchIndex, tokenize
+from models import product as product_module
+from models.product import Product
+
+DOCUMENTS = [
+    {'id': 1, 'name': 'Gaming Laptop', 'description': 'Fast laptop with a big screen',
+     'category_id': 1, 'is_active': True},
+    {'id': 2, 'name': 'Laptop Bag', 'description': 'Padded bag with a shoulder strap',
+     'category_id': 2, 'is_active': True},
+    {'id': 3, 'name': 'Wireless Headphones', 'description': 'Noise cancelling headphones',
+     'category_id': 1, 'is_active': True},
+    {'id': 4, 'name': 'Old Laptop', 'description': 'Discontinued', 'category_id': 1, 'is_active': False},
+]
+
+
+def make_index():
+    return SearchIndex(loader=lambda: list(DOCUMENTS), field_weights={'name': 3, 'description': 1})
+
+
+def test_ranking_and_filters():
+    """Name matches outrank description matches; filters apply"""
+    index = make_index()
+
+    assert tokenize("Laptops & Bags!") == ['laptop', 'bag']
+    assert index.search('laptop') == [1, 2]
+    assert index.search('laptop bag') == [2]
+    assert index.search('laptop', category_id=2) == [2]
+    assert 4 in index.search('laptop', include_inactive=True)
+    assert index.search('') == []
+    print("✅ Results are ranked and filtered")
+
+
+def test_last_term_matches_prefix():
+    """Search-as-you-type matches the partial last word"""
+    index = make_index()
+
+    assert index.search('head') == [3]
+    assert index.search('wireless hea') == [3]
+    assert index.search('hea wireless') == []
+    print("✅ The last term matches as a prefix")
+
+
+def test_incremental_updates():
+    """Added, edited and deactivated products are searchable immediately"""
+    index = make_index()
+    index.search('warm up')
+
+    index.add({'id': 5, 'name': 'Headphone Stand', 'description': '', 'category_id': 1, 'is_active': True})
+    assert index.search('stand') == [5]
+
+    index.add({'id': 5, 'name': 'Desk Organiser', 'description': '', 'category_id': 1, 'is_active': True})
+    assert index.search('stand') == []
+    assert index.search('organiser') == [5]
+
+    index.set_active(3, False)
+    assert index.search('headphones') == []
+    index.remove(5)
+    assert index.search('organiser') == []
+    print("✅ The index updates incrementally")
+
+
+def test_searches_continue_during_rebuild():
+    """A slow reload does not block searches, and updates made meanwhile survive the swap"""
+    import threading
+    import time
+    loading, release = threading.Event(), threading.Event()
+    slow = {'on': False}
+
+    def loader():
+        if slow['on']:
+            loading.set()
+            release.wait(5)
+        return list(DOCUMENTS)
+
+    index = SearchIndex(loader=loader, field_weights={'name': 3, 'description': 1})
+    index.search('warm up')
+    slow['on'] = True
+    rebuild = threading.Thread(target=index.rebuild)
+    rebuild.start()
+    assert loading.wait(5)
+
+    started = time.perf_counter()
+    assert index.search('laptop') == [1, 2]  # Served from the current index mid-load
+    assert time.perf_counter() - started < 1
+    index.add({'id': 5, 'name': 'Laptop Stand', 'description': '', 'category_id': 1, 'is_active': True})
+    release.set()
+    rebuild.join(5)
+
+    assert index.search('stand') == [5]
+    print("✅ Searches keep running while the index reloads")
+
+
+def test_failed_rebuild_keeps_the_index():
+    """A load that breaks partway leaves the previous index in place"""
+    broken = {'on': False}
+
+    def loader():
+        yield DOCUMENTS[0]
+        if broken['on']:
+            raise RuntimeError('connection lost')
+        yield from DOCUMENTS[1:]
+
+    index = SearchIndex(loader=loader, field_weights={'name': 3, 'description': 1})
+    assert index.search('headphones') == [3]
+    broken['on'] = True
+    index.rebuild()
+
+    assert index.search('headphones') == [3]
+    assert index.search('laptop') == [1, 2]
+    print("✅ A failed reload keeps the previous index")
+
+
+def test_product_search_avoids_like_scans(monkeypatch):
+    """Product searches fetch ranked ids instead of scanning with LIKE"""
+    server = FakeServer(responder=lambda query, params: [
+        {'id': product_id, 'name': '', 'description': '', 'price': 1, 'stock_quantity': 1,
+         'category_id': 1, 'image_url': None, 'is_active': True, 'category_name': 'x'}
+        for product_id in params
+    ])
+    install(server, monkeypatch)
+    monkeypatch.setattr(product_module, 'product_search_index', make_index())
+
+    products = Product.get_all_products(search='laptop', limit=10)
+
+    assert [product.id for product in products] == [1, 2]
+    assert not any('LIKE' in query for query in server.queries())
+    print("✅ Product search uses the index")
+
+
+if __name__ == "__main__":
+    from _pytest.monkeypatch import MonkeyPatch
+    print("🧪 Testing Product Search")
+    print("=" * 50)
+    test_ranking_and_filters()
+    test_last_term_matches_prefix()
+    test_incremental_updates()
+    test_searches_continue_during_rebuild()
+    test_failed_rebuild_keeps_the_index()
+    test_product_search_avoids_like_scans(MonkeyPatch())
+    print("\n🎉 All product search tests passed!")
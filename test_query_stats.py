@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test per-request query instrumentation and N+1 detection
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+from fake_mysql import FakeDatabase
+from models.database import execute_query, init_db
+from models.query_stats import statement_shape, find_repeated_statements
+
+
+def test_statement_shape_ignores_parameters():
+    """Statements differing only in literals share a shape"""
+    assert statement_shape("SELECT * FROM products  WHERE id = %s") == \
+        "SELECT * FROM products WHERE id = ?"
+    assert statement_shape("SELECT * FROM users WHERE name = 'bob' AND id = 42") == \
+        "SELECT * FROM users WHERE name = ? AND id = ?"
+    assert statement_shape("SELECT * FROM products WHERE id IN (%s, %s, %s)") == \
+        statement_shape("SELECT * FROM products WHERE id IN (%s)")
+    print("✅ Statement shapes ignore parameters")
+
+
+def test_repeated_shapes_are_flagged():
+    """The same shape issued past the threshold is reported"""
+    queries = [{'statement': 'SELECT ? FROM cart', 'duration_ms': 1, 'rowcount': 1}] * 3
+    assert find_repeated_statements(queries, threshold=3) == {'SELECT ? FROM cart': 3}
+    assert find_repeated_statements(queries, threshold=4) == {}
+    print("✅ Repeated statement shapes are flagged")
+
+
+def test_response_headers_report_queries(fake_db):
+    """Server-Timing and X-DB-Queries describe the request's queries"""
+    server = fake_db.serve(lambda query, params: [{'id': 1}])
+
+    app = Flask(__name__)
+    app.config['DB_QUERY_HEADERS'] = True
+    init_db(app)
+
+    @app.route('/categories')
+    def categories():
+        for category_id in range(3):
+            execute_query("SELECT * FROM products WHERE category_id = %s", (category_id,), fetch=True)
+        return jsonify({})
+
+    response = app.test_client().get('/categories')
+
+    assert response.headers['X-DB-Queries'] == '3'
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert len(server.connections) == 1
+    print("✅ Response headers report query statistics")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Query Instrumentation")
+    print("=" * 50)
+    test_statement_shape_ignores_parameters()
+    test_repeated_shapes_are_flagged()
+    from _pytest.monkeypatch import MonkeyPatch
+    test_response_headers_report_queries(FakeDatabase(MonkeyPatch()))
+    print("\n🎉 All query instrumentation tests passed!")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test read-replica routing with two fake MySQL servers
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+from fake_mysql import FakeDatabase, FakeServer
+from models.database import execute_query, transaction, init_db
+
+
+def make_servers(fake_db):
+    primary = FakeServer('primary', responder=lambda query, params: [{'id': 1}])
+    replica = FakeServer('replica', responder=lambda query, params: [{'id': 1}])
+    fake_db.install(primary, replicas=[replica])
+    return primary, replica
+
+
+def make_app():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    init_db(app)
+
+    @app.route('/products')
+    def products():
+        execute_query("SELECT * FROM products WHERE is_active = TRUE", fetch=True)
+        return jsonify({})
+
+    @app.route('/cart/add', methods=['POST'])
+    def add_to_cart():
+        execute_query("INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)", (1, 1, 1))
+        execute_query("SELECT * FROM cart WHERE user_id = %s", (1,), fetch=True)
+        return jsonify({})
+
+    return app
+
+
+def test_reads_go_to_replica_and_writes_to_primary(fake_db):
+    """Outside a request SELECTs use the replica, writes the primary"""
+    primary, replica = make_servers(fake_db)
+
+    execute_query("SELECT * FROM products", fetch=True)
+    execute_query("UPDATE products SET stock_quantity = 1 WHERE id = %s", (1,))
+    execute_query("SELECT * FROM products WHERE id = %s FOR UPDATE", (1,), fetch=True)
+
+    assert replica.queries() == ["SELECT * FROM products"]
+    assert [q.split()[0] for q in primary.queries()] == ['UPDATE', 'SELECT']
+    print("✅ Reads use the replica, writes and locking reads the primary")
+
+
+def test_transaction_reads_stay_on_primary(fake_db):
+    """Reads inside a transaction see its uncommitted writes"""
+    primary, replica = make_servers(fake_db)
+
+    with transaction() as tx:
+        tx.execute("UPDATE products SET stock_quantity = 1 WHERE id = %s", (1,))
+        execute_query("SELECT stock_quantity FROM products WHERE id = %s", (1,), fetch=True)
+
+    assert replica.statements == []
+    assert len(primary.statements) == 2
+    print("✅ Transactions run entirely on the primary")
+
+
+def test_session_sticks_to_primary_after_write(fake_db):
+    """A session that wrote reads its own writes from the primary"""
+    primary, replica = make_servers(fake_db)
+    client = make_app().test_client()
+
+    client.get('/products')
+    assert len(replica.statements) == 1
+
+    client.post('/cart/add')
+    client.get('/products')
+
+    assert len(replica.statements) == 1
+    assert [q.split()[0] for q in primary.queries()] == ['INSERT', 'SELECT', 'SELECT']
+
+    # Other sessions keep reading from the replica
+    make_app().test_client().get('/products')
+    assert len(replica.statements) == 2
+    print("✅ Sessions stick to the primary after writing")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Read Replica Routing")
+    print("=" * 50)
+    from _pytest.monkeypatch import MonkeyPatch
+    test_reads_go_to_replica_and_writes_to_primary(FakeDatabase(MonkeyPatch()))
+    test_transaction_reads_stay_on_primary(FakeDatabase(MonkeyPatch()))
+    test_session_sticks_to_primary_after_write(FakeDatabase(MonkeyPatch()))
+    print("\n🎉 All read replica tests passed!")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test related-product mining and lookup
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mysql import FakeDatabase, FakeServer
+from models.product import Product
+from utils.recommendations import count_co_occurrences, mine_related_products
+
+
+def test_co_occurrence_counts():
+    """Pairs are counted once per order, in both directions"""
+    counts = count_co_occurrences([[1, 2, 3], [1, 2], [2, 2], [4]])
+
+    assert counts[(1, 2)] == 2 and counts[(2, 1)] == 2
+    assert counts[(1, 3)] == 1 and counts[(3, 2)] == 1
+    assert (2, 2) not in counts
+    assert len(counts) == 6
+    print("✅ Co-occurrences are counted sparsely")
+
+
+def test_mining_advances_watermark(fake_db):
+    """A batch and its watermark are written in one transaction"""
+    def responder(query, params):
+        if 'FROM job_watermarks' in query:
+            return [{'last_id': 12 if responder.done else 10}]
+        if 'FROM orders' in query:
+            return [] if responder.done else [{'id': 11, 'status': 'delivered'},
+                                              {'id': 12, 'status': 'cancelled'}]
+        if 'FROM order_items' in query:
+            return [{'order_id': 11, 'product_id': 1}, {'order_id': 11, 'product_id': 2},
+                    {'order_id': 12, 'product_id': 1}, {'order_id': 12, 'product_id': 3}]
+        if query.lstrip().startswith('UPDATE job_watermarks'):
+            responder.done = True
+        return 1
+    responder.done = False
+
+    server = fake_db.serve(responder)
+
+    assert mine_related_products() == 2
+
+    upsert = next(params for query, params in server.statements if 'INTO related_products' in query)
+    assert sorted(upsert) == [(1, 2, 1), (2, 1, 1)]  # The cancelled order is skipped
+    watermark = next(params for query, params in server.statements if 'UPDATE job_watermarks' in query)
+    assert watermark == (12, 'related_products')
+    assert server.commits == 2  # The batch, then the empty check that ends the run
+    print("✅ Mining is incremental and atomic")
+
+
+def test_mining_locks_the_watermark_on_the_primary(fake_db):
+    """The watermark and order window are read under a row lock, never from a replica"""
+    primary = FakeServer('primary', responder=lambda query, params: (
+        [{'last_id': 0}] if 'FROM job_watermarks' in query else [] if 'SELECT' in query else 1))
+    replica = FakeServer('replica')
+    fake_db.install(primary, replicas=[replica])
+
+    assert mine_related_products() == 0
+
+    queries = primary.queries()
+    assert queries[0].startswith('INSERT IGNORE INTO job_watermarks')
+    assert queries[1].endswith('FOR UPDATE')
+    assert 'FROM orders' in queries[2]
+    assert replica.statements == []
+    print("✅ Mining locks its watermark on the primary")
+
+
+def test_related_falls_back_to_category(fake_db):
+    """Products without enough co-purchases are topped up from their category"""
+    def row(product_id):
+        return {'id': product_id, 'name': f'P{product_id}', 'description': '', 'price': 1,
+                'stock_quantity': 1, 'category_id': 1, 'image_url': None, 'is_active': True,
+                'category_name': 'Books'}
+
+    fake_db.serve(lambda query, params: (
+        [row(9)] if 'FROM related_products' in query else [row(5), row(9), row(4), row(3), row(2)]))
+
+    related = Product.get_related(Product(id=5, category_id=1), limit=4)
+
+    assert [product.id for product in related] == [9, 4, 3, 2]
+    print("✅ Related products fall back to category neighbours")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Related Products")
+    print("=" * 50)
+    from _pytest.monkeypatch import MonkeyPatch
+    test_co_occurrence_counts()
+    test_mining_advances_watermark(FakeDatabase(MonkeyPatch()))
+    test_mining_locks_the_watermark_on_the_primary(FakeDatabase(MonkeyPatch()))
+    test_related_falls_back_to_category(FakeDatabase(MonkeyPatch()))
+    print("\n🎉 All related product tests passed!")
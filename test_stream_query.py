@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test streaming large result sets with stream_query / StreamedRows
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mysql import FakeDatabase, FakeServer
+from models.database import stream_query, StreamedRows
+
+
+def make_server(total=10):
+    def responder(query, params):
+        return [{'id': i} for i in range(total)]
+    return FakeServer(responder=responder)
+
+
+def test_rows_are_fetched_in_chunks(fake_db):
+    """Rows arrive one chunk per round-trip"""
+    server = make_server(10)
+    fake_db.install(server)
+
+    chunks = list(stream_query("SELECT id FROM orders", chunk_size=4, chunks=True))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert [row['id'] for row in stream_query("SELECT id FROM orders", chunk_size=4)] == list(range(10))
+    print("✅ Rows are streamed in chunks")
+
+
+def test_abandoned_stream_is_discarded(fake_db):
+    """Stopping early disconnects rather than reading the unread rows to reuse the connection"""
+    server = make_server(10)
+    pool = fake_db.install(server)
+
+    stream = stream_query("SELECT id FROM orders", chunk_size=2)
+    next(stream)
+    stream.close()
+
+    assert server.consumed == 0
+    assert server.connections[0].closed
+    stats = pool.stats()
+    assert (stats['checked_out'], stats['idle'], stats['discarded']) == (0, 0, 1)
+
+    assert list(stream_query("SELECT id FROM orders", chunk_size=4))  # A fresh connection
+    assert pool.stats()['idle'] == 1  # Finished streams return theirs
+    print("✅ Abandoned streams discard their connection")
+
+
+def test_streamed_rows_never_count(fake_db):
+    """Truth tests cost no query and the empty state comes from the loop"""
+    server = make_server(7)
+    fake_db.install(server)
+
+    rows = StreamedRows("SELECT id FROM users ORDER BY id", transform=lambda row: row['id'])
+
+    assert bool(rows)
+    assert server.statements == []
+    assert list(rows)[:3] == [0, 1, 2]
+    assert not any('COUNT(*)' in query for query in server.queries())
+
+    from jinja2 import Template
+    empty = StreamedRows("SELECT id FROM users WHERE id < 0")
+    fake_db.install(make_server(0))
+    assert Template("{% for row in rows %}x{% else %}none{% endfor %}").render(rows=empty) == 'none'
+    print("✅ StreamedRows never runs a COUNT(*)")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Streaming Queries")
+    print("=" * 50)
+    from _pytest.monkeypatch import MonkeyPatch
+    test_rows_are_fetched_in_chunks(FakeDatabase(MonkeyPatch()))
+    test_abandoned_stream_is_discarded(FakeDatabase(MonkeyPatch()))
+    test_streamed_rows_never_count(FakeDatabase(MonkeyPatch()))
+    print("\n🎉 All streaming query tests passed!")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the transaction() unit of work against the fake MySQL driver
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_mysql import FakeDatabase
+from models.database import execute_query, transaction, TransactionRollback
+from models.order import Order
+
+
+def test_statements_share_one_commit(fake_db):
+    """Statements in one block run on one connection and commit once"""
+    server = fake_db.serve()
+
+    with transaction() as tx:
+        tx.execute("UPDATE products SET stock_quantity = 1 WHERE id = %s", (1,))
+        execute_query("DELETE FROM cart WHERE user_id = %s", (7,))
+
+    assert server.commits == 1
+    assert server.rollbacks == 0
+    assert len(server.connections) == 1
+    print("✅ Statements share one connection and one commit")
+
+
+def test_exception_rolls_back(fake_db):
+    """Raising inside the block rolls back and propagates"""
+    server = fake_db.serve()
+
+    try:
+        with transaction() as tx:
+            tx.execute("UPDATE products SET stock_quantity = 1 WHERE id = %s", (1,))
+            raise TransactionRollback("stop")
+    except TransactionRollback:
+        pass
+
+    assert server.commits == 0
+    assert server.rollbacks == 1
+    print("✅ Exceptions roll the transaction back")
+
+
+def test_failed_execute_query_rolls_back(fake_db):
+    """A swallowed execute_query error still prevents the commit"""
+    from mysql.connector import Error
+
+    def responder(query, params):
+        if query.startswith('DELETE'):
+            raise Error(msg="lock wait timeout")
+        return 1
+
+    server = fake_db.serve(responder)
+
+    try:
+        with transaction():
+            assert execute_query("UPDATE orders SET status = 'pending'") is True
+            assert execute_query("DELETE FROM cart WHERE user_id = %s", (7,)) is None
+        assert False, "expected the commit to be refused"
+    except Error:
+        pass
+
+    assert server.commits == 0
+    assert server.rollbacks == 1
+    print("✅ Failed statements block the commit")
+
+
+def test_create_order_is_one_transaction(fake_db):
+    """Order, items and cart clear are committed together"""
+    server = fake_db.serve(lambda query, params: 1)
+
+    items = [
+        {'product_id': 1, 'quantity': 2, 'price': 10.0},
+        {'product_id': 2, 'quantity': 1, 'price': 5.5}
+    ]
+    order_id = Order.create_order(7, items, '1 Main Street')
+
+    assert order_id == 1
+    assert server.commits == 1
+    assert len(server.connections) == 1
+    assert not any('LAST_INSERT_ID' in q for q in server.queries())
+    assert sum(1 for q in server.queries() if q.startswith('INSERT INTO order_items')) == 1
+    print("✅ Order creation runs as a single transaction")
+
+
+def test_execute_many_reports_cursor_results(fake_db):
+    """execute_many batches rows and reports lastrowid/rowcount"""
+    from models.database import execute_many
+
+    server = fake_db.serve()
+
+    result = execute_many(
+        "INSERT INTO email_verification_logs (user_id, email, otp_code, action) VALUES (%s, %s, %s, %s)",
+        [(1, 'a@example.com', '123456', 'sent'), (2, 'b@example.com', '654321', 'sent')]
+    )
+
+    assert result == {'lastrowid': 1, 'rowcount': 2}
+    assert len(server.statements) == 1
+    assert execute_many("INSERT INTO cart (user_id) VALUES (%s)", []) == {'lastrowid': None, 'rowcount': 0}
+    print("✅ execute_many batches rows in one round-trip")
+
+
+def test_payment_events_are_one_lookup_and_one_insert(fake_db):
+    """Payment events resolve their records with one query and insert with one multi-row VALUES"""
+    from flask import Flask
+    from routes.payment import log_payment_events
+
+    records = [{'id': 11, 'razorpay_payment_id': 'pay_1'}]
+    server = fake_db.serve(lambda query, params: records if query.lstrip().startswith('SELECT') else 1)
+
+    with Flask(__name__).test_request_context():
+        log_payment_events([('pay_1', 'captured', {}), ('pay_1', 'refunded', {}), ('pay_2', 'failed', {})])
+
+    assert server.round_trips == 2
+    query, rows = server.statements[1]
+    assert 'VALUES' in query and 'SELECT' not in query  # Only INSERT ... VALUES is sent as one statement
+    assert [row[:3] for row in rows] == [(11, 'pay_1', 'captured'), (11, 'pay_1', 'refunded')]
+    print("✅ Payment events are logged in two round-trips")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Transactions")
+    print("=" * 50)
+    from _pytest.monkeypatch import MonkeyPatch
+    test_statements_share_one_commit(FakeDatabase(MonkeyPatch()))
+    test_exception_rolls_back(FakeDatabase(MonkeyPatch()))
+    test_failed_execute_query_rolls_back(FakeDatabase(MonkeyPatch()))
+    test_create_order_is_one_transaction(FakeDatabase(MonkeyPatch()))
+    test_execute_many_reports_cursor_results(FakeDatabase(MonkeyPatch()))
+    test_payment_events_are_one_lookup_and_one_insert(FakeDatabase(MonkeyPatch()))
+    print("\n🎉 All transaction tests passed!")
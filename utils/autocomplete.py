@@ -0,0 +1,171 @@
+"""
+In-memory prefix trie for search-as-you-type product suggestions
+"""
+import re
+import threading
+import time
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Suggestions kept per trie node; stale entries are skipped when serving
+TOP_K = 20
+
+# Keys are indexed to this many characters; longer queries are filtered
+MAX_KEY_LENGTH = 16
+
+# Retry an empty load (database unavailable at startup) after this many seconds
+EMPTY_RETRY_SECONDS = 30
+
+def normalise(text):
+    """Lowercase text and collapse punctuation and whitespace to single spaces"""
+    return _NON_ALNUM.sub(' ', (text or '').lower()).strip()
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+class AutocompleteIndex:
+    """
+    Prefix trie answering autocomplete queries from memory
+
+    Every entry is reachable from the start of each word of its name and
+    from its category name, so "head" finds "Wireless Headphones". Each
+    node caches its TOP_K most popular entries, so a lookup costs one walk
+    down the query's characters and never touches the database.
+    """
+
+    def __init__(self, loader, refresh_seconds=600):
+        """
+        Args:
+            loader: Callable returning an iterable of entry dicts with 'id',
+                'name', 'category_name' and 'popularity' plus any fields to
+                return with suggestions
+            refresh_seconds: Rebuild the trie when it is older than this
+        """
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._root = _Node()
+        self._entries = {}  # id -> current entry; older versions left in the trie are skipped
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._loaded_at = None
+
+    @staticmethod
+    def _rank(entry):
+        return (-entry['popularity'], len(entry['name']), entry['id'])
+
+    @staticmethod
+    def _keys(entry):
+        """The name from each word onwards, plus the category name"""
+        words = normalise(entry['name']).split()
+        keys = {' '.join(words[index:])[:MAX_KEY_LENGTH] for index in range(len(words))}
+        category = normalise(entry.get('category_name'))
+        if category:
+            keys.add(category[:MAX_KEY_LENGTH])
+        return keys
+
+    def _insert(self, root, entry, ordered):
+        """
+        Add entry to every node on its key paths
+        ordered: entries arrive best-first (bulk build), so appending keeps
+        each node's list sorted
+        """
+        rank = None if ordered else self._rank(entry)
+        visited = set()  # Keys sharing a prefix share nodes; add the entry once
+        for key in self._keys(entry):
+            node = root
+            for char in key:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                node = child
+                if node in visited:
+                    continue
+                visited.add(node)
+                top = node.top
+                if ordered:
+                    if len(top) < TOP_K:
+                        top.append(entry)
+                    continue
+                top[:] = [existing for existing in top if existing['id'] != entry['id']]
+                position = len(top)
+                while position and self._rank(top[position - 1]) > rank:
+                    position -= 1
+                if position < TOP_K:
+                    top.insert(position, entry)
+                    del top[TOP_K:]
+
+    def rebuild(self):
+        """Reload every entry from the loader and swap in the new trie"""
+        entries = sorted(self.loader(), key=self._rank)
+        root = _Node()
+        for entry in entries:
+            self._insert(root, entry, ordered=True)
+
+        with self._lock:
+            self._root = root
+            self._entries = {entry['id']: entry for entry in entries}
+            if entries:
+                self._loaded_at = time.time()
+            else:
+                self._loaded_at = time.time() - self.refresh_seconds + EMPTY_RETRY_SECONDS
+
+    def ensure_fresh(self):
+        """Build the trie on first use and rebuild it once it is stale"""
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.time() - loaded_at < self.refresh_seconds:
+            return
+        if loaded_at is None:
+            with self._build_lock:
+                if self._loaded_at is None:
+                    self.rebuild()
+        elif self._build_lock.acquire(blocking=False):
+            # One thread refreshes; the others keep serving the current trie
+            try:
+                self.rebuild()
+            finally:
+                self._build_lock.release()
+
+    def add(self, entry):
+        """Add or replace an entry"""
+        if self._loaded_at is None:
+            return  # The first load includes it
+        with self._lock:
+            self._entries[entry['id']] = entry
+            self._insert(self._root, entry, ordered=False)
+
+    def remove(self, entry_id):
+        """Stop suggesting an entry"""
+        with self._lock:
+            self._entries.pop(entry_id, None)
+
+    def suggest(self, query, limit=8):
+        """
+        Suggestions for a partial query, most popular first
+        Returns: list of entry dicts
+        """
+        self.ensure_fresh()
+        text = normalise(query)
+        if not text:
+            return []
+
+        node = self._root
+        for char in text[:MAX_KEY_LENGTH]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        entries = self._entries
+        suggestions = []
+        for entry in node.top:
+            if entries.get(entry['id']) is not entry:
+                continue  # Removed or replaced since the trie was built
+            if len(text) > MAX_KEY_LENGTH and text not in normalise(entry['name']):
+                continue
+            suggestions.append(entry)
+            if len(suggestions) == limit:
+                break
+        return suggestions
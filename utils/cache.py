@@ -0,0 +1,94 @@
+"""
+In-process TTL cache with single-flight loading
+"""
+import threading
+import time
+
+class TTLCache:
+    """
+    Small per-worker cache whose entries expire after ttl seconds
+
+    When an entry is missing or expired, only one thread runs the loader;
+    concurrent callers for the same key wait for its result instead of
+    all querying the database at once.
+    """
+
+    def __init__(self, ttl, max_entries=None):
+        """
+        Args:
+            ttl: Seconds an entry stays fresh
+            max_entries: Bound on stored entries (optional); expired entries
+                are dropped first, then the oldest
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}  # key -> (value, expires_at)
+        self._loading = {}  # key -> lock held while loading that key
+        self._generation = 0  # Bumped by invalidate(); loads that straddle one are not stored
+        self._lock = threading.Lock()
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry
+        return None
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for key, calling loader() to fill it when needed
+        """
+        entry = self._fresh(key)
+        if entry:
+            return entry[0]
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                # Another thread may have loaded it while we waited
+                entry = self._fresh(key)
+                if entry:
+                    return entry[0]
+                generation = self._generation
+                value = loader()
+                with self._lock:
+                    # The value may predate an invalidate() made during the load
+                    if generation == self._generation:
+                        self._entries.pop(key, None)  # Re-insert so entries stay in age order
+                        self._entries[key] = (value, time.monotonic() + self.ttl)
+                        if self.max_entries and len(self._entries) > self.max_entries:
+                            self._prune()
+        finally:
+            # Also when loader() raised, so the key's lock does not linger
+            with self._lock:
+                self._loading.pop(key, None)
+        return value
+
+    def _prune(self):
+        """Drop expired entries, then the oldest until within max_entries"""
+        now = time.monotonic()
+        for key, (_, expires_at) in list(self._entries.items()):
+            if expires_at <= now:
+                self._entries.pop(key, None)
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)), None)
+
+    def peek(self, key):
+        """The cached value for key if present and fresh, else None"""
+        entry = self._fresh(key)
+        return entry[0] if entry else None
+
+    def values(self):
+        """All fresh cached values"""
+        now = time.monotonic()
+        return [value for value, expires_at in list(self._entries.values()) if expires_at > now]
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when key is None"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
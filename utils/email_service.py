@@ -8,6 +8,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from models.database import execute_query
+from utils.verification_log import log_verification_events
 from email_config import get_email_config
 
 class EmailService:
@@ -209,11 +210,7 @@ class EmailService:
             
             if result:
                 # Log the email sending
-                log_query = """
-                INSERT INTO email_verification_logs (user_id, email, otp_code, action)
-                VALUES (%s, %s, %s, 'sent')
-                """
-                execute_query(log_query, (user_id, email, otp_code))
+                log_verification_events([(user_id, email, otp_code, 'sent')])
                 return True
             
             return False
@@ -262,11 +259,7 @@ class EmailService:
                 
                 if execute_query(update_query, (user_id,)):
                     # Log successful verification
-                    log_query = """
-                    INSERT INTO email_verification_logs (user_id, email, otp_code, action)
-                    VALUES (%s, %s, %s, 'verified')
-                    """
-                    execute_query(log_query, (user_id, user_data['email'], otp_code))
+                    log_verification_events([(user_id, user_data['email'], otp_code, 'verified')])
                     
                     return {'success': True, 'message': 'Email verified successfully!'}
             
@@ -275,11 +268,7 @@ class EmailService:
             execute_query(attempt_query, (user_id,))
             
             # Log failed attempt
-            log_query = """
-            INSERT INTO email_verification_logs (user_id, email, otp_code, action)
-            VALUES (%s, %s, %s, 'failed')
-            """
-            execute_query(log_query, (user_id, user_data['email'], otp_code))
+            log_verification_events([(user_id, user_data['email'], otp_code, 'failed')])
             
             return {'success': False, 'message': 'Invalid OTP code. Please try again.'}
             
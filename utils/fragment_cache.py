@@ -0,0 +1,90 @@
+"""
+Jinja fragment caching: {% cache key, ttl %} ... {% endcache %}
+
+    {% cache ['product_card', product.id, product.updated_at], 300 %}
+        ... expensive markup ...
+    {% endcache %}
+
+Build keys from row versions (ids and updated_at values, or
+category_version() for category lists) so an admin edit produces a new key
+and the stale fragment simply ages out. Never cache per-visitor content.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+class LRUStore:
+    """In-process store keeping the most recently used fragments"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class FragmentCacheExtension(Extension):
+    """Adds the {% cache key, ttl %} block; ttl is optional (seconds)"""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache_store=LRUStore())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        ttl = nodes.Const(None)
+        if parser.stream.skip_if('comma'):
+            ttl = parser.parse_expression()
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [key, ttl]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, ttl, caller):
+        store = self.environment.fragment_cache_store
+        cache_key = hashlib.sha1(repr(key).encode()).hexdigest()
+
+        fragment = store.get(cache_key)
+        if fragment is None:
+            fragment = caller()
+            store.set(cache_key, fragment, ttl)
+        return Markup(fragment)
+
+def init_fragment_cache(app, store=None):
+    """
+    Enable {% cache %} blocks in the app's templates
+    Args:
+        store: Object with get(key) and set(key, value, ttl); defaults to an
+            in-process LRUStore of FRAGMENT_CACHE_MAX_ENTRIES fragments
+    """
+    from models.category import Category
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache_store = store or LRUStore(app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 1000))
+    app.jinja_env.globals['category_version'] = Category.get_version
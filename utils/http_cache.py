@@ -0,0 +1,58 @@
+"""
+Conditional GET helpers: ETag / Last-Modified validators and 304 responses
+"""
+import hashlib
+from datetime import timezone
+from flask import current_app, make_response, request, session
+from models.database import db_time_zone
+
+def make_etag(*parts):
+    """Strong ETag derived from what a response shows (row dicts, cache versions)"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def _as_http_date(value):
+    # MySQL TIMESTAMPs come back naive, in the session time zone every connection sets
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=db_time_zone())
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+def is_public_page():
+    """
+    Whether an HTML page can be served conditionally
+    Pages show per-visitor details (username, cart count, flashed
+    messages), so only anonymous visitors with an empty guest cart and
+    nothing to flash qualify.
+    """
+    return not any(key in session for key in ('user_id', 'admin_id', '_flashes', 'guest_cart'))
+
+def conditional_response(render, etag, last_modified=None, cache_control=None, vary_cookie=False):
+    """
+    Answer 304 Not Modified when the client's copy is current, else render()
+    Args:
+        render: Callable producing the response body (only called on a miss)
+        etag: Validator from make_etag()
+        last_modified: datetime of the newest row behind the response (optional)
+        cache_control: Cache-Control header value (optional)
+        vary_cookie: Add Vary: Cookie (HTML pages that differ once logged in)
+    Returns: Flask response
+    """
+    last_modified = _as_http_date(last_modified)
+    
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif last_modified and request.if_modified_since:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+    
+    response = current_app.response_class(status=304) if fresh else make_response(render())
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    if vary_cookie:
+        response.vary.add('Cookie')
+    return response
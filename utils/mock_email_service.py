@@ -6,6 +6,7 @@ import random
 import string
 from datetime import datetime, timedelta
 from models.database import execute_query
+from utils.verification_log import log_verification_events
 
 class MockEmailService:
     def __init__(self):
@@ -72,11 +73,7 @@ class MockEmailService:
             
             if result:
                 # Log the email sending
-                log_query = """
-                INSERT INTO email_verification_logs (user_id, email, otp_code, action)
-                VALUES (%s, %s, %s, 'sent')
-                """
-                execute_query(log_query, (user_id, email, otp_code))
+                log_verification_events([(user_id, email, otp_code, 'sent')])
                 print(f"✅ Verification data stored for user {user_id}")
                 return True
             
@@ -126,11 +123,7 @@ class MockEmailService:
                 
                 if execute_query(update_query, (user_id,)):
                     # Log successful verification
-                    log_query = """
-                    INSERT INTO email_verification_logs (user_id, email, otp_code, action)
-                    VALUES (%s, %s, %s, 'verified')
-                    """
-                    execute_query(log_query, (user_id, user_data['email'], otp_code))
+                    log_verification_events([(user_id, user_data['email'], otp_code, 'verified')])
                     
                     print(f"✅ Email verified successfully for user {user_id}")
                     return {'success': True, 'message': 'Email verified successfully!'}
@@ -140,11 +133,7 @@ class MockEmailService:
             execute_query(attempt_query, (user_id,))
             
             # Log failed attempt
-            log_query = """
-            INSERT INTO email_verification_logs (user_id, email, otp_code, action)
-            VALUES (%s, %s, %s, 'failed')
-            """
-            execute_query(log_query, (user_id, user_data['email'], otp_code))
+            log_verification_events([(user_id, user_data['email'], otp_code, 'failed')])
             
             print(f"❌ Invalid OTP attempt for user {user_id}")
             return {'success': False, 'message': 'Invalid OTP code. Please try again.'}
@@ -0,0 +1,23 @@
+"""
+Cart pricing rules: subtotal, tax, shipping and total
+"""
+from config import Config
+
+def price_cart(cart_items):
+    """
+    Price a list of cart lines
+    Args: cart_items - dicts with 'subtotal' (price x quantity), as returned
+          by Cart.get_cart_items() and GuestCart.get_cart_items()
+    Returns: dict with 'items', 'subtotal', 'tax', 'shipping' and 'total'
+    """
+    # Convert Decimal to float for calculations
+    subtotal = sum(float(item['subtotal']) for item in cart_items)
+    tax = subtotal * Config.TAX_RATE
+    shipping = Config.SHIPPING_FLAT_RATE if cart_items else 0
+    return {
+        'items': cart_items,
+        'subtotal': subtotal,
+        'tax': tax,
+        'shipping': shipping,
+        'total': subtotal + tax + shipping
+    }
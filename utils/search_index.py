@@ -0,0 +1,240 @@
+"""
+In-process inverted index with BM25 relevance ranking for product search
+"""
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from heapq import nlargest
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Prefix expansion of the last search term is capped to the most common matches
+MAX_PREFIX_TERMS = 50
+
+def _normalise(token):
+    """Fold simple plurals so 'laptops' matches 'laptop'"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    """Split text into lowercase, plural-folded search terms"""
+    return [_normalise(token) for token in _TOKEN.findall((text or '').lower())]
+
+class SearchIndex:
+    """
+    Inverted index over weighted text fields, ranked with BM25
+
+    Documents are added, replaced and removed incrementally. The whole
+    index is rebuilt from loader() on first use and then every
+    refresh_seconds, which also picks up changes made by other workers.
+    """
+
+    def __init__(self, loader, field_weights, refresh_seconds=300, k1=1.2, b=0.75):
+        """
+        Args:
+            loader: Callable returning an iterable of document dicts with
+                'id', 'category_id', 'is_active' and one key per field
+            field_weights: dict of field name -> weight (e.g. {'name': 3, 'description': 1})
+            refresh_seconds: Rebuild the index when it is older than this
+        """
+        self.loader = loader
+        self.field_weights = field_weights
+        self.refresh_seconds = refresh_seconds
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._loaded_at = None
+        self._pending = None  # Updates made while a rebuild is loading, replayed onto it
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}  # term -> {doc_id: weighted term frequency}
+        self._docs = {}  # doc_id -> (length, category_id, is_active, terms)
+        self._vocabulary = []  # Sorted terms for prefix lookups
+        self._total_length = 0
+
+    # Building
+
+    def _add(self, document):
+        frequencies = {}
+        length = 0
+        for field, weight in self.field_weights.items():
+            for term in tokenize(document.get(field)):
+                frequencies[term] = frequencies.get(term, 0) + weight
+                length += weight
+
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+            postings[document['id']] = frequency
+
+        self._docs[document['id']] = (length, document.get('category_id'),
+                                      bool(document.get('is_active', True)), tuple(frequencies))
+        self._total_length += length
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        length, _, _, terms = doc
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+
+    def rebuild(self):
+        """
+        Reload every document from the loader and swap in the new index
+        The load runs outside the lock, so searches keep using the current
+        index meanwhile; updates made during the load are replayed onto the
+        new one. If the load fails or comes back empty the current index is
+        kept.
+        """
+        fresh = SearchIndex(None, self.field_weights, self.refresh_seconds, self.k1, self.b)
+        with self._lock:
+            self._pending = []
+        try:
+            for document in self.loader():
+                fresh._add(document)
+        except Exception as e:
+            print(f"Search index rebuild failed: {e}")
+            with self._lock:
+                self._pending = None
+                if self._docs:
+                    self._loaded_at = time.time()
+            return
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            if not fresh._docs and self._docs:
+                # An empty load almost always means the database was unreachable
+                self._loaded_at = time.time()
+                return
+            for apply, args in pending:
+                apply(fresh, *args)
+            self._postings, self._docs = fresh._postings, fresh._docs
+            self._vocabulary, self._total_length = fresh._vocabulary, fresh._total_length
+            self._loaded_at = time.time()
+
+    def ensure_fresh(self):
+        """Build the index on first use and rebuild it once it is stale"""
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.time() - loaded_at < self.refresh_seconds:
+            return
+        if loaded_at is None:
+            with self._build_lock:
+                if self._loaded_at is None:
+                    self.rebuild()
+        elif self._build_lock.acquire(blocking=False):
+            # One thread refreshes; the others keep searching the current index
+            try:
+                self.rebuild()
+            finally:
+                self._build_lock.release()
+
+    # Incremental updates
+
+    def add(self, document):
+        """Add a document, replacing any previous version with the same id"""
+        if self._loaded_at is None:
+            return  # The first search loads everything, including this document
+        with self._lock:
+            self._replace(document)
+            self._log(SearchIndex._replace, document)
+
+    def remove(self, doc_id):
+        """Remove a document from the index"""
+        with self._lock:
+            self._remove(doc_id)
+            self._log(SearchIndex._remove, doc_id)
+
+    def set_active(self, doc_id, is_active):
+        """Flag a document as active or inactive without re-indexing it"""
+        with self._lock:
+            self._set_active(doc_id, is_active)
+            self._log(SearchIndex._set_active, doc_id, is_active)
+
+    def _replace(self, document):
+        self._remove(document['id'])
+        self._add(document)
+
+    def _set_active(self, doc_id, is_active):
+        doc = self._docs.get(doc_id)
+        if doc:
+            self._docs[doc_id] = (doc[0], doc[1], bool(is_active), doc[3])
+
+    def _log(self, apply, *args):
+        """Remember an update for the rebuild in progress, if any (call under the lock)"""
+        if self._pending is not None:
+            self._pending.append((apply, args))
+
+    # Searching
+
+    def _prefix_terms(self, prefix):
+        start = bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return nlargest(MAX_PREFIX_TERMS, matches, key=lambda term: len(self._postings[term]))
+
+    def search(self, query, category_id=None, include_inactive=False, limit=None):
+        """
+        Find documents matching every term of query, best match first
+        The last term also matches as a prefix, for search-as-you-type.
+        Args:
+            query: Search text
+            category_id: Only return documents in this category (optional)
+            include_inactive: Also return inactive documents (admin search)
+            limit: Maximum number of ids to return (optional)
+        Returns: list of document ids
+        """
+        self.ensure_fresh()
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            # One group of index terms per query term; a document must match every group
+            groups = [[term] for term in terms[:-1]]
+            last = terms[-1]
+            groups.append(sorted(set(self._prefix_terms(last)) | {last}))
+            groups = [[term for term in group if term in self._postings] for group in groups]
+            if not all(groups):
+                return []
+
+            document_sets = sorted(
+                (set().union(*(self._postings[term] for term in group)) for group in groups),
+                key=len
+            )
+            candidates = document_sets[0].intersection(*document_sets[1:])
+
+            count = len(self._docs)
+            average_length = self._total_length / count if count else 1
+            scores = {}
+            for group in groups:
+                for term in group:
+                    postings = self._postings[term]
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id in candidates.intersection(postings):
+                        length, doc_category, is_active, _ = self._docs[doc_id]
+                        if not include_inactive and not is_active:
+                            continue
+                        if category_id and doc_category != category_id:
+                            continue
+                        frequency = postings[doc_id]
+                        norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                        scores[doc_id] = scores.get(doc_id, 0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores, key=lambda doc_id: (scores[doc_id], doc_id), reverse=True)
+        return ranked[:limit] if limit else ranked
@@ -0,0 +1,16 @@
+"""
+Email verification log shared by the SMTP and mock email services
+"""
+from models.database import execute_many
+
+def log_verification_events(events):
+    """
+    Write email verification log rows in one batch
+    Args: events - list of (user_id, email, otp_code, action) tuples
+    Returns: dict with 'lastrowid' and 'rowcount', or None if failed
+    """
+    query = """
+    INSERT INTO email_verification_logs (user_id, email, otp_code, action)
+    VALUES (%s, %s, %s, %s)
+    """
+    return execute_many(query, events)